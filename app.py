@@ -1,16 +1,41 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from config.settings import settings
-from src.api.routes import router, register_handlers
+from src.utils.logs import configure_logging, new_request
+from src.api.routes import router, admin_router, health_router, register_handlers, start_warmup
+from uuid import uuid4
 import os
 
+# Structured logs via a background writer thread (LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE)
+configure_logging()
+
 
 app = FastAPI(title="YottaReal Chatbot Demo", version="1.0")
 
+# Build the RAG engine in the background; /health answers right away, /ready once it's warm
+@app.on_event("startup")
+async def warm_up_engine():
+    start_warmup()
+
+# Close the upstream LLM connection pools with the event loop they belong to
+@app.on_event("shutdown")
+async def close_llm_clients():
+    from src.chatbot.llm_handler import close_http_clients
+    await close_http_clients()
+
 # Register error handlers
 register_handlers(app)
 
+# Correlation id for every log line of a request (taken from X-Request-ID if the proxy sets one)
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("x-request-id") or uuid4().hex
+    new_request(request_id)
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # CORS (allow local dev / Codespaces)
 app.add_middleware(
     CORSMiddleware,
@@ -20,7 +45,9 @@ app.add_middleware(
 )
 
 # Include API router FIRST (before static files)
+app.include_router(health_router)
 app.include_router(router)
+app.include_router(admin_router)
 
 # Serve frontend - MUST BE LAST (catches all remaining routes)
 frontend_dir = os.path.join(os.path.dirname(__file__), "frontend")
@@ -0,0 +1,94 @@
+# benchmarks/corpus.py
+"""Synthetic property-management corpus for scaling tests (seeded, so runs are comparable)."""
+
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+_COMMUNITIES = ["Adara Heights", "Maple Court", "Riverside Commons", "Oak Terrace", "Harbor View", "Cedar Point"]
+_TOPICS = {
+    "rent": [
+        "Rent is due on the {day} of each month.",
+        "A late fee of ${fee} applies after the {grace} day of the month.",
+        "Rent can be paid online, by check, or by money order at the leasing office.",
+    ],
+    "maintenance": [
+        "Submit maintenance requests through the resident portal or call {phone}.",
+        "Emergency maintenance is available 24/7; response time is under {hours} hours.",
+        "Routine requests are completed within {days} business days.",
+    ],
+    "amenities": [
+        "The pool is open from {open}am to {close}pm between May and September.",
+        "The fitness center requires a key fob and is open 24 hours.",
+        "Guests must be accompanied by a resident at all amenities.",
+    ],
+    "parking": [
+        "Each unit includes {spots} assigned parking spaces.",
+        "Visitor parking is limited to {visit} hours; vehicles are towed after that.",
+        "Parking permits must be displayed on the rear-view mirror.",
+    ],
+    "pets": [
+        "Up to {pets} pets are allowed per unit with a ${deposit} refundable deposit.",
+        "Monthly pet rent is ${petrent} per pet.",
+        "Dogs must be leashed in all common areas.",
+    ],
+    "lease": [
+        "Leases can be renewed {notice} days before the end of the term.",
+        "Breaking a lease early requires {months} months of notice and a fee.",
+        "Subletting is not permitted without written approval from management.",
+    ],
+}
+_FILLER = (
+    "Residents should review the community handbook for details. Management may update "
+    "these policies with thirty days written notice. Questions can be directed to the "
+    "leasing office during business hours."
+)
+
+# Questions the benchmarks ask, with the topic that answers them
+QUERIES: List[Tuple[str, str]] = [
+    ("When is rent due?", "rent"),
+    ("How much is the late fee?", "rent"),
+    ("How do I submit a maintenance request?", "maintenance"),
+    ("What are the pool hours?", "amenities"),
+    ("How many parking spaces do I get?", "parking"),
+    ("Is there a pet deposit?", "pets"),
+    ("How much is pet rent?", "pets"),
+    ("How early can I renew my lease?", "lease"),
+]
+
+
+def _values(rng: random.Random) -> dict:
+    return {
+        "day": rng.choice(["1st", "3rd", "5th"]), "grace": rng.choice(["3rd", "5th", "7th"]),
+        "fee": rng.choice([50, 75, 100]), "phone": f"555-{rng.randint(1000, 9999)}",
+        "hours": rng.choice([2, 4, 6]), "days": rng.choice([2, 3, 5]),
+        "open": rng.choice([6, 8, 9]), "close": rng.choice([8, 9, 10]),
+        "spots": rng.choice([1, 2]), "visit": rng.choice([24, 48, 72]),
+        "pets": rng.choice([1, 2, 3]), "deposit": rng.choice([250, 300, 500]),
+        "petrent": rng.choice([25, 35, 50]), "notice": rng.choice([60, 90]), "months": rng.choice([1, 2]),
+    }
+
+
+def generate_corpus(out_dir: str, n_docs: int = 200, paragraphs: int = 8, seed: int = 0) -> List[Path]:
+    """
+    Write `n_docs` policy documents (.md/.txt) of roughly `paragraphs` paragraphs each.
+
+    Returns:
+        Paths written, in order
+    """
+    rng = random.Random(seed)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_docs):
+        community = rng.choice(_COMMUNITIES)
+        values = _values(rng)
+        lines = [f"# {community} resident policies ({i})", ""]
+        for topic in rng.sample(list(_TOPICS), k=min(paragraphs, len(_TOPICS))):
+            lines.append(f"## {topic.title()}")
+            lines.append(" ".join(s.format(**values) for s in _TOPICS[topic]) + " " + _FILLER)
+            lines.append("")
+        path = out / f"policy_{i:05d}{'.md' if i % 2 == 0 else '.txt'}"
+        path.write_text("\n".join(lines), encoding="utf-8")
+        paths.append(path)
+    return paths
@@ -0,0 +1,114 @@
+# benchmarks/fakes.py
+"""
+Deterministic local stand-ins for the LLM and the embedding model, so the
+benchmarks (and tests) run offline, reproducibly, without an OpenRouter key.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORD_RE = re.compile(r"[a-z0-9$%]+")
+
+
+class FakeChatLLM(BaseChatModel):
+    """
+    Answers with the first sentence of the "Information:" block of the prompt
+    (or a fixed sentence without context), after `latency` seconds.
+
+    Streaming yields the answer word by word, `token_delay` seconds apart, after
+    the same initial latency (time to first token).
+    """
+
+    latency: float = 0.0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content) if messages else ""
+        match = re.search(r"Information:\s*(.+?)(?:\n\nQuestion:|$)", prompt, re.S)
+        if not match:
+            return "I could not find that in the documents."
+        first = re.split(r"(?<=[.!?])\s", match.group(1).strip(), maxsplit=1)[0]
+        return first[:300]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, word in enumerate(self._answer(messages).split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=(" " if i else "") + word))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self._answer(messages).split(" ")):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=(" " if i else "") + word))
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Bag-of-words feature hashing into `size` dimensions (L2-normalised).
+
+    Deterministic across processes and runs, costs microseconds per text, and
+    texts sharing words land close together, so retrieval still behaves like
+    retrieval.
+    """
+
+    def __init__(self, size: int = 384):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.size, dtype=np.float32)
+        for word in _WORD_RE.findall((text or "").lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.size] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def install(llm_latency: float = 0.0, token_delay: float = 0.0, embeddings: Optional[Embeddings] = None):
+    """
+    Route get_llm() and the shared embedding registry to the fakes (call before
+    building a RAGEngine). Returns the fake LLM.
+    """
+    from config.settings import settings
+    from src.chatbot import embeddings as shared
+    from src.chatbot import rag_engine
+
+    llm = FakeChatLLM(latency=llm_latency, token_delay=token_delay)
+    rag_engine.get_llm = lambda: llm
+    shared._REGISTRY[settings.embed_model] = embeddings or HashingEmbeddings()
+    return llm
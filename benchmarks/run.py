@@ -0,0 +1,266 @@
+# benchmarks/run.py
+"""
+End-to-end benchmarks of the hot paths, offline and reproducible.
+
+    python -m benchmarks.run                                  # defaults: 200 docs, stub LLM at 200 ms
+    python -m benchmarks.run --docs 2000 --concurrency 32 --json results.json
+    python -m benchmarks.run --baseline results.json          # exit 1 if any p95 regressed > 20%
+
+Stages: load_documents, chunk_documents, index build, RAGEngine._retrieve,
+qa_with_history, POST /api/chat under concurrent load and POST /api/upload
+(until indexed) under concurrent load. The LLM and the embedding model are
+replaced by the deterministic fakes in benchmarks/fakes.py (pass
+--real-embeddings to use settings.embed_model). Reports p50/p95/p99 latency,
+throughput and peak RSS after each stage.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.corpus import QUERIES, generate_corpus
+from benchmarks.fakes import install
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def _summary(samples: List[float], wall: float, n: Optional[int] = None) -> Dict:
+    """Latency percentiles (ms) and throughput (ops/s) for a list of per-op durations (s)."""
+    ms = np.asarray(samples) * 1000
+    count = n if n is not None else len(samples)
+    return {
+        "n": count,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "throughput_per_s": round(count / wall, 2) if wall else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _once(fn: Callable, unit_count: int):
+    t0 = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - t0
+    return result, {**_summary([wall], wall, unit_count), "seconds": round(wall, 3)}
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    """Drop the engine's INFO/DEBUG logging so it neither floods the report nor skews timings."""
+    if not enabled:
+        yield
+        return
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def _queries(n: int) -> List[str]:
+    return [QUERIES[i % len(QUERIES)][0] for i in range(n)]
+
+
+async def _concurrent(make_call, total: int, concurrency: int):
+    """Run `total` calls with at most `concurrency` in flight; returns (latencies, wall)."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i):
+        async with slots:
+            t0 = time.perf_counter()
+            await make_call(i)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, time.perf_counter() - t0
+
+
+async def _bench_api(app, routes, args) -> Dict[str, Dict]:
+    import httpx
+
+    results = {}
+    routes._warmup.wait()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        questions = _queries(args.requests)
+
+        async def chat(i):
+            r = await client.post("/api/chat", json={"message": questions[i], "session_id": f"bench-chat-{i % 50}"})
+            r.raise_for_status()
+
+        latencies, wall = await _concurrent(chat, args.requests, args.concurrency)
+        results["api_chat"] = {**_summary(latencies, wall), "concurrency": args.concurrency}
+
+        upload_dir = tempfile.mkdtemp(prefix="bench-uploads-")
+        files = generate_corpus(upload_dir, n_docs=args.uploads, seed=args.seed + 1)
+
+        async def upload(i):
+            with open(files[i], "rb") as fh:
+                r = await client.post("/api/upload", data={"session_id": f"bench-upload-{i}"},
+                                      files=[("files", (files[i].name, fh.read()))])
+            r.raise_for_status()
+            job_id = r.json()["job_id"]
+            while True:  # until the file is indexed, not just accepted
+                job = (await client.get(f"/api/upload/{job_id}")).json()
+                if job["status"] in ("done", "failed"):
+                    break
+                await asyncio.sleep(0.01)
+
+        latencies, wall = await _concurrent(upload, args.uploads, args.concurrency)
+        results["api_upload_indexed"] = {**_summary(latencies, wall), "concurrency": args.concurrency}
+    return results
+
+
+def run(args) -> Dict[str, Dict]:
+    from config.settings import settings
+
+    work = tempfile.mkdtemp(prefix="bench-")
+    settings.docs_dir = os.path.join(work, "docs")
+    settings.index_dir = os.path.join(work, "index")
+    settings.uploads_dir = os.path.join(work, "uploads")
+    settings.session_indexes_dir = os.path.join(work, "session_indexes")
+    settings.answer_cache_size = args.answer_cache
+    settings.openrouter_api_key = settings.openrouter_api_key or "bench"
+
+    embeddings = None
+    if args.real_embeddings:
+        from src.chatbot.embeddings import get_embeddings
+        embeddings = get_embeddings(settings.embed_model)
+    install(llm_latency=args.llm_latency, embeddings=embeddings)
+
+    from src.chatbot.embeddings import embedding_id
+    from src.chatbot.index_cache import build_manifest, save_manifest
+    from src.chatbot.index_versions import VERSIONS_DIR, IndexVersions
+    from src.chatbot.partitions import PartitionedStore
+    from src.data.loaders import load_documents
+    from src.data.processors import chunk_documents
+
+    results: Dict[str, Dict] = {}
+    quiet = not args.verbose
+    generate_corpus(settings.docs_dir, n_docs=args.docs, seed=args.seed)
+
+    with _quiet(quiet):
+        docs, results["load_documents"] = _once(lambda: load_documents(settings.docs_dir), args.docs)
+        chunks, results["chunk_documents"] = _once(
+            lambda: chunk_documents(docs, settings.chunk_size, settings.chunk_overlap), len(docs)
+        )
+        results["chunk_documents"]["chunks"] = len(chunks)
+
+        # Built and published the way initialize_search_index.py --publish does, so RAGEngine opens it
+        staging = os.path.join(settings.index_dir, VERSIONS_DIR, f".building-{os.getpid()}")
+        store = PartitionedStore(index_dir=staging, index_type=settings.index_type, mmap=settings.mmap_index)
+        _, results["index_build"] = _once(lambda: store.rebuild(chunks), len(chunks))
+        save_manifest(staging, build_manifest(
+            settings.docs_dir, embedding_id(store.embed_model), settings.chunk_size, settings.chunk_overlap,
+            index=store.index_config,
+        ))
+        IndexVersions(settings.index_dir).publish(staging)
+
+        from src.chatbot.rag_engine import RAGEngine
+        engine = RAGEngine()
+
+        samples = []
+        t_all = time.perf_counter()
+        for q in _queries(args.queries):
+            t0 = time.perf_counter()
+            engine._retrieve("bench-retrieve", q)
+            samples.append(time.perf_counter() - t0)
+        results["retrieve"] = _summary(samples, time.perf_counter() - t_all)
+
+        samples = []
+        t_all = time.perf_counter()
+        for i, q in enumerate(_queries(args.qa)):
+            t0 = time.perf_counter()
+            engine.qa_with_history(f"bench-qa-{i}", q)
+            samples.append(time.perf_counter() - t0)
+        results["qa_with_history"] = {**_summary(samples, time.perf_counter() - t_all),
+                                      "llm_latency_ms": args.llm_latency * 1000}
+
+        from app import app
+        from src.api import routes
+        results.update(asyncio.run(_bench_api(app, routes, args)))
+
+    results["_meta"] = {
+        "docs": args.docs, "chunks": len(chunks), "index_type": settings.index_type,
+        "embeddings": settings.embed_model if args.real_embeddings else "hashing-fake",
+        "llm_latency_ms": args.llm_latency * 1000, "seed": args.seed,
+    }
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Stages whose p95 grew by more than `tolerance` (fraction) over the baseline."""
+    regressions = []
+    for stage, row in results.items():
+        old = baseline.get(stage, {}).get("p95_ms")
+        new = row.get("p95_ms")
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{stage}: p95 {old} ms -> {new} ms (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _print_table(results: Dict) -> None:
+    print(f"\n{'stage':<22}{'n':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'ops/s':>10}{'peak RSS MB':>13}")
+    for stage, row in results.items():
+        if stage.startswith("_"):
+            continue
+        print(f"{stage:<22}{row['n']:>7}{row['p50_ms']:>11}{row['p95_ms']:>11}{row['p99_ms']:>11}"
+              f"{row['throughput_per_s'] or '-':>10}{row['peak_rss_mb']:>13}")
+    print(f"\n{results['_meta']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200, help="_retrieve calls")
+    parser.add_argument("--qa", type=int, default=20, help="qa_with_history calls")
+    parser.add_argument("--requests", type=int, default=200, help="/api/chat requests")
+    parser.add_argument("--uploads", type=int, default=20, help="/api/upload requests")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM latency (seconds)")
+    parser.add_argument("--answer-cache", type=int, default=0, help="answer cache size (0 = off)")
+    parser.add_argument("--real-embeddings", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 regression (fraction)")
+    parser.add_argument("--verbose", action="store_true", help="keep the engine's own log output")
+    args = parser.parse_args()
+    if args.verbose:
+        from src.utils.logs import configure_logging
+        configure_logging(fmt="text")
+
+    results = run(args)
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,89 @@ load_dotenv()
 class Settings(BaseModel):
     openrouter_api_key: str = os.getenv("OPENROUTER_API_KEY", "")
     openrouter_model: str = os.getenv("OPENROUTER_MODEL", "google/gemma-2-9b-it:free")
+    # Comma-separated models tried in order when the primary still fails after retries
+    llm_fallback_models: str = os.getenv("LLM_FALLBACK_MODELS", "")
+    # Seconds per HTTP attempt; retries (429/5xx, jittered backoff) come on top, within llm_deadline
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    llm_deadline: float = float(os.getenv("LLM_DEADLINE", "60"))
+    # Upstream connection pool limits (async calls: per event loop; the app runs one)
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+    llm_max_keepalive: int = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+    # Identical prompts in flight at the same time share one upstream call
+    llm_coalesce: bool = os.getenv("LLM_COALESCE", "true").lower() in ("1", "true", "yes")
 
     app_host: str = os.getenv("APP_HOST", "0.0.0.0")
     app_port: int = int(os.getenv("APP_PORT", "8000"))
 
+    # Logging (src/utils/logs.py): json | text, and the share of requests that emit verbose DEBUG output
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json")
+    log_debug_sample_rate: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.05"))
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
     embed_model: str = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    query_embedding_cache_size: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    # torch (sentence-transformers) | onnx (ONNX Runtime, exported once into EMBED_ONNX_DIR)
+    embed_backend: str = os.getenv("EMBED_BACKEND", "torch")
+    embed_onnx_quantize: bool = os.getenv("EMBED_ONNX_QUANTIZE", "true").lower() in ("1", "true", "yes")
+    embed_onnx_dir: str = os.getenv("EMBED_ONNX_DIR", "storage/onnx")
+    embed_threads: int = int(os.getenv("EMBED_THREADS", "0"))  # 0 = library default (all cores)
     index_dir: str = os.getenv("INDEX_DIR", "storage/index")
+    # Permanent index type: flat | ivf_flat | ivf_pq | hnsw | sq8 (see src/chatbot/ann_index.py)
+    index_type: str = os.getenv("INDEX_TYPE", "flat")
+    ivf_nlist: int = int(os.getenv("IVF_NLIST", "0"))  # 0 = ~4*sqrt(n)
+    ivf_nprobe: int = int(os.getenv("IVF_NPROBE", "16"))
+    pq_m: int = int(os.getenv("PQ_M", "48"))
+    pq_bits: int = int(os.getenv("PQ_BITS", "8"))
+    hnsw_m: int = int(os.getenv("HNSW_M", "32"))
+    hnsw_ef_construction: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+    hnsw_ef_search: int = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    # Save the permanent index as mmap'able files (no pickle) so app workers share one copy
+    mmap_index: bool = os.getenv("MMAP_INDEX", "true").lower() in ("1", "true", "yes")
+    # false: the web process never (re)builds the permanent index; run scripts/initialize_search_index.py
+    index_build_on_start: bool = os.getenv("INDEX_BUILD_ON_START", "true").lower() in ("1", "true", "yes")
+    # Hot reload: previous index versions kept for rollback, DOCS_DIR poll interval in seconds (0 = off)
+    index_keep_versions: int = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+    index_watch_interval: int = int(os.getenv("INDEX_WATCH_INTERVAL", "0"))
+    # Enables /api/admin/* (sent as X-Admin-Token); empty = admin API off
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
     docs_dir: str = os.getenv("DOCS_DIR", "data/sample_documents")
+    chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
+    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
     top_k: int = int(os.getenv("TOP_K", "4"))
+    # Hybrid retrieval: reciprocal rank fusion of vector + BM25 rankings
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
+    session_rank_weight: float = float(os.getenv("SESSION_RANK_WEIGHT", "2.0"))
+    # Prompt context: ranked chunks packed into this many tokens (tiktoken encoding below)
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+    context_tokenizer: str = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+    # Answer sentences are cited only when this similar (cosine) to a chunk in the context
+    citation_min_score: float = float(os.getenv("CITATION_MIN_SCORE", "0.35"))
+
+    # Answer cache for the permanent knowledge base (size 0 disables). Paraphrase hits are off by
+    # default (similarity 0); when on, they also need the same retrieved chunks as the cached answer
+    answer_cache_size: int = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+    answer_cache_ttl: int = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    answer_cache_similarity: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+    retrieval_workers: int = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+    chat_concurrency: int = int(os.getenv("CHAT_CONCURRENCY", "32"))
+
+    loader_workers: int = int(os.getenv("LOADER_WORKERS", "4"))
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", "2"))
+    upload_job_ttl: int = int(os.getenv("UPLOAD_JOB_TTL", "3600"))
+
+    uploads_dir: str = os.getenv("UPLOADS_DIR", "data/uploads")
+    # Upload limits, enforced while the request body streams in
+    upload_max_file_mb: int = int(os.getenv("UPLOAD_MAX_FILE_MB", "100"))
+    upload_session_quota_mb: int = int(os.getenv("UPLOAD_SESSION_QUOTA_MB", "500"))
+    upload_max_files: int = int(os.getenv("UPLOAD_MAX_FILES", "20"))
+    session_indexes_dir: str = os.getenv("SESSION_INDEXES_DIR", "data/indexes")
+    session_ttl: int = int(os.getenv("SESSION_TTL", "3600"))
+    max_resident_sessions: int = int(os.getenv("MAX_RESIDENT_SESSIONS", "50"))
+    session_memory_budget_mb: int = int(os.getenv("SESSION_MEMORY_BUDGET_MB", "512"))
+    session_sweep_interval: int = int(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
 
 settings = Settings()
@@ -93,15 +93,20 @@ uploadBtn.addEventListener("click", async () => {
     }
 
     const data = await res.json();
-    
-    // Add successfully uploaded files to the list
-    if (data.saved && data.saved.length > 0) {
-      uploadedFiles.push(...data.saved);
+    fileInput.value = "";
+
+    // Indexing runs in the background; poll until every file is processed
+    const job = data.job_id ? await waitForUploadJob(data.job_id) : null;
+    const indexed = job ? job.files.filter(f => f.status === "indexed").map(f => f.name) : data.saved;
+    const failed = job ? job.files.filter(f => f.status === "failed").length : 0;
+
+    // Add successfully indexed files to the list
+    if (indexed.length > 0) {
+      uploadedFiles.push(...indexed);
       displayUploadedFiles();
     }
     
-    uploadStatus.textContent = `✓ ${data.saved.length} file(s) uploaded`;
-    fileInput.value = "";
+    uploadStatus.textContent = `✓ ${indexed.length} file(s) uploaded` + (failed ? `, ${failed} failed` : "");
     
     setTimeout(() => {
       uploadStatus.textContent = "";
@@ -112,6 +117,18 @@ uploadBtn.addEventListener("click", async () => {
   }
 });
 
+async function waitForUploadJob(jobId) {
+  while (true) {
+    const res = await fetch(`/api/upload/${jobId}`);
+    if (!res.ok) throw new Error("Could not read upload status");
+    const job = await res.json();
+    if (job.status === "done" || job.status === "failed") return job;
+
+    uploadStatus.textContent = `Indexing ${job.progress.done}/${job.progress.total} file(s)...`;
+    await new Promise(resolve => setTimeout(resolve, 1000));
+  }
+}
+
 // MANUAL clear session button
 clearBtn.addEventListener("click", async () => {
   if (!confirm('This will clear all uploaded files and chat history. Continue?')) {
@@ -146,7 +163,7 @@ clearBtn.addEventListener("click", async () => {
   }
 });
 
-// Handle chat form submission
+// Handle chat form submission (answer is streamed token by token)
 form.addEventListener("submit", async (e) => {
   e.preventDefault();
   const q = input.value.trim();
@@ -154,10 +171,11 @@ form.addEventListener("submit", async (e) => {
 
   addMessage("user", q);
   input.value = "";
-  addMessage("bot", "Thinking…");
+  const botMsg = addMessage("bot", "Thinking…");
+  let answer = "";
 
   try {
-    const res = await fetch("/api/chat", {
+    const res = await fetch("/api/chat/stream", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ 
@@ -175,16 +193,70 @@ form.addEventListener("submit", async (e) => {
       throw new Error(detail || "Request failed");
     }
 
-    const data = await res.json();
-    chat.removeChild(chat.lastChild);
-    addMessage("bot", data.answer, data.citations || []);
+    await readEvents(res, (event, data) => {
+      if (event === "token") {
+        answer += data.text;
+        setMessageText(botMsg, answer);
+      } else if (event === "citations") {
+        addCitations(botMsg, data.citations || []);
+      } else if (event === "done") {
+        setMessageText(botMsg, data.answer);
+      } else if (event === "error") {
+        throw new Error(data.detail || "something went wrong.");
+      }
+    });
   } catch (err) {
-    chat.removeChild(chat.lastChild);
+    chat.removeChild(botMsg.wrap);
     addMessage("bot", `Sorry — ${err.message || "something went wrong."}`);
     console.error(err);
   }
 });
 
+// Parse a Server-Sent Events response body and call onEvent(event, data) per message
+async function readEvents(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = "message";
+      const dataLines = [];
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+      }
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join("\n")));
+    }
+  }
+}
+
+function setMessageText(msg, text) {
+  msg.content.innerHTML = sanitize(text || "").replace(/\n/g, "<br/>");
+  chat.scrollTop = chat.scrollHeight;
+}
+
+function addCitations(msg, citations) {
+  if (!citations || !citations.length) return;
+  const cites = document.createElement("div");
+  cites.className = "citations";
+  const list = citations.map(c => {
+    const source = sanitize(c.source + (c.page ? ` (page ${c.page})` : c.ocr ? " (OCR)" : ""));
+    return c.url ? `<a href="${sanitize(c.url)}" target="_blank">${source}</a>` : source;
+  }).join(" • ");
+  cites.innerHTML = `<strong>Citations:</strong> ${list}`;
+  msg.bubble.appendChild(cites);
+  chat.scrollTop = chat.scrollHeight;
+}
+
 function addMessage(role, text, citations=[]) {
   const wrap = document.createElement("div");
   wrap.className = `message ${role}`;
@@ -201,21 +273,13 @@ function addMessage(role, text, citations=[]) {
 
   bubble.appendChild(meta);
   bubble.appendChild(content);
-
-  if (role === "bot" && citations && citations.length) {
-    const cites = document.createElement("div");
-    cites.className = "citations";
-    const list = citations.map(c => {
-      const source = sanitize(c.source + (c.page ? ` (page ${c.page})` : c.ocr ? " (OCR)" : ""));
-      return c.url ? `<a href="${sanitize(c.url)}" target="_blank">${source}</a>` : source;
-    }).join(" • ");
-    cites.innerHTML = `<strong>Citations:</strong> ${list}`;
-    bubble.appendChild(cites);
-  }
-
   wrap.appendChild(bubble);
   chat.appendChild(wrap);
+
+  const msg = { wrap, bubble, content };
+  if (role === "bot") addCitations(msg, citations);
   chat.scrollTop = chat.scrollHeight;
+  return msg;
 }
 
 function sanitize(s) { 
@@ -0,0 +1,111 @@
+# scripts/embedding_backend_report.py
+"""
+Speed and retrieval agreement of the ONNX embedding backends against PyTorch.
+
+    python scripts/embedding_backend_report.py                  # chunks of settings.docs_dir
+    python scripts/embedding_backend_report.py --threads 4 --queries 500
+
+Every backend embeds the same chunks and queries (the first words of random
+chunks). For ONNX fp32 and int8, the report shows mean/min cosine similarity
+of their vectors to the PyTorch ones. It also shows recall@k: the share of
+each query's PyTorch top-k chunks that the backend's own top-k still finds.
+Needs onnxruntime and onnx; the first run exports the model to EMBED_ONNX_DIR.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings  # noqa: E402
+
+
+def _unit(vectors) -> np.ndarray:
+    v = np.asarray(vectors, dtype=np.float32)
+    return v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+
+
+def _models(threads: int):
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from src.chatbot.onnx_embeddings import OnnxEmbeddings
+
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+    yield "torch", HuggingFaceEmbeddings(model_name=settings.embed_model,
+                                         encode_kwargs={"batch_size": settings.embed_batch_size})
+    for quantize in (False, True):
+        yield ("onnx-int8" if quantize else "onnx"), OnnxEmbeddings(
+            settings.embed_model, settings.embed_onnx_dir, quantize=quantize, threads=threads
+        )
+
+
+def _embed_sorted(model, texts, batch_size):
+    """Length-ordered batches, as SharedEmbeddings does; results in input order."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    out = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        for i, vector in zip(batch, model.embed_documents([texts[i] for i in batch])):
+            out[i] = vector
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-dir", default=settings.docs_dir)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=settings.embed_threads, help="0 = library default")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from src.data.loaders import load_documents
+    from src.data.processors import chunk_documents
+
+    chunks = chunk_documents(load_documents(args.docs_dir), settings.chunk_size, settings.chunk_overlap)
+    texts = [c.page_content for c in chunks]
+    if not texts:
+        sys.exit(f"No text in {args.docs_dir}")
+    rng = np.random.default_rng(args.seed)
+    queries = [" ".join(texts[i].split()[:12]) for i in rng.integers(0, len(texts), args.queries)]
+    k = min(args.k, len(texts))
+
+    rows, baseline = [], None
+    for name, model in _models(args.threads):
+        t0 = time.perf_counter()
+        docs = _unit(_embed_sorted(model, texts, settings.embed_batch_size))
+        doc_seconds = time.perf_counter() - t0
+        latencies, qvecs = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            qvecs.append(model.embed_query(q))
+            latencies.append(time.perf_counter() - t0)
+        qvecs = _unit(qvecs)
+        top = np.argsort(-(qvecs @ docs.T), axis=1)[:, :k]
+
+        row = {"backend": name, "chunks_per_s": len(texts) / doc_seconds,
+               "query_p50_ms": 1000 * float(np.percentile(latencies, 50))}
+        if baseline is None:
+            baseline = (docs, top)
+            row.update(cos_mean=1.0, cos_min=1.0, recall=1.0)
+        else:
+            cos = np.sum(docs * baseline[0], axis=1)
+            hits = [len(set(a) & set(b)) / k for a, b in zip(top, baseline[1])]
+            row.update(cos_mean=float(cos.mean()), cos_min=float(cos.min()), recall=float(np.mean(hits)))
+        rows.append(row)
+
+    print(f"{len(texts)} chunks, {len(queries)} queries, {settings.embed_model}, "
+          f"threads={args.threads or 'default'}, recall@{k} vs torch\n")
+    print(f"{'backend':<12}{'chunks/s':>10}{'speedup':>9}{'query p50 ms':>14}{'cos mean':>10}{'cos min':>9}{'recall':>8}")
+    for row in rows:
+        print(f"{row['backend']:<12}{row['chunks_per_s']:>10.1f}{row['chunks_per_s'] / rows[0]['chunks_per_s']:>8.2f}x"
+              f"{row['query_p50_ms']:>14.2f}{row['cos_mean']:>10.4f}{row['cos_min']:>9.4f}{row['recall']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
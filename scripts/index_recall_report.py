@@ -0,0 +1,67 @@
+# scripts/index_recall_report.py
+"""
+Recall vs latency vs memory of every FAISS index type, against exact (flat) search.
+
+    python scripts/index_recall_report.py                      # embed settings.docs_dir
+    python scripts/index_recall_report.py --synthetic 50000    # clustered random vectors
+
+Queries are stored vectors with a little noise added, so the report measures
+how well each index finds the true nearest neighbours, not answer quality.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings  # noqa: E402
+from src.chatbot.ann_index import INDEX_TYPES, index_config, recall_report  # noqa: E402
+
+
+def _corpus_vectors(docs_dir: str) -> np.ndarray:
+    from src.chatbot.embeddings import get_embeddings
+    from src.data.loaders import load_documents
+    from src.data.processors import chunk_documents
+
+    chunks = chunk_documents(load_documents(docs_dir), settings.chunk_size, settings.chunk_overlap)
+    return np.asarray(get_embeddings().embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+
+
+def _synthetic_vectors(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors around n/100 random centres, roughly like sentence embeddings of a corpus."""
+    centres = rng.standard_normal((max(1, n // 100), dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, len(centres), n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-dir", default=settings.docs_dir)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic vectors instead of a corpus")
+    parser.add_argument("--dim", type=int, default=384, help="dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = _synthetic_vectors(args.synthetic, args.dim, rng) if args.synthetic else _corpus_vectors(args.docs_dir)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32)
+
+    configs = [index_config(t.strip()) for t in args.types.split(",") if t.strip()]
+    rows = recall_report(vectors, queries, configs, k=args.k)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, recall@{args.k}\n")
+    print(f"{'type':<10}{'param':<16}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}{'MB':>10}")
+    for row in rows:
+        print(f"{row['type']:<10}{row['param']:<16}{row['recall']:>8.3f}{row['p50_ms']:>10.3f}"
+              f"{row['p95_ms']:>10.3f}{row['bytes'] / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
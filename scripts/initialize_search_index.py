@@ -0,0 +1,67 @@
+# scripts/initialize_search_index.py
+"""
+Build the permanent knowledge-base index offline, as a batch job.
+
+    python scripts/initialize_search_index.py                     # settings.docs_dir -> settings.index_dir
+    python scripts/initialize_search_index.py --docs-dir /data/portfolio --workers 8 --shard-size 200
+
+Safe to interrupt: re-running resumes from the last finished file/shard. Set
+INDEX_BUILD_ON_START=false so web processes only ever load what this builds.
+
+With --publish the index is built as a new version under <index-dir>/versions/
+and activated; running workers with INDEX_WATCH_INTERVAL set switch to it
+without a restart (the previous versions are kept for rollback).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings  # noqa: E402
+from src.chatbot.ann_index import INDEX_TYPES  # noqa: E402
+from src.chatbot.bulk_ingest import BulkIngest  # noqa: E402
+from src.chatbot.index_versions import VERSIONS_DIR, IndexVersions  # noqa: E402
+from src.utils.logs import configure_logging  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-dir", default=settings.docs_dir)
+    parser.add_argument("--index-dir", default=settings.index_dir)
+    parser.add_argument("--work-dir", default=None, help="checkpoints (default: <index-dir>.ingest)")
+    parser.add_argument("--shard-size", type=int, default=100, help="files per embedding shard")
+    parser.add_argument("--workers", type=int, default=settings.loader_workers, help="extraction processes")
+    parser.add_argument("--batch-size", type=int, default=settings.embed_batch_size, help="embedding batch size")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=settings.index_type)
+    parser.add_argument("--clean", action="store_true", help="delete checkpoints after a successful build")
+    parser.add_argument("--publish", action="store_true", help="build a new index version and activate it")
+    args = parser.parse_args()
+
+    configure_logging(fmt="text")  # progress lines
+    settings.embed_batch_size = args.batch_size
+    index_dir = args.index_dir
+    if args.publish:
+        index_dir = os.path.join(args.index_dir, VERSIONS_DIR, f".building-{os.getpid()}")
+        shutil.rmtree(index_dir, ignore_errors=True)
+    ingest = BulkIngest(
+        docs_dir=args.docs_dir,
+        index_dir=index_dir,
+        work_dir=args.work_dir or f"{args.index_dir.rstrip('/')}.ingest",
+        shard_size=args.shard_size,
+        workers=args.workers,
+        index_type=args.index_type,
+    )
+    stats = ingest.run()
+    if args.publish:
+        stats["published"] = {"version": IndexVersions(args.index_dir).publish(index_dir)}
+    if args.clean:
+        ingest.clean()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
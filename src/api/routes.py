@@ -1,18 +1,40 @@
 # src/api/routes.py
-from fastapi import APIRouter, HTTPException, Request, FastAPI, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, FastAPI, Form
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from typing import Optional
 from uuid import uuid4
 from pydantic import BaseModel
-from src.chatbot.rag_engine import RAGEngine
-from fastapi import UploadFile, File
-from typing import List
-import os
-import shutil
+from config.settings import settings
+from src.api.uploads import receive_upload
+from src.api.warmup import EngineNotReady, EngineWarmup
+from src.chatbot.tenants import is_valid_name
+from src.chatbot.sessions import is_valid_session_id
+from src.utils import metrics
+from src.utils.logs import bind_session
+import asyncio
+import hmac
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["chat"])
-_engine = RAGEngine()
+health_router = APIRouter(tags=["health"])
+
+# RAGEngine + UploadJobManager, built in the background (see start_warmup)
+_warmup = EngineWarmup()
+
+def start_warmup():
+    _warmup.start()
+
+def _ready():
+    """(engine, upload_jobs), or 503 while the engine is still warming up."""
+    try:
+        return _warmup.get()
+    except EngineNotReady as e:
+        detail = str(e) if _warmup.state == "failed" else "The assistant is still starting up, please retry in a few seconds"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
 
 def register_handlers(app: FastAPI):
     @app.exception_handler(RequestValidationError)
@@ -25,92 +47,195 @@ def register_handlers(app: FastAPI):
 class ChatRequest(BaseModel):
     message: Optional[str] = None
     session_id: Optional[str] = None
+    tenant: Optional[str] = None
+    community: Optional[str] = None
 
-@router.post("/chat")
-async def chat(req: Request):
+def _require_session_id(session_id: str) -> None:
+    if not is_valid_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+
+async def _parse_chat_request(req: Request):
+    """Validate a chat body and return (session_id, message, tenant, community)."""
     try:
         data = await req.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Body must be JSON")
 
-    print("DEBUG /api/chat payload:", data)
-
     message = (data.get("message") or data.get("question") or "").strip()
     if not message:
         raise HTTPException(status_code=400, detail="Field 'message' is required")
 
     session_id = data.get("session_id") or str(uuid4())
+    _require_session_id(session_id)
+    bind_session(session_id)
+
+    # Which tenant's documents (besides the shared ones) the question may be answered from
+    tenant = data.get("tenant") or None
+    community = data.get("community") or None
+    for field, value in (("tenant", tenant), ("community", community)):
+        if value is not None and not (isinstance(value, str) and is_valid_name(value)):
+            raise HTTPException(status_code=400, detail=f"Invalid {field}")
+    if community and not tenant:
+        raise HTTPException(status_code=400, detail="Field 'community' requires 'tenant'")
+    logger.debug("Chat request", extra={"message_chars": len(message), "tenant": tenant})
+    return session_id, message, tenant, community
 
-    result = _engine.qa_with_history(session_id, message)
-    return result
+@health_router.get("/health")
+async def health():
+    """Liveness: the process is up and serving (does not wait for the engine)."""
+    return {"status": "ok"}
 
-ALLOWED_EXTS = {".txt", ".md", ".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
+@health_router.get("/ready")
+async def ready():
+    """Readiness: 200 once the engine is warm, 503 while warming up or if it failed."""
+    status = _warmup.status()
+    return JSONResponse(status_code=200 if status["state"] == "ready" else 503, content=status)
 
-@router.post("/upload")
-async def upload(files: List[UploadFile] = File(...), session_id: str = Form(...)):
+@health_router.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus exposition: per-stage latency histograms and engine gauges."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@router.post("/chat")
+async def chat(req: Request):
+    session_id, message, tenant, community = await _parse_chat_request(req)
+    engine, _ = _ready()
+
+    try:
+        return await engine.aqa_with_history(session_id, message, tenant, community)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="The assistant took too long to answer, please retry")
+    except Exception as e:
+        # Still rate limited upstream after retries and fallbacks (openai.RateLimitError)
+        if getattr(e, "status_code", None) == 429:
+            raise HTTPException(status_code=503, detail="The assistant is busy, please retry shortly",
+                                headers={"Retry-After": "10"})
+        raise
+
+@router.post("/chat/stream")
+async def chat_stream(req: Request):
+    """
+    Same as /chat, but streams the answer as Server-Sent Events:
+    'token' events while generating, then 'citations' and 'done'.
+    """
+    session_id, message, tenant, community = await _parse_chat_request(req)
+    engine, _ = _ready()
+
+    async def events():
+        try:
+            async for ev in engine.astream_with_history(session_id, message, tenant, community):
+                yield f"event: {ev['event']}\ndata: {json.dumps(ev['data'])}\n\n"
+        except Exception:
+            logger.exception("Stream failed")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Answer generation failed'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/upload", openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {
+    "schema": {
+        "type": "object",
+        "required": ["session_id", "files"],
+        "properties": {
+            "session_id": {"type": "string"},
+            "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+        },
+    },
+}}}})
+async def upload(request: Request):
     """
     Accept files and ADD to session-specific directory.
     Files accumulate - previous uploads are NOT deleted.
-    """
-    saved = []
-    rejected = []
-    
-    # Create session directory if it doesn't exist
-    session_dir = os.path.join("data", "uploads", session_id)
-    os.makedirs(session_dir, exist_ok=True)
+    Indexing runs in the background; poll /api/upload/{job_id} for progress.
     
-    print(f"[upload] Session directory: {session_dir}")
-    print(f"[upload] Files before upload: {os.listdir(session_dir) if os.path.exists(session_dir) else []}")
-
-    for f in files:
-        name = os.path.basename(f.filename or "")
-        ext = os.path.splitext(name)[1].lower()
-        if ext not in ALLOWED_EXTS:
-            rejected.append(name or "unnamed")
-            continue
-        
-        # Create unique filename if file already exists
-        safe = name.replace("/", "_").replace("\\", "_")
-        path = os.path.join(session_dir, safe)
-        
-        # If file exists, add a number to make it unique
-        counter = 1
-        while os.path.exists(path):
-            name_part, ext_part = os.path.splitext(safe)
-            path = os.path.join(session_dir, f"{name_part}_{counter}{ext_part}")
-            counter += 1
-        
-        content = await f.read()
-        with open(path, "wb") as out:
-            out.write(content)
-        saved.append(os.path.basename(path))
-    
-    print(f"[upload] Files after upload: {os.listdir(session_dir)}")
+    The body is streamed to disk as it arrives (see uploads.receive_upload):
+    413 past the per-file or per-session size limit.
+    """
+    _, jobs = _ready()
+    received = await receive_upload(request)
+    session_id = received["session_id"]
+    bind_session(session_id)
+    saved, rejected, duplicates = received["saved"], received["rejected"], received["duplicates"]
+    logger.info("Upload saved %d file(s), rejected %d, %d duplicate(s)", len(saved), len(rejected), len(duplicates))
 
-    # Rebuild session index with ALL files in the directory
-    _engine.build_session_index(session_id, session_dir)
+    # Index only the files from this request, in the background
+    job = jobs.submit(session_id, received["paths"])
 
-    return {"saved": saved, "rejected": rejected, "count": len(saved)}
+    return {"job_id": job["job_id"], "status": job["status"], "saved": saved, "rejected": rejected,
+            "duplicates": duplicates, "count": len(saved)}
+
+@router.get("/upload/{job_id}")
+async def upload_status(job_id: str):
+    """
+    Report indexing progress for an upload job, including per-file status
+    (queued, processing, indexed, duplicate, failed).
+    """
+    _, jobs = _ready()
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown upload job")
+    return job
 
 @router.post("/clear-session")
 async def clear_session(session_id: str = Form(...)):
     """
     Clear uploaded files and session index for a given session.
     """
-    print(f"[clear-session] Clearing session: {session_id}")
-    
-    # Delete uploaded files
-    session_dir = os.path.join("data", "uploads", session_id)
-    if os.path.exists(session_dir):
-        print(f"[clear-session] Deleting directory: {session_dir}")
-        shutil.rmtree(session_dir)
-    
-    # Clear session index from memory
-    _engine.clear_session_index(session_id)
+    _require_session_id(session_id)
+    bind_session(session_id)
+    engine, jobs = _ready()
     
-    # Clear chat history
-    from src.chatbot.rag_engine import _SESSION_MEMORY
-    if session_id in _SESSION_MEMORY:
-        del _SESSION_MEMORY[session_id]
+    # Delete uploaded files, session index and chat history
+    engine.clear_session(session_id)
+    jobs.forget_session(session_id)
     
-    return {"message": "Session cleared successfully"}
\ No newline at end of file
+    return {"message": "Session cleared successfully"}
+
+def _require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Admin endpoints need X-Admin-Token = ADMIN_TOKEN (and are off while it is unset)."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+admin_router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(_require_admin)])
+
+@admin_router.get("/index")
+async def index_status():
+    """Active permanent index version, the versions kept for rollback, and the last reload."""
+    engine, _ = _ready()
+    return {
+        "active": engine.permanent.version,
+        "rolled_back_from": engine.permanent.versions.state().get("rolled_back_from"),
+        "versions": engine.permanent.versions.list(),
+        "reload": engine.permanent.reload_status,
+    }
+
+@admin_router.post("/index/reload", status_code=202)
+async def reload_index():
+    """
+    Rebuild the permanent index from DOCS_DIR in the background and swap it in.
+    Poll GET /api/admin/index for the outcome; queries keep being served meanwhile.
+    This also lifts a rollback pin (automatic reloads leave a rolled-back version alone).
+    """
+    engine, _ = _ready()
+    status = engine.permanent.reload_in_background(force=True)
+    if status["state"] == "busy":
+        raise HTTPException(status_code=409, detail="A reload is already running")
+    return status
+
+class RollbackRequest(BaseModel):
+    version: Optional[str] = None
+
+@admin_router.post("/index/rollback")
+async def rollback_index(body: Optional[RollbackRequest] = None):
+    """Switch back to a kept version (default: the one active before the current one)."""
+    engine, _ = _ready()
+    try:
+        return await asyncio.to_thread(engine.permanent.rollback, body.version if body else None)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,322 @@
+# src/api/uploads.py
+
+import asyncio
+import codecs
+import hashlib
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, Request
+
+from config.settings import settings
+from src.chatbot.sessions import is_valid_session_id, session_upload_dir
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTS = {".txt", ".md", ".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
+
+_MB = 1 << 20
+# Uploads are written through a buffer of this size: fixed-size writes, bounded memory per file
+_WRITE_BLOCK = 1 << 20
+# Bytes of a file held back until its content has been checked against its extension
+_SNIFF_BYTES = 512
+# Room for multipart headers and form fields on top of the file bytes (Content-Length check)
+_FORM_OVERHEAD = 64 * 1024
+# Form fields other than files are small; anything longer is not a session id
+_MAX_FIELD_BYTES = 1024
+# Parts are staged in <uploads_dir>/.incoming/<request>/ and moved into the session dir at the end
+INCOMING_DIR = ".incoming"
+
+_MAGIC = {
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+    ".tif": (b"II*\x00", b"MM\x00*"),
+    ".tiff": (b"II*\x00", b"MM\x00*"),
+    ".bmp": (b"BM",),
+}
+
+
+def sniff(ext: str, head: bytes) -> bool:
+    """Whether the first bytes of a file match its extension (text: UTF-8 without NUL bytes)."""
+    if ext in (".txt", ".md"):
+        if b"\x00" in head:
+            return False
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(head)  # a cut-off last character is fine
+        except UnicodeDecodeError:
+            return False
+        return True
+    if ext == ".pdf":
+        return b"%PDF-" in head[:1024]  # PDF readers accept a little junk before the header
+    if ext == ".webp":
+        return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+    magic = _MAGIC.get(ext)
+    return bool(magic) and head.startswith(magic)
+
+
+def session_bytes(session_id: str) -> int:
+    """Bytes of the files currently stored for a session."""
+    try:
+        with os.scandir(session_upload_dir(session_id)) as entries:
+            return sum(e.stat().st_size for e in entries if e.is_file())
+    except FileNotFoundError:
+        return 0
+
+
+class _StagedFile:
+    """One uploaded file, written to a staging path and hashed as its bytes arrive."""
+
+    def __init__(self, name: str, ext: str, path: str):
+        self.name = name
+        self.ext = ext
+        self.path = path
+        self.size = 0
+        self.rejected = False
+        self._sha256 = hashlib.sha256()
+        self._head = bytearray()
+        self._fh = None
+
+    @property
+    def digest(self) -> str:
+        return self._sha256.hexdigest()
+
+    def write(self, data: bytes) -> None:
+        if self.rejected:
+            return
+        self.size += len(data)
+        self._sha256.update(data)
+        if self._fh is not None:
+            self._fh.write(data)
+            return
+        self._head += data
+        if len(self._head) >= _SNIFF_BYTES:
+            self._open()
+
+    def close(self) -> None:
+        if self._fh is None and not self.rejected:
+            self._open()  # shorter than _SNIFF_BYTES
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def discard(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _open(self) -> None:
+        if not sniff(self.ext, bytes(self._head[:_SNIFF_BYTES])):
+            self.rejected = True
+        else:
+            self._fh = open(self.path, "wb", buffering=_WRITE_BLOCK)
+            self._fh.write(self._head)
+        self._head = bytearray()
+
+
+class _UploadReceiver:
+    """
+    multipart/form-data callbacks that stream "files" parts to staging files
+    and collect the "session_id" field, enforcing the size limits as bytes arrive.
+    """
+
+    def __init__(self, staging: str):
+        self.staging = staging
+        self.session_id: Optional[str] = None
+        self.files: List[_StagedFile] = []
+        self.rejected: List[str] = []
+        self.received = 0  # file bytes so far
+        self._stored = 0   # bytes already stored for the session, once session_id is known
+        self._headers: Dict[bytes, bytes] = {}
+        self._field, self._value = bytearray(), bytearray()
+        self._part: Optional[Dict] = None
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._value.extend(data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._part = None
+
+    def _on_header_end(self) -> None:
+        self._headers[bytes(self._field).lower()] = bytes(self._value)
+        self._field, self._value = bytearray(), bytearray()
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        field = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        part = {"field": field, "is_file": filename is not None, "size": 0, "file": None, "value": bytearray()}
+        self._part = part
+        if filename is None or field != "files":
+            return  # files under other field names are read and dropped
+        if self.session_id is None:
+            # The quota needs the session's stored bytes before the first file byte arrives
+            raise HTTPException(status_code=400, detail="session_id must be sent before the files")
+        if len(self.files) + len(self.rejected) >= settings.upload_max_files:
+            raise HTTPException(status_code=400, detail=f"At most {settings.upload_max_files} files per upload")
+        name = os.path.basename(filename.decode("utf-8", "replace"))
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in ALLOWED_EXTS:
+            self.rejected.append(name or "unnamed")
+            return
+        safe = name.replace("/", "_").replace("\\", "_")
+        part["file"] = _StagedFile(safe, ext, os.path.join(self.staging, uuid4().hex))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._part
+        n = end - start
+        part["size"] += n
+        if not part["is_file"]:
+            if part["size"] > _MAX_FIELD_BYTES:
+                raise HTTPException(status_code=400, detail=f"Form field {part['field']!r} is too long")
+            part["value"].extend(data[start:end])
+            return
+        # Rejected files count as well: nothing may stream without bound
+        if part["size"] > settings.upload_max_file_mb * _MB:
+            raise HTTPException(status_code=413, detail=f"Files are limited to {settings.upload_max_file_mb} MB each")
+        if part["file"] is not None:
+            self.received += n
+            self._check_quota()
+            part["file"].write(data[start:end])
+
+    def _on_part_end(self) -> None:
+        part = self._part
+        staged = part["file"]
+        if staged is not None:
+            staged.close()
+            if staged.rejected:
+                self.rejected.append(staged.name)
+            else:
+                self.files.append(staged)
+        elif part["field"] == "session_id":
+            session_id = part["value"].decode("utf-8", "replace")
+            if not is_valid_session_id(session_id):
+                raise HTTPException(status_code=400, detail="Invalid session_id")
+            self.session_id = session_id
+            self._stored = session_bytes(session_id)
+            self._check_quota()
+
+    def _check_quota(self) -> None:
+        if self.session_id is not None and self._stored + self.received > settings.upload_session_quota_mb * _MB:
+            raise HTTPException(
+                status_code=413, detail=f"Uploads are limited to {settings.upload_session_quota_mb} MB per session"
+            )
+
+
+async def receive_upload(request: Request) -> Dict:
+    """
+    Stream a multipart upload ("session_id" field, "files" parts) into the session's upload dir.
+
+    Files are never held in memory: each part is written to disk in fixed-size
+    blocks and hashed as it arrives. The request fails with 413 as soon as a file
+    grows past UPLOAD_MAX_FILE_MB or the session's files past
+    UPLOAD_SESSION_QUOTA_MB (already on arrival of the headers when
+    Content-Length alone exceeds the quota), and then stores nothing. The
+    session_id field must precede the files (400 otherwise). The session's quota
+    is checked against what it had on disk when its session_id arrived, so
+    concurrent uploads to one session may overshoot it slightly.
+
+    Parsing (disk writes, hashing) and storing run on worker threads, the
+    body in batches of about _WRITE_BLOCK bytes, so the event loop only
+    receives the body.
+
+    A file is rejected when its extension is not allowed or its first bytes
+    do not match it. A file whose content the session already stores (same size,
+    then same SHA-256) is a duplicate and is not stored again. A name taken by
+    different content gets the content hash appended, e.g. lease_3fa4b2c1.pdf.
+
+    Returns:
+        {"session_id", "saved": names, "paths": stored paths, "rejected": names, "duplicates": names}
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > settings.upload_session_quota_mb * _MB + _FORM_OVERHEAD:
+        raise HTTPException(
+            status_code=413, detail=f"Uploads are limited to {settings.upload_session_quota_mb} MB per session"
+        )
+
+    staging = os.path.join(settings.uploads_dir, INCOMING_DIR, uuid4().hex)
+    os.makedirs(staging)
+    receiver = _UploadReceiver(staging)
+    try:
+        parser = MultipartParser(boundary, receiver.callbacks())
+        pending, pending_bytes = [], 0
+        async for chunk in request.stream():
+            pending.append(chunk)
+            pending_bytes += len(chunk)
+            if pending_bytes >= _WRITE_BLOCK:
+                await asyncio.to_thread(parser.write, b"".join(pending))
+                pending, pending_bytes = [], 0
+        if pending:
+            await asyncio.to_thread(parser.write, b"".join(pending))
+        parser.finalize()
+        if receiver.session_id is None:
+            raise HTTPException(status_code=400, detail="session_id is required")
+        return await asyncio.to_thread(_store, receiver.session_id, receiver.files, receiver.rejected)
+    finally:
+        part = receiver._part
+        if part is not None and part["file"] is not None:
+            part["file"].discard()  # cut off mid-file
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _store(session_id: str, files: List[_StagedFile], rejected: List[str]) -> Dict:
+    """Move staged files into the session dir, skipping content the session already has."""
+    from src.chatbot.index_cache import file_sha256  # pulls in the loaders; the engine is warm by now
+
+    session_dir = session_upload_dir(session_id)
+    os.makedirs(session_dir, exist_ok=True)
+    # Stored files by size; only those of a staged file's size are ever hashed
+    by_size: Dict[int, List[str]] = {}
+    with os.scandir(session_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                by_size.setdefault(entry.stat().st_size, []).append(entry.path)
+    digests: Dict[str, str] = {}
+
+    def stored_digest(path: str) -> str:
+        if path not in digests:
+            digests[path] = file_sha256(path)
+        return digests[path]
+
+    saved, paths, duplicates = [], [], []
+    for staged in files:
+        digest = staged.digest
+        candidates = by_size.setdefault(staged.size, [])
+        if any(stored_digest(p) == digest for p in candidates):
+            duplicates.append(staged.name)
+            continue
+        path = os.path.join(session_dir, staged.name)
+        if os.path.exists(path):
+            stem, ext = os.path.splitext(staged.name)
+            path = os.path.join(session_dir, f"{stem}_{digest[:8]}{ext}")
+            if os.path.exists(path):
+                path = os.path.join(session_dir, f"{stem}_{digest}{ext}")
+        os.replace(staged.path, path)
+        candidates.append(path)
+        digests[path] = digest
+        saved.append(os.path.basename(path))
+        paths.append(path)
+    return {"session_id": session_id, "saved": saved, "paths": paths, "rejected": rejected, "duplicates": duplicates}
@@ -0,0 +1,89 @@
+# src/api/warmup.py
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from src.utils.metrics import register_state
+
+logger = logging.getLogger(__name__)
+
+# Process start, as close as we can get without hooking the interpreter
+_PROCESS_START = time.time()
+
+
+class EngineNotReady(Exception):
+    """Raised while the engine is still warming up (or failed to)."""
+
+
+class EngineWarmup:
+    """
+    Builds the RAGEngine and the upload job manager on a background thread.
+
+    Importing the chatbot stack (langchain, sentence-transformers, FAISS) and
+    loading the model and permanent index take seconds to minutes, so none of it
+    happens at import time: the app binds and serves /health and the frontend
+    immediately, and /ready reports 200 once the engine is warm.
+
+    States: cold -> warming -> ready | failed
+    """
+
+    def __init__(self):
+        self.state = "cold"
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self._engine = None
+        self._jobs = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._done = threading.Event()  # set once warm-up finished, either way
+
+    def start(self) -> None:
+        """Start warming up in the background (no-op if already started)."""
+        with self._lock:
+            if self.state != "cold":
+                return
+            self.state = "warming"
+        threading.Thread(target=self._build, name="engine-warmup", daemon=True).start()
+
+    def get(self):
+        """Return (engine, upload_jobs), starting warm-up if nobody has yet."""
+        if not self._ready.is_set():
+            self.start()
+            raise EngineNotReady(self.error or "Engine is warming up")
+        return self._engine, self._jobs
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up finishes; True if the engine is ready."""
+        self.start()
+        self._done.wait(timeout)
+        return self._ready.is_set()
+
+    def status(self) -> Dict:
+        return {"state": self.state, "error": self.error, "timings": dict(self.timings)}
+
+    def _build(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            from src.chatbot.rag_engine import RAGEngine
+            from src.chatbot.upload_jobs import UploadJobManager
+            self.timings["import_s"] = round(time.perf_counter() - t0, 3)
+
+            t1 = time.perf_counter()
+            engine = RAGEngine()
+            self._jobs = UploadJobManager(engine)
+            self._engine = engine
+            self.timings["build_s"] = round(time.perf_counter() - t1, 3)
+            self.timings["ready_after_start_s"] = round(time.time() - _PROCESS_START, 3)
+            self.state = "ready"
+            self._ready.set()
+            logger.info("Engine ready", extra={"timings": self.timings})
+            register_state(engine.stats)
+        except Exception as e:
+            # Stay failed (no retry loop): /ready keeps reporting it until restart
+            self.error = f"Engine failed to start: {e}"
+            self.state = "failed"
+            logger.exception(self.error)
+        finally:
+            self._done.set()
@@ -0,0 +1,195 @@
+# src/chatbot/ann_index.py
+
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+
+import faiss
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# flat: exact search (langchain's default IndexFlatL2)
+# ivf_flat: inverted lists over full vectors, searched `ivf_nprobe` lists at a time
+# ivf_pq: inverted lists over product-quantized vectors (pq_m bytes per vector at 8 bits)
+# hnsw: graph index over full vectors, no training, tuned with `hnsw_ef_search`
+# sq8: exact scan over 8-bit scalar-quantized vectors (4x smaller than flat)
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8")
+
+# FAISS k-means wants ~39 training points per centroid for stable clusters
+_POINTS_PER_CENTROID = 39
+
+
+def index_config(index_type: Optional[str] = None) -> Dict:
+    """
+    Build-time parameters of an index type, as recorded in the index manifest.
+
+    Search-time knobs (nprobe, efSearch) are left out on purpose: changing them
+    must not force a rebuild.
+    """
+    index_type = (index_type or settings.index_type).lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+    config: Dict = {"type": index_type}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        config["nlist"] = settings.ivf_nlist
+    if index_type == "ivf_pq":
+        config["pq_m"] = settings.pq_m
+        config["pq_bits"] = settings.pq_bits
+    if index_type == "hnsw":
+        config["hnsw_m"] = settings.hnsw_m
+        config["ef_construction"] = settings.hnsw_ef_construction
+    return config
+
+
+def auto_nlist(n: int) -> int:
+    """~4*sqrt(n) lists, capped so every centroid gets enough training points (0 if n is tiny)."""
+    return min(int(4 * math.sqrt(n)), n // _POINTS_PER_CENTROID)
+
+
+def _pq_subquantizers(d: int, m: int) -> int:
+    """Largest divisor of d that is <= m (PQ needs d % m == 0)."""
+    m = max(1, min(m, d))
+    while d % m:
+        m -= 1
+    return m
+
+
+def build_index(vectors: np.ndarray, config: Dict) -> faiss.Index:
+    """
+    Create, train and fill a FAISS index for `vectors` (float32, shape n x d).
+
+    Corpora too small to train the requested index type get a flat index instead;
+    row i of `vectors` is always id i, matching langchain's index_to_docstore_id.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    index_type = config.get("type", "flat")
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = config.get("nlist") or auto_nlist(n)
+        # k-means cannot train fewer points than centroids (nlist lists, 2**bits PQ codes)
+        min_points = nlist
+        if index_type == "ivf_pq":
+            min_points = max(min_points, 2 ** config["pq_bits"])
+        if nlist < 2 or n < min_points:
+            logger.warning("%d vectors are too few to train %s (need %d), using flat", n, index_type, min_points)
+            index_type = "flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif index_type == "ivf_flat":
+        index = faiss.index_factory(d, f"IVF{nlist},Flat")
+    elif index_type == "ivf_pq":
+        m = _pq_subquantizers(d, config["pq_m"])
+        index = faiss.index_factory(d, f"IVF{nlist},PQ{m}x{config['pq_bits']}")
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, config["hnsw_m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit)
+    else:
+        raise ValueError(f"Unknown index type {index_type!r}")
+
+    if not index.is_trained:
+        t0 = time.perf_counter()
+        index.train(vectors)
+        logger.info("Trained %s on %d vectors in %.2fs", index_type, n, time.perf_counter() - t0)
+    index.add(vectors)
+    tune(index)
+    return index
+
+
+def tune(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> faiss.Index:
+    """Apply search-time parameters (defaults from settings); a no-op for flat/sq8."""
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe or settings.ivf_nprobe, ivf.nlist)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search or settings.hnsw_ef_search
+    return index
+
+
+def reconstruct(index: faiss.Index, positions: Sequence[int]) -> np.ndarray:
+    """
+    Stored vectors at `positions` (float32, one row each), decoded from the index.
+
+    Exact for flat and HNSW indexes, approximate for sq8/PQ codes. IVF indexes
+    get their id -> list map built on first use.
+    """
+    try:
+        return np.vstack([index.reconstruct(int(p)) for p in positions]).astype(np.float32)
+    except RuntimeError:
+        ivf = _ivf(index)
+        if ivf is None:
+            raise
+        ivf.make_direct_map()
+        return np.vstack([index.reconstruct(int(p)) for p in positions]).astype(np.float32)
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """Serialized size of an index, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).size)
+
+
+def recall_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    configs: Sequence[Dict],
+    k: int = 10,
+    nprobes: Sequence[int] = (1, 4, 8, 16, 32),
+    ef_searches: Sequence[int] = (16, 32, 64, 128),
+) -> List[Dict]:
+    """
+    Measure recall@k and per-query latency of each index config against exact search.
+
+    Returns:
+        One row per (config, search setting): type, param, recall, p50/p95 ms, bytes
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for config in configs:
+        index = build_index(vectors, config)
+        settings_to_try: List[Dict] = [{}]
+        if _ivf(index) is not None:
+            settings_to_try = [{"nprobe": p} for p in nprobes]
+        elif getattr(faiss.downcast_index(index), "hnsw", None) is not None:
+            settings_to_try = [{"ef_search": ef} for ef in ef_searches]
+
+        size = index_bytes(index)
+        for params in settings_to_try:
+            tune(index, **params)
+            latencies = []
+            found = np.empty_like(truth)
+            for i in range(len(queries)):
+                t0 = time.perf_counter()
+                _, found[i:i + 1] = index.search(queries[i:i + 1], k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+            rows.append({
+                "type": config["type"],
+                "param": ", ".join(f"{key}={value}" for key, value in params.items()) or "-",
+                "recall": hits / (len(queries) * k),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "bytes": size,
+            })
+    return rows
+
+
+def _ivf(index: faiss.Index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
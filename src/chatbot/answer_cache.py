@@ -0,0 +1,144 @@
+# src/chatbot/answer_cache.py
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop punctuation so trivial rewordings share a key."""
+    text = re.sub(r"[^\w\s$%.]", " ", (query or "").lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(".")
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of answers from the permanent knowledge base.
+
+    Exact hits are keyed on (normalized query, ids of the retrieved chunks), so
+    an answer is only reused when retrieval would feed the LLM the same context.
+    Optionally (`similarity` > 0), a paraphrase is answered from the cache: a query
+    whose embedding has cosine similarity >= `similarity` with a cached query
+    that retrieved the same chunks. Similarity alone is not enough: questions
+    differing in one number or name ("after 5 days" / "after 10 days") embed
+    almost identically.
+
+    Every entry belongs to one permanent index version; set_version() with a new
+    version empties the cache. Entries are also tagged with a `scope` (the
+    tenant/community a question was asked for) and only served within it.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        similarity: Optional[float] = None,
+    ):
+        self.max_entries = settings.answer_cache_size if max_entries is None else max_entries
+        self.ttl = settings.answer_cache_ttl if ttl_seconds is None else ttl_seconds
+        self.similarity = settings.answer_cache_similarity if similarity is None else similarity
+
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> {"result", "created", "vector"}; most recently used last
+        self._entries: "OrderedDict[Tuple[str, str, Tuple[str, ...]], Dict]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.enabled and self.similarity > 0
+
+    def set_version(self, version: Optional[str]) -> None:
+        """Drop every entry if the permanent index changed."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def get(self, query: str, chunk_ids: Sequence[str], scope: str = "") -> Optional[Dict]:
+        key = (scope, normalize_query(query), tuple(chunk_ids))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry["result"])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def find_similar(self, query_vector: List[float], chunk_ids: Sequence[str], scope: str = "") -> Optional[Dict]:
+        """
+        Return the cached answer of the most similar cached query in `scope` that
+        retrieved the same `chunk_ids`, if similar enough.
+        """
+        now = time.time()
+        chunk_ids = tuple(chunk_ids)
+        with self._lock:
+            keyed = [(k, e) for k, e in self._entries.items()
+                     if k[0] == scope and k[2] == chunk_ids and e["vector"] is not None
+                     and now - e["created"] <= self.ttl]
+            if not keyed:
+                return None
+            matrix = np.stack([e["vector"] for _k, e in keyed])
+            q = _unit(query_vector)
+            scores = matrix @ q
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity:
+                return None
+            key, entry = keyed[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry["result"])
+
+    def put(
+        self,
+        query: str,
+        chunk_ids: Sequence[str],
+        result: Dict,
+        query_vector: Optional[List[float]] = None,
+        version: Optional[str] = None,
+        scope: str = "",
+    ) -> None:
+        """Store an answer computed against index `version` (ignored if that version is gone)."""
+        key = (scope, normalize_query(query), tuple(chunk_ids))
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = {
+                "result": dict(result),
+                "created": time.time(),
+                "vector": _unit(query_vector) if query_vector is not None else None,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
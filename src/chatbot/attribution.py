@@ -0,0 +1,106 @@
+# src/chatbot/attribution.py
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+# Fragments shorter than this ("Yes.", "1.") are not attributed on their own
+_MIN_SENTENCE_CHARS = 12
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences (and lines) of an answer, without fragments too short to attribute."""
+    parts = (s.strip() for s in _SENTENCE_RE.split(text or ""))
+    return [s for s in parts if len(s) >= _MIN_SENTENCE_CHARS]
+
+
+def _unit(vectors) -> np.ndarray:
+    v = np.asarray(vectors, dtype=np.float32)
+    return v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+
+
+def attribute(
+    answer_text: str,
+    docs: List[Document],
+    chunk_vectors: Optional[np.ndarray],
+    embeddings,
+    min_score: Optional[float] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Attribute each sentence of an answer to the chunk it is closest to.
+
+    The sentences are embedded in one batch and compared with the chunks'
+    stored vectors (one cosine matrix, sentences x chunks); the chunks are not
+    embedded again. A sentence whose best similarity is under `min_score`
+    (a connective, or a claim no chunk makes) is not attributed. Chunks of the
+    same source and page share one citation. If no sentence is attributed,
+    the best matching chunk (or the top ranked one) is cited.
+
+    Args:
+        answer_text: The cleaned answer
+        docs: Chunks that were in the prompt, best ranked first
+        chunk_vectors: Their stored embeddings (rows aligned with `docs`); None embeds their text instead
+        embeddings: The model the chunks were embedded with
+        min_score: Minimum cosine similarity (default settings.citation_min_score)
+
+    Returns:
+        (citations, attributions): citations as {"id", "source", "page"?, "score"} in order of
+        first use; attributions as {"sentence", "id", "source", "page"?, "score"}, one per attributed sentence
+    """
+    if not docs:
+        return [], []
+    min_score = settings.citation_min_score if min_score is None else min_score
+    sentences = split_sentences(answer_text)
+    if not sentences:
+        return [_citation(1, docs[0], None)], []
+
+    if chunk_vectors is None:
+        logger.debug("No stored vectors for %d chunks; embedding them with the answer", len(docs))
+        vectors = embeddings.embed_documents(sentences + [d.page_content for d in docs])
+        sentence_vectors, chunk_vectors = vectors[:len(sentences)], vectors[len(sentences):]
+    else:
+        sentence_vectors = embeddings.embed_documents(sentences)
+
+    scores = _unit(sentence_vectors) @ _unit(chunk_vectors).T
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(sentences)), best]
+
+    citations: List[Dict] = []
+    ids: Dict[Tuple, int] = {}
+    attributions: List[Dict] = []
+    for sentence, j, score in zip(sentences, best.tolist(), best_scores.tolist()):
+        if score < min_score:
+            continue
+        doc = docs[j]
+        key = (_source(doc), doc.metadata.get("page"))
+        if key not in ids:
+            ids[key] = len(citations) + 1
+            citations.append(_citation(ids[key], doc, score))
+        cited = citations[ids[key] - 1]
+        cited["score"] = max(cited["score"], round(score, 3))
+        attributions.append({"sentence": sentence, **cited, "score": round(score, 3)})
+
+    if not citations:
+        j = int(scores.max(axis=0).argmax())
+        citations = [_citation(1, docs[j], float(scores[:, j].max()))]
+    return citations, attributions
+
+
+def _source(doc: Document) -> str:
+    return doc.metadata.get("source") or doc.metadata.get("path") or "document"
+
+
+def _citation(citation_id: int, doc: Document, score: Optional[float]) -> Dict:
+    citation = {"id": citation_id, "source": _source(doc)}
+    if doc.metadata.get("page") is not None:
+        citation["page"] = doc.metadata["page"]
+    citation["score"] = round(score, 3) if score is not None else None
+    return citation
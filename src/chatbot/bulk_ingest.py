@@ -0,0 +1,254 @@
+# src/chatbot/bulk_ingest.py
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from config.settings import settings
+from src.chatbot.ann_index import index_config
+from src.chatbot.index_cache import MANIFEST_VERSION, build_manifest, load_manifest, save_manifest
+from src.data.loaders import document_tags
+
+logger = logging.getLogger(__name__)
+
+_PATH_TAGS = ("tenant", "community", "doc_type")
+
+
+def _key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _write_json(path: Path, data) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _extract_file(path: str, chunk_size: int, chunk_overlap: int) -> List[Dict]:
+    """Load, OCR and chunk one file (runs in a worker process)."""
+    from src.data.loaders import load_file
+    from src.data.processors import chunk_documents
+
+    chunks = chunk_documents(load_file(Path(path), workers=1), chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return [{"page_content": c.page_content, "metadata": c.metadata} for c in chunks]
+
+
+class BulkIngest:
+    """
+    Offline build of the permanent index for a large document tree, in three stages:
+
+    1. extract: files are loaded/OCR'd/chunked on a process pool; each finished
+       file is checkpointed as <work>/extracted/<key>/<sha256>.json
+    2. embed:   files are grouped into shards of `shard_size`; each shard's chunk
+       vectors are checkpointed as <work>/shards/<key>/shard_NNNNN.npy
+    3. merge:   shard vectors are split by tenant partition into FAISS indexes
+       (settings.index_type), written to `index_dir` (see partitions.PartitionedStore)
+       with their chunk stores, BM25 indexes and the manifest
+
+    Checkpoints are keyed by file content hash and by the chunking/embedding
+    parameters, so a crashed or repeated run only redoes unfinished (or changed)
+    files and shards. The manifest matches what PartitionedStore.build_or_load_dir
+    expects, so the web process simply loads the result.
+    """
+
+    def __init__(
+        self,
+        docs_dir: str,
+        index_dir: str,
+        work_dir: Optional[str] = None,
+        shard_size: int = 100,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        index_type: Optional[str] = None,
+    ):
+        self.docs_dir = docs_dir
+        self.index_dir = index_dir
+        self.work_dir = Path(work_dir or f"{index_dir.rstrip('/')}.ingest")
+        self.shard_size = max(1, shard_size)
+        self.workers = max(1, workers or settings.loader_workers)
+        self.chunk_size = chunk_size or settings.chunk_size
+        self.chunk_overlap = settings.chunk_overlap if chunk_overlap is None else chunk_overlap
+        self.index_config = index_config(index_type)
+
+        from src.chatbot.embeddings import embedding_id
+
+        # Model and backend the vectors come from (see embeddings.embedding_id)
+        self.embedding_id = embedding_id()
+        chunk_key = _key(MANIFEST_VERSION, self.chunk_size, self.chunk_overlap)
+        self.extracted_dir = self.work_dir / "extracted" / chunk_key
+        self.shards_dir = self.work_dir / "shards" / _key(chunk_key, self.embedding_id)
+        self.stats: Dict[str, Dict] = {}
+
+    def run(self) -> Dict[str, Dict]:
+        """Run all stages; returns per-stage stats."""
+        from src.chatbot.partitions import partition_key
+
+        started = time.perf_counter()
+        self.extracted_dir.mkdir(parents=True, exist_ok=True)
+        self.shards_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest = build_manifest(
+            self.docs_dir, self.embedding_id, self.chunk_size, self.chunk_overlap,
+            load_manifest(self.index_dir), index=self.index_config,
+        )
+        # Identical files are indexed once per partition (first path wins), like session uploads
+        files, seen = [], set()
+        for rel, entry in manifest["files"].items():
+            try:
+                key = (partition_key(document_tags(rel)), entry["sha256"])
+            except ValueError as e:
+                logger.warning("Skipping %s: %s", rel, e)
+                continue
+            if key not in seen:
+                seen.add(key)
+                files.append((rel, entry["sha256"], entry["size"]))
+        logger.info("%d files under %s (%d duplicates), work dir %s",
+                    len(files), self.docs_dir, len(manifest["files"]) - len(files), self.work_dir)
+
+        self.extract(files)
+        shards = self.embed(files)
+        self.merge(files, shards)
+        save_manifest(self.index_dir, manifest)
+
+        self.stats["total"] = {"seconds": round(time.perf_counter() - started, 2)}
+        logger.info("Done in %ss -> %s", self.stats["total"]["seconds"], self.index_dir)
+        return self.stats
+
+    def clean(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    # -------------------------
+    # Stages
+    # -------------------------
+    def extract(self, files: List[Tuple[str, str, int]]) -> None:
+        t0 = time.perf_counter()
+        todo = [(rel, sha, size) for rel, sha, size in files if not self._extracted_path(sha).exists()]
+
+        chunks = 0
+        if todo:
+            # "spawn": see loaders._run_ocr
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(todo)), mp_context=ctx) as pool:
+                futures = {
+                    pool.submit(
+                        _extract_file, str(Path(self.docs_dir) / rel), self.chunk_size, self.chunk_overlap
+                    ): (rel, sha)
+                    for rel, sha, _size in todo
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    rel, sha = futures[future]
+                    records = future.result()
+                    _write_json(self._extracted_path(sha), records)  # checkpoint
+                    chunks += len(records)
+                    if done % 50 == 0 or done == len(todo):
+                        logger.info("extract: %d/%d files", done, len(todo))
+
+        seconds = time.perf_counter() - t0
+        mb = sum(size for _rel, _sha, size in todo) / 1e6
+        self.stats["extract"] = {
+            "files": len(todo), "resumed": len(files) - len(todo), "chunks": chunks,
+            "seconds": round(seconds, 2),
+            "files_per_s": round(len(todo) / seconds, 2) if seconds else None,
+            "mb_per_s": round(mb / seconds, 2) if seconds else None,
+        }
+        logger.info("extract: %s", self.stats["extract"])
+
+    def embed(self, files: List[Tuple[str, str, int]]) -> List[Path]:
+        from src.chatbot.embeddings import get_embeddings
+
+        t0 = time.perf_counter()
+        embeddings = get_embeddings(settings.embed_model)
+        shards, embedded, resumed = [], 0, 0
+        for start in range(0, len(files), self.shard_size):
+            shas = [sha for _rel, sha, _size in files[start:start + self.shard_size]]
+            path = self.shards_dir / f"shard_{start // self.shard_size:05d}.npy"
+            meta_path = path.with_suffix(".json")
+            shards.append(path)
+            if path.exists() and meta_path.exists() and json.loads(meta_path.read_text()).get("files") == shas:
+                resumed += 1
+                continue
+
+            texts = [r["page_content"] for sha in shas for r in self._records(sha)]
+            vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+            tmp = path.with_suffix(".tmp.npy")
+            np.save(tmp, vectors)
+            os.replace(tmp, path)
+            _write_json(meta_path, {"files": shas, "chunks": len(texts)})  # checkpoint
+            embedded += len(texts)
+            logger.info("embed: shard %d (%d chunks)", len(shards), len(texts))
+
+        seconds = time.perf_counter() - t0
+        self.stats["embed"] = {
+            "shards": len(shards), "resumed": resumed, "chunks": embedded,
+            "seconds": round(seconds, 2),
+            "chunks_per_s": round(embedded / seconds, 2) if seconds else None,
+        }
+        logger.info("embed: %s", self.stats["embed"])
+        return shards
+
+    def merge(self, files: List[Tuple[str, str, int]], shards: List[Path]) -> None:
+        from src.chatbot.partitions import PartitionedStore, partition_key
+
+        t0 = time.perf_counter()
+        parts = [v for v in (np.load(p) for p in shards) if v.size]
+        if not parts:
+            raise RuntimeError(f"No text extracted from {self.docs_dir}; nothing to index")
+        vectors = np.concatenate(parts)
+
+        # Shards hold files in order, so each file's chunks are a run of rows
+        groups: Dict[str, Tuple[List[np.ndarray], List]] = defaultdict(lambda: ([], []))
+        row = 0
+        for f in files:
+            n = len(self._records(f[1]))
+            rows, group_files = groups[partition_key(document_tags(f[0]))]
+            rows.append(np.arange(row, row + n))
+            group_files.append(f)
+            row += n
+
+        store = PartitionedStore(index_dir=self.index_dir, index_type=self.index_config["type"], mmap=True)
+        store.save_prebuilt(
+            (key, vectors[np.concatenate(rows)], self._documents(group_files))
+            for key, (rows, group_files) in sorted(groups.items())
+            if sum(len(r) for r in rows)
+        )
+        seconds = time.perf_counter() - t0
+        self.stats["merge"] = {
+            "vectors": int(len(vectors)), "partitions": len(store.parts),
+            "index_type": self.index_config["type"], "seconds": round(seconds, 2),
+        }
+        logger.info("merge: %s", self.stats["merge"])
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _extracted_path(self, sha: str) -> Path:
+        return self.extracted_dir / f"{sha}.json"
+
+    def _records(self, sha: str) -> List[Dict]:
+        with open(self._extracted_path(sha), "r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def _documents(self, files: List[Tuple[str, str, int]]) -> Iterator[Document]:
+        """
+        Chunks of every file, in shard (= file) order, read one file at a time.
+        Checkpoints are shared by identical files, so path metadata is set from `rel` here.
+        """
+        for rel, sha, _size in files:
+            path = {"source": Path(rel).name, "fullpath": str((Path(self.docs_dir) / rel).resolve()),
+                    **document_tags(rel)}
+            for record in self._records(sha):
+                metadata = {k: v for k, v in record["metadata"].items() if k not in _PATH_TAGS}
+                yield Document(page_content=record["page_content"], metadata={**metadata, **path})
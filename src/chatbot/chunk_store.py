@@ -0,0 +1,149 @@
+# src/chatbot/chunk_store.py
+
+import json
+import mmap
+import os
+import shutil
+from typing import Iterable, Optional
+from uuid import uuid4
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+# Chunk records: concatenated UTF-8 JSON objects, plus an .npy of n+1 byte offsets
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "chunks.offsets.npy"
+
+# A memory-mapped store's files (FAISS index, chunk store, BM25) are written together into
+# <index_dir>/mmap/<generation>/, and <index_dir>/mmap/CURRENT names the live generation
+MMAP_DIR = "mmap"
+CURRENT_FILE = "CURRENT"
+
+# Zero-copy mmap of vector storage (flat codes and IVF lists) where FAISS supports it
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def write_chunks(index_dir: str, docs: Iterable[Document]) -> int:
+    """
+    Write documents in index order as a read-only chunk store.
+
+    Returns:
+        Number of chunks written
+    """
+    data_path = os.path.join(index_dir, CHUNKS_FILE)
+    offsets = [0]
+    with open(data_path + ".tmp", "wb") as fh:
+        for doc in docs:
+            record = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False)
+            fh.write(record.encode("utf-8"))
+            offsets.append(fh.tell())
+    # np.save appends .npy unless the name already ends with it
+    offsets_tmp = os.path.join(index_dir, "chunks.offsets.tmp.npy")
+    np.save(offsets_tmp, np.asarray(offsets, dtype=np.int64))
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(offsets_tmp, os.path.join(index_dir, OFFSETS_FILE))
+    return len(offsets) - 1
+
+
+def current_generation(index_dir: str) -> Optional[str]:
+    """Directory of the live generation of a memory-mapped store (None if it has none)."""
+    root = os.path.join(index_dir, MMAP_DIR)
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as fh:
+            name = fh.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(root, name) if name else None
+
+
+def new_generation(index_dir: str) -> str:
+    """Create an empty directory for the next generation's files."""
+    path = os.path.join(index_dir, MMAP_DIR, uuid4().hex)
+    os.makedirs(path)
+    return path
+
+
+def publish_generation(index_dir: str, generation_dir: str) -> None:
+    """
+    Make a fully written generation the live one (one atomic rename of CURRENT),
+    then delete the others. Processes that still map an old generation keep
+    valid pages after the unlink; readers that lost the race reopen (see VectorStore).
+    """
+    root = os.path.join(index_dir, MMAP_DIR)
+    name = os.path.basename(generation_dir)
+    path = os.path.join(root, CURRENT_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        fh.write(name)
+    os.replace(path + ".tmp", path)
+    for entry in os.listdir(root):
+        if entry not in (name, CURRENT_FILE) and os.path.isdir(os.path.join(root, entry)):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def remove_chunks(index_dir: str) -> None:
+    """Delete the memory-mapped files of a store (every generation, and the pre-generation layout)."""
+    shutil.rmtree(os.path.join(index_dir, MMAP_DIR), ignore_errors=True)
+    for name in (CHUNKS_FILE, OFFSETS_FILE):
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_index(path: str) -> faiss.Index:
+    """Open a saved FAISS index memory-mapped and read-only."""
+    return faiss.read_index(path, _MMAP_FLAGS)
+
+
+class ChunkStore(Docstore):
+    """
+    Read-only docstore over a memory-mapped chunk file.
+
+    Documents are addressed by their position in the FAISS index (as a string),
+    so no id mapping is held in memory and every process that opens the same
+    files shares one page-cache copy of the text.
+    """
+
+    def __init__(self, index_dir: str):
+        self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, CHUNKS_FILE), "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return all(os.path.exists(os.path.join(index_dir, name)) for name in (CHUNKS_FILE, OFFSETS_FILE))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get(self, position: int) -> Document:
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        record = json.loads(self._data[start:end].decode("utf-8"))
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def search(self, search: str) -> Optional[Document]:
+        """Look up a document by docstore id (its FAISS position as a string)."""
+        try:
+            position = int(search)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= position < len(self):
+            return None
+        return self.get(position)
+
+
+class PositionIds:
+    """index_to_docstore_id for a ChunkStore: FAISS position i maps to docstore id str(i)."""
+
+    def __init__(self, n: int):
+        self._n = n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < self._n:
+            raise KeyError(position)
+        return str(position)
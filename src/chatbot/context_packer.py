@@ -0,0 +1,154 @@
+# src/chatbot/context_packer.py
+
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_SEPARATOR = "\n\n"
+# Don't start a trimmed piece for less than this many tokens of room
+_MIN_PIECE_TOKENS = 32
+
+
+@lru_cache(maxsize=None)
+def token_counter(encoding: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Token count function for `encoding` (default settings.context_tokenizer).
+
+    tiktoken downloads encodings on first use; without it (or offline) this
+    falls back to ~4 characters per token, which is close for English text.
+    """
+    name = encoding or settings.context_tokenizer
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(name)
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning("tiktoken encoding %s unavailable (%s); estimating 4 chars per token", name, e)
+        return lambda text: (len(text) + 3) // 4
+
+
+def _span(doc: Document) -> Optional[Tuple[str, int, int]]:
+    """(source key, start, end) of a chunk in its source document, if known."""
+    start = doc.metadata.get("start_index")
+    if start is None or start < 0:
+        return None
+    key = f"{doc.metadata.get('source')}|{doc.metadata.get('page')}"
+    return key, start, start + len(doc.page_content)
+
+
+def _new_part(doc: Document, covered: Dict[str, List[List[int]]]):
+    """
+    The part of a chunk not already in the context (neighbouring chunks share
+    chunk_overlap characters), and the packed span it continues, if any.
+
+    Returns:
+        (text, span it follows or None, span it precedes or None); spans are [start, end, piece]
+    """
+    span = _span(doc)
+    if span is None:
+        return doc.page_content, None, None
+    key, start, end = span
+    lo, hi, after, before = start, end, None, None
+    for packed in covered.get(key, []):
+        s, e = packed[0], packed[1]
+        if s <= lo and e >= hi:
+            return "", None, None
+        if s <= lo < e:
+            lo, after = e, packed       # an earlier chunk's tail repeats here
+        elif s < hi <= e:
+            hi, before = s, packed      # a later chunk's head repeats here
+    return doc.page_content[lo - start:hi - start], after, before
+
+
+def _trim_to_sentences(text: str, budget: int, count: Callable[[str], int], words: bool = False) -> str:
+    """
+    Longest run of whole sentences from the start of `text` within `budget` tokens;
+    with `words`, whole words if not even the first sentence fits.
+    """
+    kept = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if count(candidate) > budget:
+            break
+        kept = candidate
+    if kept or not words:
+        return kept
+    for word in text.split():
+        candidate = f"{kept} {word}" if kept else word
+        if count(candidate) > budget:
+            break
+        kept = candidate
+    return kept
+
+
+def pack_context(
+    docs: List[Document],
+    budget: Optional[int] = None,
+    count: Optional[Callable[[str], int]] = None,
+) -> Tuple[str, List[Document]]:
+    """
+    Fill a token budget with retrieved chunks, best ranked first.
+
+    Text repeated from a chunk already in the context (the chunk_overlap
+    between neighbouring chunks) is left out. The chunk that no longer fits
+    is cut at a sentence boundary; the rest are dropped.
+
+    Args:
+        docs: Retrieved chunks, best first
+        budget: Context size in tokens (default settings.context_token_budget)
+        count: Token counter (default token_counter())
+
+    Returns:
+        (context text, chunks that contributed to it)
+    """
+    budget = settings.context_token_budget if budget is None else budget
+    count = count or token_counter()
+
+    pieces: List[str] = []
+    used: List[Document] = []
+    covered: Dict[str, List[List[int]]] = {}
+    remaining = budget
+    sep = count(_SEPARATOR)
+    for doc in docs:
+        text, after, before = _new_part(doc, covered)
+        if not text.strip():
+            continue
+        # Text contiguous with a packed chunk is joined to it, with no separator
+        joined = after is not None or before is not None
+        cost = count(text) + (0 if joined or not pieces else sep)
+        if cost > remaining:
+            room = remaining - (0 if joined or not pieces else sep)
+            if before is None and (room >= _MIN_PIECE_TOKENS or not pieces):
+                text = _trim_to_sentences(text, room, count, words=not pieces)
+                if text.strip():
+                    _place(pieces, covered, doc, text, after)
+                    used.append(doc)
+            break
+        _place(pieces, covered, doc, text, after, before)
+        used.append(doc)
+        remaining -= cost
+    return _SEPARATOR.join(p.strip() for p in pieces), used
+
+
+def _place(pieces: List[str], covered: Dict[str, List[List[int]]], doc: Document,
+           text: str, after: Optional[List[int]] = None, before: Optional[List[int]] = None) -> None:
+    """Add `text` to the context: after/before a packed span it continues, or as a new piece."""
+    if after is not None:
+        pieces[after[2]] += text
+        after[1] += len(text)
+    elif before is not None:
+        pieces[before[2]] = text + pieces[before[2]]
+        before[0] -= len(text)
+    else:
+        pieces.append(text)
+        span = _span(doc)
+        if span is not None:
+            covered.setdefault(span[0], []).append([span[1], span[1] + len(text), len(pieces) - 1])
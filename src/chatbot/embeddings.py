@@ -0,0 +1,129 @@
+# src/chatbot/embeddings.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_id(model_name: Optional[str] = None) -> str:
+    """
+    Identity of the vectors the configured backend produces, as recorded in index
+    manifests: the model name, plus the backend when it is not the PyTorch baseline
+    (int8 vectors are close to, but not the same as, the baseline's).
+    """
+    name = model_name or settings.embed_model
+    if settings.embed_backend == "onnx":
+        return f"{name}@onnx-int8" if settings.embed_onnx_quantize else f"{name}@onnx"
+    return name
+
+
+def _load_model(model_name: str, batch_size: int):
+    """The settings.embed_backend model: "torch" (sentence-transformers) or "onnx" (ONNX Runtime)."""
+    backend = settings.embed_backend
+    if backend == "onnx":
+        from src.chatbot.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            model_name, settings.embed_onnx_dir, quantize=settings.embed_onnx_quantize, threads=settings.embed_threads
+        )
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBED_BACKEND {backend!r} (torch | onnx)")
+    if settings.embed_threads > 0:
+        import torch
+        torch.set_num_threads(settings.embed_threads)
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    One loaded embedding model, shared by every VectorStore
+    (permanent knowledge base and all session indexes).
+
+    Encoding is done in batches of `batch_size` under a lock, so concurrent
+    callers never touch the tokenizer at the same time, and a short query
+    only ever waits for one batch of a large ingest instead of all of it.
+    Texts are batched in order of length (results keep the input order), so
+    each batch is padded to similar lengths rather than to the longest chunk.
+    Recent query vectors are kept in a small LRU so a query is embedded once
+    per request even when several indexes are searched.
+    """
+
+    def __init__(self, model_name: str, batch_size: int, query_cache_size: int = 0):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self._model = _load_model(model_name, self.batch_size)
+        self._lock = threading.Lock()
+        # LRU of recent query vectors (query text -> vector), most recent last
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_cache_size = query_cache_size
+        self._cache_lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            with self._lock:
+                embedded = self._model.embed_documents([texts[i] for i in batch])
+            for i, vector in zip(batch, embedded):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        if self._query_cache_size > 0:
+            with self._cache_lock:
+                cached = self._query_cache.get(text)
+                if cached is not None:
+                    self._query_cache.move_to_end(text)
+                    return cached
+
+        with self._lock:
+            vector = self._model.embed_query(text)
+
+        if self._query_cache_size > 0:
+            with self._cache_lock:
+                self._query_cache[text] = vector
+                self._query_cache.move_to_end(text)
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return vector
+
+
+# -------------------------
+# Process-wide registry (one model per model name)
+# -------------------------
+_REGISTRY: Dict[str, SharedEmbeddings] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_embeddings(model_name: Optional[str] = None) -> SharedEmbeddings:
+    """
+    Return the shared embedding model for `model_name`, loading it on first use.
+
+    Args:
+        model_name: sentence-transformers model id (defaults to settings.embed_model);
+            the backend is settings.embed_backend
+
+    Returns:
+        The process-wide SharedEmbeddings instance for that model
+    """
+    name = model_name or settings.embed_model
+    emb = _REGISTRY.get(name)
+    if emb is None:
+        with _REGISTRY_LOCK:
+            emb = _REGISTRY.get(name)
+            if emb is None:
+                logger.info("Loading embedding model: %s", name)
+                emb = SharedEmbeddings(name, settings.embed_batch_size, settings.query_embedding_cache_size)
+                _REGISTRY[name] = emb
+    return emb
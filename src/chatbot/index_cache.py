@@ -0,0 +1,117 @@
+# src/chatbot/index_cache.py
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.data.loaders import TEXT_EXTS, PDF_EXTS, IMAGE_EXTS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 3  # 2: chunks carry chunk_id/start_index metadata; 3: tenant tags, partitioned layout
+
+_INDEXED_EXTS = TEXT_EXTS | PDF_EXTS | IMAGE_EXTS
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file in fixed-size blocks so large PDFs are never read into memory at once."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_manifest(
+    docs_dir: str,
+    embed_model: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    previous: Optional[Dict] = None,
+    index: Optional[Dict] = None,
+) -> Dict:
+    """
+    Describe everything that determines the contents of an index built from `docs_dir`.
+
+    Files whose size and mtime match the previous manifest reuse its hash,
+    so an unchanged corpus is fingerprinted with stat() calls only.
+
+    Args:
+        docs_dir: Directory that load_documents will read
+        embed_model: Embedding model name used to build the index
+        chunk_size: Chunk size passed to chunk_documents
+        chunk_overlap: Chunk overlap passed to chunk_documents
+        previous: Manifest from the last build, if any
+        index: FAISS index type and build parameters (ann_index.index_config)
+
+    Returns:
+        Manifest dictionary (JSON serialisable)
+    """
+    old_files = (previous or {}).get("files", {})
+    files: Dict[str, Dict] = {}
+
+    base = Path(docs_dir)
+    if base.exists():
+        for p in sorted(base.rglob("*")):
+            if not p.is_file() or p.suffix.lower() not in _INDEXED_EXTS:
+                continue
+            rel = p.relative_to(base).as_posix()
+            st = p.stat()
+            old = old_files.get(rel)
+            if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                digest = old["sha256"]
+            else:
+                digest = file_sha256(str(p))
+            files[rel] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    return {
+        "version": MANIFEST_VERSION,
+        "embed_model": embed_model,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "index": index or {"type": "flat"},
+        "files": files,
+    }
+
+
+def manifest_key(manifest: Dict) -> Dict:
+    """The parts of a manifest that decide whether a saved index is still valid."""
+    return {
+        "version": manifest.get("version"),
+        "embed_model": manifest.get("embed_model"),
+        "chunk_size": manifest.get("chunk_size"),
+        "chunk_overlap": manifest.get("chunk_overlap"),
+        "index": manifest.get("index") or {"type": "flat"},
+        "files": {k: v.get("sha256") for k, v in manifest.get("files", {}).items()},
+    }
+
+
+def manifest_version(manifest: Dict) -> str:
+    """Short id of an index build; changes whenever the index contents would."""
+    blob = json.dumps(manifest_key(manifest), sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:12]
+
+
+def load_manifest(index_dir: str) -> Optional[Dict]:
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception as e:
+        logger.warning("Ignoring unreadable manifest %s: %s", path, e)
+        return None
+
+
+def save_manifest(index_dir: str, manifest: Dict) -> None:
+    """Write the manifest atomically, after the index files it describes."""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
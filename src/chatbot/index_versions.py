@@ -0,0 +1,334 @@
+# src/chatbot/index_versions.py
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from config.settings import settings
+from src.chatbot.embeddings import embedding_id
+from src.chatbot.index_cache import build_manifest, load_manifest, manifest_version
+from src.chatbot.partitions import PartitionedStore
+
+logger = logging.getLogger(__name__)
+
+# <index_dir>/versions/<version>/ holds one complete index; ACTIVE.json says which one is live
+VERSIONS_DIR = "versions"
+ACTIVE_FILE = "ACTIVE.json"
+_LOCK_FILE = ".reload.lock"
+
+
+class IndexVersions:
+    """
+    On-disk registry of permanent index versions under `root`.
+
+    ACTIVE.json holds the active version and the history of activations
+    (newest first). Activating a version prunes directories of all but the
+    `keep` most recent previous versions; those stay available for rollback.
+    After a rollback it also records `rolled_back_from`: the version pins
+    until the next activation that is not a rollback (see PermanentIndex).
+    """
+
+    def __init__(self, root: Optional[str] = None, keep: Optional[int] = None):
+        self.root = root or settings.index_dir
+        self.keep = settings.index_keep_versions if keep is None else keep
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def state(self) -> Dict:
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"active": None, "history": []}
+
+    def active(self) -> Optional[str]:
+        return self.state().get("active")
+
+    def previous(self) -> Optional[str]:
+        history = self.state().get("history", [])
+        return history[1] if len(history) > 1 else None
+
+    def pinned(self) -> bool:
+        """Whether the active version was rolled back to (automatic reloads leave it alone)."""
+        return bool(self.state().get("rolled_back_from"))
+
+    def activate(self, version: str, rolled_back_from: Optional[str] = None) -> None:
+        """Point ACTIVE.json at `version` (atomically) and prune old versions."""
+        history = [version] + [v for v in self.state().get("history", []) if v != version]
+        kept, dropped = history[:self.keep + 1], history[self.keep + 1:]
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, ACTIVE_FILE)
+        state = {"active": version, "history": kept, "activated_at": time.time()}
+        if rolled_back_from:
+            state["rolled_back_from"] = rolled_back_from
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(state, fh, indent=2)
+        os.replace(path + ".tmp", path)
+        # Safe while other processes still search them: their mmaps outlive the unlink
+        for old in dropped:
+            shutil.rmtree(self.path(old), ignore_errors=True)
+
+    def publish(self, built_dir: str) -> str:
+        """
+        Move an index built elsewhere (e.g. by the offline ingest) into the
+        versions directory and activate it; workers with a watcher follow.
+
+        Returns:
+            The version id
+        """
+        manifest = load_manifest(built_dir)
+        if manifest is None:
+            raise ValueError(f"No index manifest in {built_dir}")
+        version = manifest_version(manifest)
+        target = self.path(version)
+        if os.path.isdir(target):
+            shutil.rmtree(built_dir)  # same corpus and settings as a version we already have
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(built_dir, target)
+        self.activate(version)
+        return version
+
+    def list(self) -> List[Dict]:
+        state = self.state()
+        out = []
+        for version in state.get("history", []):
+            manifest = load_manifest(self.path(version)) or {}
+            out.append({
+                "version": version,
+                "active": version == state.get("active"),
+                "files": len(manifest.get("files", {})),
+                "index": manifest.get("index"),
+                "built_at": _mtime(self.path(version)),
+            })
+        return out
+
+    @contextmanager
+    def build_lock(self, wait: bool = False):
+        """Cross-process lock so only one worker builds at a time; yields False if taken (and not `wait`)."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, _LOCK_FILE), "w") as fh:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+class PermanentIndex:
+    """
+    The live permanent knowledge base, with zero-downtime reloads.
+
+    `store` is swapped by a single reference assignment: a query that already
+    picked up the old store finishes on it, every later query sees the new one.
+    reload() builds the new version in its own directory, off the request path;
+    rollback() switches back to a kept previous version and pins it in
+    ACTIVE.json: until a forced reload (the admin API), no worker rebuilds
+    docs_dir over it, neither at startup nor from its watcher. With a watch
+    interval, a background thread reloads when files in docs_dir change, and
+    follows ACTIVE.json when another worker reloaded or rolled back.
+
+    Without an active version, the first index is built as a version at
+    startup (INDEX_BUILD_ON_START); otherwise an index saved directly in
+    index_dir (by an offline build without --publish) is served until the
+    first reload, and cannot be rolled back to.
+    """
+
+    def __init__(self, docs_dir: Optional[str] = None,
+                 on_swap: Optional[Callable[[PartitionedStore], None]] = None):
+        self.docs_dir = docs_dir or settings.docs_dir
+        self.versions = IndexVersions()
+        self._on_swap = on_swap
+        self._lock = threading.Lock()  # one reload/rollback at a time in this process
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.reload_status: Dict = {"state": "idle"}
+
+        active = self.versions.active()
+        if active and os.path.isdir(self.versions.path(active)):
+            self.store = self._open(active)
+            if settings.index_build_on_start:
+                self.reload()  # no-op unless docs_dir changed while we were down (or a rollback is pinned)
+        elif settings.index_build_on_start:
+            self.store = self._new_store(settings.index_dir)  # not loaded; a new version replaces it
+            status = self.reload(wait=True)  # other workers starting now wait, then load its result
+            if status["state"] != "swapped":
+                raise RuntimeError(f"Could not build the permanent index: {status.get('error')}")
+        else:
+            self.store = self._new_store(settings.index_dir)
+            self.store.build_or_load_dir(self.docs_dir, build=False)
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.store.version
+
+    # -------------------------
+    # Reload / rollback
+    # -------------------------
+    def changed(self) -> Optional[str]:
+        """The version docs_dir would build now, if it differs from the live one."""
+        store = self.store
+        manifest = build_manifest(
+            self.docs_dir, embedding_id(store.embed_model), settings.chunk_size, settings.chunk_overlap,
+            load_manifest(store.index_dir), index=store.index_config,
+        )
+        version = manifest_version(manifest)
+        return version if version != store.version else None
+
+    def reload(self, wait: bool = False, force: bool = False) -> Dict:
+        """
+        Build an index for the current docs_dir and swap it in (blocking).
+
+        Args:
+            wait: Wait for a build running in another process instead of returning "busy"
+            force: Also when a rollback is pinned (and unpin it)
+
+        Returns:
+            The reload status: {"state": "unchanged" | "swapped" | "pinned" | "busy" | "failed", ...}
+        """
+        if not self._lock.acquire(blocking=False):
+            return {"state": "busy"}
+        try:
+            with self.versions.build_lock(wait) as acquired:
+                if not acquired:
+                    return {"state": "busy"}
+                if not force and self.versions.pinned():
+                    return {"state": "pinned", "version": self.versions.active()}
+                return self._reload()
+        finally:
+            self._lock.release()
+
+    def reload_in_background(self, force: bool = False) -> Dict:
+        """Start reload(force=force) on a thread; returns the status right away."""
+        if self._lock.locked():
+            return {"state": "busy"}
+
+        def _run():
+            status = self.reload(force=force)
+            if status["state"] == "busy":
+                self.reload_status = status
+
+        self.reload_status = {"state": "building", "started_at": time.time()}
+        threading.Thread(target=_run, name="index-reload", daemon=True).start()
+        return dict(self.reload_status)
+
+    def rollback(self, version: Optional[str] = None) -> Dict:
+        """Switch to `version` (default: the previously active one), which must still be kept."""
+        with self._lock:
+            target = version or self.versions.previous()
+            if not target or target not in self.versions.state().get("history", []):
+                raise ValueError(f"No kept index version {target!r} to roll back to")
+            if not os.path.isdir(self.versions.path(target)):
+                raise ValueError(f"Index version {target} is no longer on disk")
+            previous = self.version
+            self._swap(self._open(target))
+            self.versions.activate(target, rolled_back_from=previous)
+            logger.info("Rolled back permanent index %s -> %s", previous, target)
+            return {"state": "swapped", "version": target, "previous": previous}
+
+    def _reload(self) -> Dict:
+        t0 = time.perf_counter()
+        self.reload_status = {"state": "building", "started_at": time.time()}
+        try:
+            version = self.changed()
+            if version is None:
+                if self.versions.pinned():
+                    self.versions.activate(self.version)  # forced: docs_dir is the pinned version, unpin it
+                self.reload_status = {"state": "unchanged", "version": self.version}
+                return dict(self.reload_status)
+
+            path = self.versions.path(version)
+            store = self._new_store(path)
+            if not self._load_complete(store):
+                shutil.rmtree(path, ignore_errors=True)  # leftovers of an interrupted build
+                store.build_or_load_dir(self.docs_dir)
+            store.version = version
+            previous = self.version
+            self._swap(store)
+            self.versions.activate(version)
+            seconds = round(time.perf_counter() - t0, 2)
+            logger.info("Permanent index %s -> %s in %ss", previous, version, seconds)
+            self.reload_status = {"state": "swapped", "version": version, "previous": previous,
+                                  "seconds": seconds, "finished_at": time.time()}
+        except Exception as e:
+            logger.exception("Permanent index reload failed; still serving %s", self.version)
+            self.reload_status = {"state": "failed", "error": str(e), "version": self.version,
+                                  "finished_at": time.time()}
+        return dict(self.reload_status)
+
+    def _swap(self, store: PartitionedStore) -> None:
+        self.store = store
+        if self._on_swap:
+            self._on_swap(store)
+
+    # -------------------------
+    # Watcher
+    # -------------------------
+    def start_watcher(self, interval: Optional[int] = None) -> None:
+        """Every `interval` seconds: follow ACTIVE.json, and reload if docs_dir changed."""
+        interval = settings.index_watch_interval if interval is None else interval
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception("Index watcher failed")
+
+        self._watcher = threading.Thread(target=_loop, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+    def poll(self) -> None:
+        active = self.versions.active()
+        if active and active != self.version and os.path.isdir(self.versions.path(active)):
+            with self._lock:
+                logger.info("Following ACTIVE.json: permanent index %s -> %s", self.version, active)
+                self._swap(self._open(active))
+        elif not self.versions.pinned() and self.changed():
+            self.reload()
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _new_store(self, index_dir: str) -> PartitionedStore:
+        return PartitionedStore(index_dir=index_dir, index_type=settings.index_type, mmap=settings.mmap_index)
+
+    @staticmethod
+    def _load_complete(store: PartitionedStore) -> bool:
+        """Load a version built earlier (kept for rollback, or built by another worker)."""
+        if load_manifest(store.index_dir) is None:  # written last, so its absence means unfinished
+            return False
+        try:
+            return store.load() is not None
+        except Exception:
+            return False
+
+    def _open(self, version: str) -> PartitionedStore:
+        store = self._new_store(self.versions.path(version))
+        if store.load() is None:
+            raise RuntimeError(f"Index version {version} has no saved index")
+        store.version = version
+        return store
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
@@ -0,0 +1,130 @@
+# src/chatbot/lexical.py
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Numbers keep their money/ordinal/percent markers so "$75", "5th" and "10%" are exact terms
+_TOKEN_RE = re.compile(r"\$?\d+(?:[.,]\d+)*(?:st|nd|rd|th|%)?|[a-z]+(?:'[a-z]+)?")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "if", "in", "is", "it", "its", "me", "my", "of", "on", "or", "our", "s",
+    "should", "so", "that", "the", "their", "there", "this", "to", "was", "we", "what",
+    "when", "where", "which", "who", "will", "with", "you", "your",
+}
+
+BM25_FILE = "bm25.json"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens without stopwords."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index (term -> {doc position: term frequency}).
+
+    Documents are identified by the same docstore ids as the FAISS store they
+    shadow, and are only ever appended, like the FAISS index itself. Scoring a
+    query touches only the postings of its terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_ids: List[str] = []
+        self.doc_len: List[int] = []
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_ids: Sequence[str], texts: Iterable[str]) -> None:
+        for doc_id, text in zip(doc_ids, texts):
+            pos = len(self.doc_ids)
+            tokens = tokenize(text)
+            self.doc_ids.append(doc_id)
+            self.doc_len.append(len(tokens))
+            self.total_len += len(tokens)
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[pos] = tf
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score) pairs, best first."""
+        n = len(self.doc_ids)
+        if not n:
+            return []
+        avg_len = self.total_len / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for pos, tf in posting.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[pos] / avg_len)
+                scores[pos] = scores.get(pos, 0.0) + idf * tf * (self.k1 + 1) / norm
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[pos], score) for pos, score in best]
+
+    def save(self, index_dir: str) -> None:
+        path = os.path.join(index_dir, BM25_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "doc_ids": self.doc_ids,
+                "doc_len": self.doc_len,
+                "postings": self.postings,
+            }, fh)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "BM25Index":
+        with open(os.path.join(index_dir, BM25_FILE), "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.doc_ids = data["doc_ids"]
+        index.doc_len = data["doc_len"]
+        index.total_len = sum(index.doc_len)
+        index.postings = {
+            term: {int(pos): tf for pos, tf in posting.items()}
+            for term, posting in data["postings"].items()
+        }
+        return index
+
+    @classmethod
+    def from_faiss(cls, db) -> "BM25Index":
+        """Build from an existing langchain FAISS store (for indexes saved without one)."""
+        index = cls()
+        ids = [db.index_to_docstore_id[i] for i in range(len(db.index_to_docstore_id))]
+        index.add(ids, (db.docstore.search(doc_id).page_content for doc_id in ids))
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Tuple[Sequence, float]],
+    k: int = 60,
+) -> List[Tuple[object, float]]:
+    """
+    Fuse ranked lists with weighted reciprocal rank fusion.
+
+    Args:
+        rankings: (ranked keys, weight) pairs; each key scores weight / (k + rank)
+        k: RRF damping constant
+
+    Returns:
+        (key, fused score) pairs, best first
+    """
+    fused: Dict[object, float] = {}
+    for keys, weight in rankings:
+        for rank, key in enumerate(keys, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
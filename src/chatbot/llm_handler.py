@@ -1,20 +1,151 @@
 # src/chatbot/llm_handler.py
 
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import openai
 from langchain_openai import ChatOpenAI
 from config.settings import settings
 
-def get_llm():
-    if not settings.openrouter_api_key:
-        raise ValueError("OPENROUTER_API_KEY not set. Please add it to your .env")
+logger = logging.getLogger(__name__)
+
+# Shared by the primary model and every fallback, so all upstream calls reuse one keep-alive pool
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_async_transport: Optional["_PerLoopTransport"] = None
+
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport with one connection pool per event loop.
+
+    Pooled connections belong to the loop that opened them, and the models (and
+    so their async client) outlive any one loop: a second asyncio.run(), or a
+    test client's loop, would otherwise reuse connections of a closed loop
+    ("Event loop is closed"). The app has one loop, so one pool in practice.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = httpx.AsyncHTTPTransport(**self._kwargs)
+        return await pool.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """Close the running loop's pool (the others are dropped with their loops)."""
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+def _http_clients():
+    global _http_client, _http_async_client, _async_transport
+    if _http_client is None:
+        limits = httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive,
+            keepalive_expiry=30,
+        )
+        # Per attempt; the SDK retries (with backoff) on top of this
+        timeout = httpx.Timeout(settings.llm_timeout, connect=5.0)
+        _http_client = httpx.Client(limits=limits, timeout=timeout)
+        _async_transport = _PerLoopTransport(limits=limits)
+        _http_async_client = httpx.AsyncClient(transport=_async_transport, timeout=timeout)
+    return _http_client, _http_async_client
+
+
+async def close_http_clients() -> None:
+    """
+    Close the running loop's upstream connections (app shutdown). The client
+    itself stays usable: a later call on this loop opens a new pool.
+    """
+    if _async_transport is not None:
+        await _async_transport.aclose()
 
+
+def _chat_model(model: str) -> ChatOpenAI:
+    http_client, http_async_client = _http_clients()
     # Route LangChain's OpenAI client to OpenRouter
     return ChatOpenAI(
-        model=settings.openrouter_model,
+        model=model,
         temperature=0.3,  # Lower temperature for more consistent responses
         openai_api_key=settings.openrouter_api_key,
         base_url="https://openrouter.ai/api/v1",  # Use base_url instead of openai_api_base
         default_headers={
             "HTTP-Referer": "http://localhost:8000",  # Optional but recommended
             "X-Title": "YottaReal Chatbot"  # Optional but recommended
-        }
-    )
\ No newline at end of file
+        },
+        request_timeout=settings.llm_timeout,
+        # The openai SDK retries 408/409/429/5xx and connection errors with jittered
+        # exponential backoff (0.5s doubling up to 8s) and honours Retry-After
+        max_retries=settings.llm_max_retries,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+def get_llm():
+    """
+    The chat model: settings.openrouter_model, then each of settings.llm_fallback_models
+    in order when a call still fails (after retries) with an API error.
+    """
+    if not settings.openrouter_api_key:
+        raise ValueError("OPENROUTER_API_KEY not set. Please add it to your .env")
+
+    llm = _chat_model(settings.openrouter_model)
+    fallbacks = [m.strip() for m in settings.llm_fallback_models.split(",") if m.strip()]
+    if not fallbacks:
+        return llm
+    # Not on programming errors (bad prompt variables etc.), which no other model would fix
+    return llm.with_fallbacks([_chat_model(m) for m in fallbacks], exceptions_to_handle=(openai.APIError,))
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent async calls: the first caller for a key
+    starts the call, later callers with the same key wait for its result
+    (or exception) instead of starting their own.
+
+    The call runs as its own task, so a caller that goes away (client
+    disconnect, deadline) does not cancel it for the others. Keys are only
+    shared while the call is in flight; nothing is cached afterwards.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def run(self, key: Any, call: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.coalesced += 1
+            logger.debug("Coalesced with an identical in-flight LLM call")
+        return await asyncio.shield(task)
+
+    def _done(self, key: Any, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here, so an unawaited failure is not reported as lost
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
@@ -0,0 +1,165 @@
+# src/chatbot/onnx_embeddings.py
+
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_FILE = "embedding.json"
+
+
+def _onnxruntime():
+    try:
+        import onnxruntime  # type: ignore
+        return onnxruntime
+    except ImportError as e:
+        raise ImportError("EMBED_BACKEND=onnx needs onnxruntime (pip install onnxruntime onnx)") from e
+
+
+def export_onnx(model_name: str, out_dir: str, quantize: bool = True) -> str:
+    """
+    Export a sentence-transformers model's transformer to ONNX (once; later calls reuse it).
+
+    Pooling and normalization stay out of the graph (they are done in NumPy);
+    their settings are saved next to the model with the tokenizer, so loading
+    the exported model needs neither torch nor sentence-transformers.
+
+    Args:
+        model_name: sentence-transformers model id
+        out_dir: Where to write model.onnx (and model.int8.onnx with `quantize`)
+        quantize: Also write a dynamically int8-quantized copy (weights int8, activations quantized at run time)
+
+    Returns:
+        Path of the model to load (the quantized one with `quantize`)
+    """
+    out = Path(out_dir)
+    fp32, int8 = out / "model.onnx", out / "model.int8.onnx"
+    target = int8 if quantize else fp32
+    if target.exists() and (out / _CONFIG_FILE).exists():
+        return str(target)
+
+    out.mkdir(parents=True, exist_ok=True)
+    if not fp32.exists():
+        _export_fp32(model_name, out, fp32)
+    if quantize and not int8.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+        logger.info("Quantizing %s to int8", fp32)
+        tmp = int8.with_suffix(f".tmp{os.getpid()}.onnx")
+        quantize_dynamic(str(fp32), str(tmp), weight_type=QuantType.QInt8)
+        os.replace(tmp, int8)
+    return str(target)
+
+
+def _export_fp32(model_name: str, out: Path, path: Path) -> None:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    logger.info("Exporting %s to ONNX in %s", model_name, out)
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = st[0], st[1]
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in st.tokenizer.model_input_names]
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(names, inputs))).last_hidden_state
+
+    sample = st.tokenizer(["an example sentence", "and another"], padding=True, return_tensors="pt")
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names + ["last_hidden_state"]}
+    tmp = path.with_suffix(f".tmp{os.getpid()}.onnx")  # workers starting together may export at once
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(transformer.auto_model.eval()), tuple(sample[n] for n in names), str(tmp),
+            input_names=names, output_names=["last_hidden_state"], dynamic_axes=dynamic,
+            opset_version=17, dynamo=False,
+        )
+    os.replace(tmp, path)
+
+    st.tokenizer.save_pretrained(str(out))
+    config = {
+        "model": model_name,
+        "inputs": names,
+        # sentence-transformers >= 5 has pooling_mode; older versions the method
+        "pooling": getattr(pooling, "pooling_mode", None) or pooling.get_pooling_mode_str(),
+        "normalize": any(type(m).__name__ == "Normalize" for m in st),
+        "max_seq_length": st.max_seq_length,
+    }
+    with open(out / _CONFIG_FILE, "w", encoding="utf-8") as fh:
+        json.dump(config, fh, indent=2)
+
+
+class OnnxEmbeddings:
+    """
+    Sentence embeddings from an ONNX Runtime session (CPU), optionally int8-quantized.
+
+    Same interface as HuggingFaceEmbeddings (embed_documents / embed_query).
+    Each call is tokenized with padding to its longest text only, so batches
+    of short texts (queries, sorted document batches) run on short tensors.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str, quantize: bool = True, threads: int = 0):
+        ort = _onnxruntime()
+        from tokenizers import Tokenizer
+
+        model_dir = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "__", model_name))
+        path = export_onnx(model_name, model_dir, quantize)
+        with open(os.path.join(model_dir, _CONFIG_FILE), "r", encoding="utf-8") as fh:
+            self.config = json.load(fh)
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(self.config["max_seq_length"])
+        self._tokenizer.enable_padding()  # to the longest text of each call
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        logger.info("ONNX embeddings: %s (%s)", path, "int8" if quantize else "fp32")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self._tokenizer.encode_batch(texts)
+        mask = np.asarray([e.attention_mask for e in encoded], dtype=np.int64)
+        columns = {
+            "input_ids": [e.ids for e in encoded],
+            "attention_mask": mask,
+            "token_type_ids": [e.type_ids for e in encoded],
+        }
+        feeds = {name: np.asarray(columns[name], dtype=np.int64) for name in self.config["inputs"]}
+        hidden = self._session.run(None, feeds)[0]
+        vectors = _pool(hidden, mask, self.config["pooling"])
+        if self.config["normalize"]:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+
+def _pool(hidden: np.ndarray, mask: np.ndarray, mode: str) -> np.ndarray:
+    """Token embeddings (batch x seq x dim) -> sentence embeddings, as sentence-transformers' Pooling."""
+    if mode == "cls":
+        return hidden[:, 0].astype(np.float32)
+    m = mask[:, :, None].astype(np.float32)
+    if mode == "max":
+        return np.where(m > 0, hidden, -1e9).max(axis=1).astype(np.float32)
+    if mode == "mean":
+        return ((hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)).astype(np.float32)
+    raise ValueError(f"Unsupported pooling mode {mode!r} for the ONNX backend")
+
@@ -0,0 +1,202 @@
+# src/chatbot/partitions.py
+
+import json
+import logging
+import os
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+from langchain.schema import Document
+
+from config.settings import settings
+from src.chatbot.ann_index import index_config
+from src.chatbot.embeddings import embedding_id, get_embeddings
+from src.chatbot.index_cache import build_manifest, load_manifest, manifest_key, manifest_version, save_manifest
+from src.chatbot.tenants import SHARED
+from src.chatbot.vector_store import VectorStore
+from src.data.loaders import load_documents
+from src.data.processors import chunk_documents
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_DIR = "partitions"
+# Partition keys, written after every partition and before the manifest
+_PARTITIONS_FILE = "partitions.json"
+
+
+def partition_key(metadata: Dict) -> str:
+    """"shared", "<tenant>" or "<tenant>/<community>" for a chunk's metadata (see loaders.document_tags)."""
+    tenant = metadata.get("tenant")
+    if not tenant:
+        return SHARED
+    community = metadata.get("community")
+    return f"{tenant}/{community}" if community else tenant
+
+
+def route(keys: Iterable[str], tenant: Optional[str] = None, community: Optional[str] = None) -> List[str]:
+    """
+    Partitions a query searches: the shared one plus, for a tenant, its own
+    partition and its communities' (only `community`'s, if given).
+    """
+    selected = []
+    for key in keys:
+        if key == SHARED:
+            selected.append(key)
+        elif tenant:
+            owner, _, sub = key.partition("/")
+            if owner == tenant and (not sub or not community or sub == community):
+                selected.append(key)
+    return selected
+
+
+class PartitionedStore:
+    """
+    The permanent index as one VectorStore per partition: "shared", one per
+    tenant and one per tenant community. A query searches only the partitions
+    route() picks for its tenant, so its cost and its candidate noise grow with
+    that tenant's documents rather than the whole portfolio.
+
+    Partitions are saved in <index_dir>/partitions/<key>/. The manifest covers
+    all of docs_dir, exactly as for a single VectorStore. An index saved
+    before partitioning (index files directly in index_dir) loads as "shared".
+    """
+
+    def __init__(self, index_dir=None, index_type=None, mmap=False):
+        self.index_dir = index_dir or settings.index_dir
+        self.index_type = index_type
+        self.mmap = mmap
+        self.embed_model = settings.embed_model
+        self.index_config = index_config(index_type or "flat")
+        self._embeddings = get_embeddings(self.embed_model)
+        self.parts: Dict[str, VectorStore] = {}
+        # Id of the loaded build (see index_cache.manifest_version)
+        self.version = None
+
+    def has_saved_index(self) -> bool:
+        return self._saved_keys() is not None or self._legacy().has_saved_index()
+
+    def load(self):
+        """Load every saved partition (None if there is no saved index)."""
+        keys = self._saved_keys()
+        if keys is None:
+            legacy = self._legacy()
+            if legacy.load() is None:
+                return None
+            self.parts = {SHARED: legacy}
+            return self.parts
+        parts = {}
+        for key in keys:
+            store = self._part(key)
+            if store.load() is None:
+                raise RuntimeError(f"Partition {key!r} of {self.index_dir} has no saved index")
+            parts[key] = store
+        self.parts = parts
+        return self.parts
+
+    def build_or_load_dir(self, docs_dir, chunk_size=None, chunk_overlap=None, build=True):
+        """Same contract as VectorStore.build_or_load_dir, for all partitions at once."""
+        chunk_size = chunk_size or settings.chunk_size
+        chunk_overlap = settings.chunk_overlap if chunk_overlap is None else chunk_overlap
+
+        previous = load_manifest(self.index_dir)
+        manifest = build_manifest(
+            docs_dir, embedding_id(self.embed_model), chunk_size, chunk_overlap, previous, index=self.index_config
+        )
+        self.version = manifest_version(manifest)
+
+        if previous and self.has_saved_index() and manifest_key(previous) == manifest_key(manifest):
+            logger.info("Index cache hit for %s, loading %s", docs_dir, self.index_dir)
+            return self.load()
+
+        if not build:
+            if not self.has_saved_index():
+                raise RuntimeError(
+                    f"No index in {self.index_dir}; build it with scripts/initialize_search_index.py"
+                )
+            logger.warning("Index in %s is out of date for %s; loading it anyway "
+                           "(rebuild with scripts/initialize_search_index.py)", self.index_dir, docs_dir)
+            self.version = manifest_version(previous) if previous else None
+            return self.load()
+
+        logger.info("Index cache miss for %s, rebuilding %s", docs_dir, self.index_dir)
+        docs = load_documents(docs_dir)
+        chunks = chunk_documents(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.rebuild(chunks)
+        save_manifest(self.index_dir, manifest)
+        return self.parts
+
+    def rebuild(self, chunks: List[Document]):
+        """Split chunks by partition and (re)build each partition's index."""
+        groups: Dict[str, List[Document]] = defaultdict(list)
+        for chunk in chunks:
+            groups[partition_key(chunk.metadata)].append(chunk)
+        parts = {}
+        for key, group in sorted(groups.items()):
+            store = self._part(key)
+            store.rebuild(group)
+            parts[key] = store
+        self._commit(parts)
+        return self.parts
+
+    def save_prebuilt(self, partitions: Iterable[Tuple[str, np.ndarray, Iterable[Document]]]):
+        """Write partitions from vectors computed elsewhere (the bulk ingestion CLI): (key, vectors, docs)."""
+        parts = {}
+        for key, vectors, docs in partitions:
+            store = self._part(key)
+            store.save_prebuilt(vectors, docs)
+            parts[key] = store
+        self._commit(parts)
+        return self.parts
+
+    def select(self, tenant: Optional[str] = None, community: Optional[str] = None) -> Dict[str, VectorStore]:
+        """The partitions a query for `tenant` (and `community`) searches."""
+        parts = self.parts
+        return {key: parts[key] for key in route(parts, tenant, community)}
+
+    def size(self):
+        """Vectors and index file bytes, summed over partitions."""
+        sizes = [store.size() for store in self.parts.values()]
+        return {
+            "vectors": sum(s["vectors"] for s in sizes),
+            "file_bytes": sum(s["file_bytes"] for s in sizes),
+            "partitions": len(sizes),
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _part(self, key: str) -> VectorStore:
+        path = os.path.join(self.index_dir, PARTITIONS_DIR, quote(key, safe=""))
+        return VectorStore(index_dir=path, index_type=self.index_type, mmap=self.mmap)
+
+    def _legacy(self) -> VectorStore:
+        return VectorStore(index_dir=self.index_dir, index_type=self.index_type, mmap=self.mmap)
+
+    def _saved_keys(self) -> Optional[List[str]]:
+        try:
+            with open(os.path.join(self.index_dir, _PARTITIONS_FILE), "r", encoding="utf-8") as fh:
+                return json.load(fh)["partitions"]
+        except FileNotFoundError:
+            return None
+
+    def _commit(self, parts: Dict[str, VectorStore]) -> None:
+        """Record the partition list and drop directories of partitions that no longer exist."""
+        root = Path(self.index_dir)
+        root.mkdir(parents=True, exist_ok=True)
+        path = root / _PARTITIONS_FILE
+        with open(path.with_suffix(".tmp"), "w", encoding="utf-8") as fh:
+            json.dump({"partitions": sorted(parts)}, fh, indent=2)
+        os.replace(path.with_suffix(".tmp"), path)
+        keep = {quote(key, safe="") for key in parts}
+        partitions_dir = root / PARTITIONS_DIR
+        if partitions_dir.is_dir():
+            for old in partitions_dir.iterdir():
+                if old.name not in keep:
+                    shutil.rmtree(old, ignore_errors=True)
+        self.parts = parts
+        logger.info("Index %s: %d partitions (%s)", self.index_dir, len(parts),
+                    ", ".join(f"{k}={s.size()['vectors']}" for k, s in sorted(parts.items())))
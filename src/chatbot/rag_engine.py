@@ -1,24 +1,34 @@
 # src/chatbot/rag_engine.py
 
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
 import re
 import os
+import time
 
+import numpy as np
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import Document
 
 from config.settings import settings
-from src.chatbot.llm_handler import get_llm
-from src.data.loaders import load_documents
-from src.data.processors import chunk_documents
-from src.chatbot.vector_store import VectorStore
+from src.chatbot.answer_cache import AnswerCache
+from src.chatbot.attribution import attribute
+from src.chatbot.context_packer import pack_context, token_counter
+from src.chatbot.index_versions import PermanentIndex
+from src.chatbot.lexical import reciprocal_rank_fusion
+from src.chatbot.llm_handler import SingleFlight, get_llm
+from src.chatbot.partitions import PartitionedStore
+from src.chatbot.sessions import SessionManager
+from src.utils.logs import debug_sampled, in_context
+from src.utils.metrics import CHAT_REQUESTS, observe, timed
+
+logger = logging.getLogger(__name__)
 
 # -------------------------
-# In-memory chat history & session indexes
+# Chat history helpers
 # -------------------------
-_SESSION_MEMORY: Dict[str, List[Dict[str, str]]] = {}
-_SESSION_INDEXES: Dict[str, VectorStore] = {}
-
 def _format_history(messages: List[Dict[str, str]]) -> str:
     """Format conversation history for prompt context."""
     return "\n".join([f"{m['role'].capitalize()}: {m['content']}" for m in messages])
@@ -70,76 +80,89 @@ def _clean_answer(text: str) -> str:
     
     return cleaned
 
-def _select_citations(answer_text: str, retrieved_docs: List[Document]) -> List[Dict]:
+class _StreamCleaner:
     """
-    Select relevant citations based on content overlap between answer and retrieved docs.
-    
-    Args:
-        answer_text: The generated answer text
-        retrieved_docs: List of retrieved documents
-        
-    Returns:
-        List of citation dictionaries with id and source
-    """
-    if not retrieved_docs:
-        return []
-    
-    ans = (answer_text or "").lower()
-    numbers = set(re.findall(r'\b\d+\b', ans))
-    
-    # Key terms that indicate relevance
-    key_terms = {
-        "grace", "period", "rent", "due", "fee", "policy", "maintenance", "lease", 
-        "leasing", "payment", "adara", "adar", "resident", "tenant", "community", 
-        "experience", "skills", "education", "work", "resume", "background", 
-        "developer", "engineer", "manager", "sales", "executive", "president", 
-        "vice", "email", "contact", "team", "staff"
-    }
-
-    selected, seen = [], set()
-    
-    for d in retrieved_docs:
-        text = (d.page_content or "").lower()
-        
-        # Calculate overlap score
-        overlap = sum(1 for n in numbers if n in text) + sum(1 for k in key_terms if k in text)
-        
-        if overlap >= 1:
-            src = d.metadata.get("source") or d.metadata.get("path") or "document"
-            if src not in seen:
-                selected.append(src)
-                seen.add(src)
+    Incremental counterpart of _clean_answer for streamed tokens.
 
-    # If no matches found, include the top document
-    if not selected and retrieved_docs:
-        selected = [retrieved_docs[0].metadata.get("source") or "document"]
+    Holds back only as much text as it needs to decide: the start of the answer
+    (leading code fence / punctuation) and the start of each line (which might be
+    a "Sources:" line). Everything else is passed through with Markdown removed.
+    The fully cleaned answer is still computed with _clean_answer at the end.
+    """
 
-    return [{"id": i + 1, "source": s} for i, s in enumerate(selected)]
+    _SOURCES_RE = re.compile(r"\s*sources?\s*:", re.I)
+    _SOURCES_PREFIX_RE = re.compile(r"\s*(s|so|sou|sour|sourc|sources?\s*)?", re.I)
 
-# -------------------------
-# Retrieval helpers
-# -------------------------
-def _keyword_boost(query: str, ranked: List[Tuple[Document, float, int]]) -> List[Tuple[Document, float, int]]:
-    """
-    Boost documents that have keyword overlap with the query.
-    
-    Args:
-        query: The user's query
-        ranked: List of (Document, score, index) tuples
-        
-    Returns:
-        Re-ranked list of documents
-    """
-    q_tokens = set(re.findall(r'\b(?:\d+|\w{3,})\b', (query or "").lower()))
-    
-    def boost_index(item):
-        d, _score, idx = item
-        text = (d.page_content or "").lower()
-        has_overlap = any(t in text for t in q_tokens)
-        return (idx - 0.5) if has_overlap else idx
-    
-    ranked.sort(key=boost_index)
-    return ranked
+    def __init__(self):
+        self._head = ""          # text seen before the answer really starts
+        self._started = False
+        self._line = ""          # start of the current line, held while undecided
+        self._at_line_start = True
+        self._dropping = False   # inside a "Sources:" line
+        self.emitted = ""
+
+    def feed(self, text: str) -> str:
+        """Consume a streamed piece and return the cleaned text that is safe to show."""
+        if not self._started:
+            self._head += text
+            head = self._head.lstrip()
+            if head.startswith("```"):
+                fence = re.match(r"```[a-zA-Z0-9]*\s", head)
+                if not fence:
+                    return ""
+                head = head[fence.end():]
+            elif "```".startswith(head):
+                return ""
+            head = head.lstrip(":").lstrip().lstrip("-").lstrip("—").lstrip()
+            if not head:
+                return ""
+            self._started = True
+            text = head
+        return self._emit(self._filter_lines(text))
+
+    def finish(self) -> str:
+        """Flush held-back text at the end of the stream."""
+        tail = ""
+        if self._line and not self._dropping and not self._SOURCES_RE.match(self._line):
+            tail = self._line
+        self._line = ""
+        out = self._emit(tail)
+        if not self.emitted.strip():
+            fallback = "I don't know based on the available documents."
+            self.emitted += fallback
+            return out + fallback
+        return out
+
+    def _filter_lines(self, text: str) -> str:
+        out = []
+        for ch in text:
+            if self._dropping:
+                if ch == "\n":
+                    out.append(ch)
+                    self._dropping = False
+                    self._at_line_start = True
+                continue
+            if not self._at_line_start:
+                out.append(ch)
+                self._at_line_start = ch == "\n"
+                continue
+            self._line += ch
+            if ch == "\n":
+                out.append(self._line)
+                self._line = ""
+            elif self._SOURCES_RE.match(self._line):
+                self._line = ""
+                self._dropping = True
+            elif not self._SOURCES_PREFIX_RE.fullmatch(self._line):
+                out.append(self._line)
+                self._line = ""
+                self._at_line_start = False
+        return "".join(out)
+
+    def _emit(self, text: str) -> str:
+        text = re.sub(r"[*_`]+", "", text)
+        self.emitted += text
+        return text
 
 # -------------------------
 # RAG Engine
@@ -157,160 +180,488 @@ class RAGEngine:
         """Initialize the RAG engine with permanent knowledge base."""
         self.llm = get_llm()
         
-        # Permanent knowledge base
-        self.permanent_store = VectorStore()
-        docs = load_documents(settings.docs_dir)
-        chunks = chunk_documents(docs)
-        self.permanent_db = self.permanent_store.build_or_load(chunks)
+        # Answers from the permanent knowledge base, reused across sessions
+        self.answer_cache = AnswerCache()
+
+        # Permanent knowledge base (loaded from the index cache when the corpus is unchanged),
+        # reloaded in the background and swapped in without a restart
+        self.permanent = PermanentIndex(on_swap=self._on_index_swap)
+        self.answer_cache.set_version(self.permanent.version)
+        self.permanent.start_watcher()
+
+        # Load the prompt tokenizer now rather than on the first question
+        token_counter()
+
+        # Per-session history and indexes (TTL + LRU eviction, background sweeper)
+        self.sessions = SessionManager()
+        self.sessions.start_sweeper()
+
+        # CPU-bound retrieval (query embedding + FAISS) runs here, off the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.retrieval_workers, thread_name_prefix="rag-retrieval"
+        )
+        # Session/permanent index searches for one query run side by side here
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=settings.retrieval_workers, thread_name_prefix="rag-search"
+        )
+        # Caps in-flight chat pipelines (and therefore upstream LLM calls) per worker
+        self._chat_slots = asyncio.Semaphore(settings.chat_concurrency)
+        # Identical prompts in flight at once share one upstream call
+        self._llm_calls = SingleFlight()
+
+    @property
+    def permanent_store(self) -> PartitionedStore:
+        """The live permanent index; read it once per request, a reload may swap it."""
+        return self.permanent.store
+
+    def _on_index_swap(self, store: PartitionedStore) -> None:
+        # Cached answers were computed against the old version
+        self.answer_cache.set_version(store.version)
+
+    def add_session_files(self, session_id: str, paths: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Append newly uploaded files to the session's index.
+        Only these files are loaded, chunked and embedded; files whose content
+        is already in the session index are skipped as duplicates.
+        
+        Args:
+            session_id: Unique session identifier
+            paths: Paths of the files to add
+            
+        Returns:
+            (added, duplicates) lists of file names
+        """
+        session_store = self.sessions.index_for_update(session_id)
+        added, duplicates = session_store.add_files(paths)
+        if session_store._db is not None:
+            self.sessions.put_index(session_id, session_store)
+        logger.info("Session %s: indexed %d new file(s), skipped %d duplicate(s)", session_id, len(added), len(duplicates))
+        return added, duplicates
 
     def build_session_index(self, session_id: str, session_dir: str):
         """
-        Build a temporary index for session-specific uploads.
+        Index every file in a session directory that is not indexed yet.
         
         Args:
             session_id: Unique session identifier
             session_dir: Directory containing uploaded files for this session
         """
         if not os.path.exists(session_dir) or not os.listdir(session_dir):
-            print(f"[RAGEngine] No files in session directory: {session_dir}")
+            logger.info("No files in session directory: %s", session_dir)
             return
         
-        print(f"[RAGEngine] Building session index for: {session_id}")
-        session_store = VectorStore(index_dir=f"data/indexes/session_{session_id}")
-        docs = load_documents(session_dir)
-        chunks = chunk_documents(docs)
-        session_store.build_or_load(chunks)
-        _SESSION_INDEXES[session_id] = session_store
-        print(f"[RAGEngine] Session index built with {len(chunks)} chunks")
-
-    def clear_session_index(self, session_id: str):
+        paths = sorted(
+            os.path.join(session_dir, name) for name in os.listdir(session_dir)
+            if os.path.isfile(os.path.join(session_dir, name))
+        )
+        self.add_session_files(session_id, paths)
+
+    def clear_session(self, session_id: str):
         """
-        Remove session-specific index from memory.
+        Remove all state for a session: chat history, index (memory and disk)
+        and uploaded files.
         
         Args:
             session_id: Session identifier to clear
         """
-        if session_id in _SESSION_INDEXES:
-            del _SESSION_INDEXES[session_id]
-            print(f"[RAGEngine] Cleared session index: {session_id}")
-
-    def _retrieve(self, session_id: str, query: str) -> List[Document]:
+        self.sessions.clear(session_id)
+        logger.info("Cleared session: %s", session_id)
+
+    def stats(self) -> Dict[str, float]:
+        """Point-in-time numbers for monitoring (sessions, index sizes, answer cache)."""
+        sessions = self.sessions.stats()
+        cache = self.answer_cache.stats()
+        permanent = self.permanent_store.size()
+        return {
+            "sessions": sessions["sessions"],
+            "resident_session_indexes": sessions["resident_indexes"],
+            "resident_session_index_bytes": sessions["resident_index_bytes"],
+            "permanent_index_vectors": permanent["vectors"],
+            "permanent_index_file_bytes": permanent["file_bytes"],
+            "permanent_index_partitions": permanent["partitions"],
+            "answer_cache_entries": cache["entries"],
+            "answer_cache_hit_rate": cache["hit_rate"],
+        }
+
+    def _retrieve(self, session_id: str, query: str, query_vector: Optional[List[float]] = None,
+                  permanent: Optional[PartitionedStore] = None,
+                  tenant: Optional[str] = None, community: Optional[str] = None) -> List[Document]:
+        """Retrieve documents from both permanent and session-specific indexes (see _search)."""
+        hits = self._search(session_id, query, query_vector, permanent, tenant, community)
+        return [store.document(doc_id) for store, doc_id in hits]
+
+    def _search(self, session_id: str, query: str, query_vector: Optional[List[float]] = None,
+                permanent: Optional[PartitionedStore] = None,
+                tenant: Optional[str] = None, community: Optional[str] = None) -> List[Tuple]:
         """
-        Retrieve documents from both permanent and session-specific indexes.
+        Rank chunks from both permanent and session-specific indexes.
         Session uploads are prioritized over permanent knowledge base.
         
+        The query is embedded once (or taken from `query_vector`) and the same
+        vector is used to search every index; the session and permanent searches
+        run concurrently. The session index and the permanent index each yield a
+        vector ranking and a BM25 ranking (the permanent partitions' hits merged
+        by raw score), and all rankings are merged with reciprocal rank fusion.
+        Of the permanent index only the shared partition and those of `tenant`
+        (narrowed to `community`, if given) are searched.
+        
         Args:
             session_id: Session identifier
             query: User's query
+            query_vector: Pre-computed query embedding, if the caller has one
+            permanent: Permanent index to search (default: the live one)
+            tenant: Tenant whose documents may be used (None: shared documents only)
+            community: Community of `tenant` to narrow to
             
         Returns:
-            List of relevant documents
+            (store, docstore id) of the relevant chunks, best first
         """
+        permanent = permanent or self.permanent_store
         k = max(settings.top_k, 4)
-        all_docs = []
-
-        # Search session-specific uploads FIRST if they exist
-        if session_id in _SESSION_INDEXES:
+        depth = 2 * k  # candidates per ranking fed into fusion
+
+        if query_vector is None:
+            with timed("embed_query"):
+                query_vector = permanent._embeddings.embed_query(query)
+
+        # Search session-specific uploads (in parallel with the permanent index) if they exist
+        session_store = self.sessions.get_index(session_id)
+        sess_future = None
+        if session_store is not None:
+            def _search_session():
+                with session_store.lock, timed("search_session"):
+                    return session_store.search(query, query_vector, depth)
+            sess_future = self._search_executor.submit(in_context(_search_session))
+
+        # The session store contributes a vector ranking and a BM25 ranking, and so does
+        # the permanent index; keys are (store, docstore id) so the same chunk from both rankings fuses
+        stores = {}
+        rankings = []
+
+        # Search the permanent knowledge base partitions this tenant may see. The partitions
+        # share one embedding space, so their vector hits are merged by distance into a single
+        # ranking (and their BM25 hits by score); ranking each partition on its own would give
+        # the best hit of a small partition as much weight as the best hit overall.
+        hits = {}
+        vec_hits, lex_hits = [], []
+        with timed("search_permanent"):
+            for key, part in permanent.select(tenant, community).items():
+                name = f"permanent:{key}"
+                try:
+                    part_vec, part_lex = part.search(query, query_vector, depth)
+                except Exception:
+                    logger.exception("Permanent index search failed (partition %s)", key)
+                    continue
+                stores[name] = part
+                vec_hits.extend(((name, i), distance) for i, distance in part_vec)
+                lex_hits.extend(((name, i), score) for i, score in part_lex)
+                hits[name] = (len(part_vec), len(part_lex))
+        vec_hits.sort(key=lambda hit: hit[1])
+        lex_hits.sort(key=lambda hit: hit[1], reverse=True)
+        rankings.append(([key for key, _ in vec_hits[:depth]], 1.0))
+        rankings.append(([key for key, _ in lex_hits[:depth]], 1.0))
+
+        if sess_future is not None:
             try:
-                session_db = _SESSION_INDEXES[session_id]._db
-                sess_docs = session_db.similarity_search_with_score(query, k=k)
-                # Prioritize session docs by giving them better scores (boost them)
-                all_docs.extend([(d, s * 0.5, i) for i, (d, s) in enumerate(sess_docs)])
-                print(f"[RAGEngine] Retrieved {len(sess_docs)} docs from session index")
-            except Exception as e:
-                print(f"[RAGEngine] Session index search failed: {e}")
-
-        # Then search permanent knowledge base
+                sess_vec, sess_lex = sess_future.result()
+                vec_ids = [i for i, _distance in sess_vec]
+                lex_ids = [i for i, _score in sess_lex]
+                # Prioritize session docs by giving their rankings more weight
+                stores["session"] = session_store
+                rankings.append(([("session", i) for i in vec_ids], settings.session_rank_weight))
+                rankings.append(([("session", i) for i in lex_ids], settings.session_rank_weight))
+                hits["session"] = (len(vec_ids), len(lex_ids))
+            except Exception:
+                logger.exception("Session index search failed")
+
+        with timed("rerank"):
+            fused = reciprocal_rank_fusion(rankings, k=settings.rrf_k)
+            ranked = [(stores[name], doc_id) for (name, doc_id), _score in fused[:k]]
+        if debug_sampled(logger):
+            # hits: store -> (vector hits, BM25 hits)
+            logger.debug("Retrieved %d documents after ranking", len(ranked), extra={"hits": hits})
+        return ranked
+
+    @staticmethod
+    def _chunk_vectors(hits: List[Tuple]) -> Optional[np.ndarray]:
+        """Stored vectors of ranked chunks (rows aligned with `hits`), for citation attribution."""
+        if not hits:
+            return None
         try:
-            perm_docs = self.permanent_db.similarity_search_with_score(query, k=k)
-            all_docs.extend([(d, s, i + 100) for i, (d, s) in enumerate(perm_docs)])
-            print(f"[RAGEngine] Retrieved {len(perm_docs)} docs from permanent index")
-        except Exception as e:
-            print(f"[RAGEngine] Permanent index search failed: {e}")
-
-        if not all_docs:
-            print("[RAGEngine] No documents retrieved")
-            return []
-
-        # Sort by similarity score (lower is better for FAISS)
-        # Session docs will rank higher due to the 0.5 multiplier
-        all_docs.sort(key=lambda x: x[1])
-        all_docs = _keyword_boost(query, all_docs)
-
-        final_docs = [d for d, _s, _i in all_docs[:max(settings.top_k, 4)]]
-        print(f"[RAGEngine] Returning {len(final_docs)} documents after ranking")
-        return final_docs
-
-    def qa_with_history(self, session_id: str, query: str) -> Dict:
+            return np.vstack([store.vectors([doc_id]) for store, doc_id in hits])
+        except Exception:
+            logger.warning("Could not read stored chunk vectors; citations will embed the chunks", exc_info=True)
+            return None
+
+    def _previous_question(self, history: List[Dict[str, str]], query: str) -> Optional[Dict]:
+        """Answer "previous question" queries straight from history (no retrieval, no LLM)."""
+        if "previous question" not in (query or "").lower():
+            return None
+        last_q = next((m["content"] for m in reversed(history) if m["role"] == "user"), None)
+        ans = f'The previous question you asked was: "{last_q}"' if last_q else "No previous question found."
+        CHAT_REQUESTS.labels(outcome="history").inc()
+        return {"answer": ans, "citations": [], "attributions": [], "index_version": self.permanent.version}
+
+    def _prepare(self, session_id: str, query: str, tenant: Optional[str] = None, community: Optional[str] = None):
+        """
+        Answer-cache lookup plus retrieval (runs on the retrieval executor).
+        
+        Sessions with uploads bypass the cache: their answers depend on private
+        documents. For everyone else an exact (query, retrieved chunks) hit, or
+        with ANSWER_CACHE_SIMILARITY a paraphrase that retrieved the same chunks,
+        skips the LLM. Cache entries are scoped by tenant/community, so answers
+        never cross tenants.
+        
+        The permanent index is read once, so the whole request runs against one
+        version even if a reload swaps it meanwhile.
+        
+        Returns:
+            (cached_result or None, retrieved docs, their stored vectors (None on a cache hit),
+            cache context for _finish, index version)
+        """
+        permanent = self.permanent_store
+        version = permanent.version
+        cache = self.answer_cache
+        if not cache.enabled or self.sessions.get_index(session_id) is not None:
+            hits = self._search(session_id, query, permanent=permanent, tenant=tenant, community=community)
+            retrieved = [store.document(doc_id) for store, doc_id in hits]
+            return None, retrieved, self._chunk_vectors(hits), None, version
+
+        scope = f"{tenant or ''}/{community or ''}"
+        with timed("embed_query"):
+            query_vector = permanent._embeddings.embed_query(query)
+        hits = self._search(session_id, query, query_vector, permanent, tenant, community)
+        retrieved = [store.document(doc_id) for store, doc_id in hits]
+        chunk_ids = [d.metadata.get("chunk_id") or "" for d in retrieved]
+        hit = cache.get(query, chunk_ids, scope)
+        if hit:
+            logger.debug("Answer cache hit")
+            CHAT_REQUESTS.labels(outcome="cache_exact").inc()
+            return hit, retrieved, None, None, version
+        if cache.semantic:
+            hit = cache.find_similar(query_vector, chunk_ids, scope)
+            if hit:
+                logger.debug("Answer cache hit (similar query)")
+                CHAT_REQUESTS.labels(outcome="cache_similar").inc()
+                return hit, retrieved, None, None, version
+        cache_ctx = (query, chunk_ids, query_vector if cache.semantic else None, version, scope)
+        return None, retrieved, self._chunk_vectors(hits), cache_ctx, version
+
+    def _build_chain(self, query: str, retrieved: List[Document], vectors: Optional[np.ndarray] = None):
+        """
+        Pick the prompt for this query and build its inputs.
+        
+        Retrieved chunks are packed best-first into settings.context_token_budget
+        tokens (see context_packer.pack_context).
+        
+        Returns:
+            (chain, inputs, chunks in the context, their rows of `vectors`) ready for invoke/ainvoke
+        """
+        if debug_sampled(logger):
+            # Preview retrieved documents
+            previews = [
+                {"source": doc.metadata.get("source", "unknown"), "preview": doc.page_content[:200].replace("\n", " ")}
+                for doc in retrieved[:2]
+            ]
+            logger.debug("Building prompt from %d documents", len(retrieved), extra={"query": query, "docs": previews})
+
+        if not retrieved:
+            # No relevant documents found - use general knowledge
+            return QA_PROMPT_GENERAL | self.llm, {"question": query}, [], None
+
+        with timed("prompt_build"):
+            context_block, used = pack_context(retrieved)
+        used_vectors = None
+        if vectors is not None:
+            rows = {id(doc): i for i, doc in enumerate(retrieved)}  # `used` holds the same objects
+            used_vectors = vectors[[rows[id(doc)] for doc in used]]
+
+        # Generate answer using context (no history to avoid confusion)
+        return QA_PROMPT_PROPERTY | self.llm, {"question": query, "context": context_block}, used, used_vectors
+
+    async def _ainvoke_llm(self, chain, inputs: Dict[str, str]):
+        """
+        Run the LLM call within settings.llm_deadline (retries and fallbacks included).
+
+        With settings.llm_coalesce, concurrent requests with identical inputs
+        (same question, same retrieved context) share one upstream call.
+        """
+        async def call():
+            with timed("llm_total"):
+                return await chain.ainvoke(inputs)
+
+        async with asyncio.timeout(settings.llm_deadline):
+            if not settings.llm_coalesce:
+                return await call()
+            # The general and the document prompt have different input keys, so keys never collide
+            return await self._llm_calls.run(tuple(sorted(inputs.items())), call)
+
+    def _finish(self, history: List[Dict[str, str]], query: str, raw: str, retrieved: List[Document],
+                vectors: Optional[np.ndarray] = None, cache_ctx=None, version: Optional[str] = None) -> Dict:
+        """
+        Clean the raw LLM output, record the turn in history, attach citations and cache it.
+        Citations are chosen among `retrieved`: the chunks that were in the prompt, with their
+        stored `vectors` (see attribution.attribute; this embeds the answer's sentences).
+        """
+        answer_text = _clean_answer(raw)
+        if debug_sampled(logger):
+            logger.debug("LLM answer", extra={"raw": raw[:200], "cleaned": answer_text[:200]})
+
+        citations, attributions = [], []
+        if retrieved:
+            with timed("citations"):
+                citations, attributions = attribute(answer_text, retrieved, vectors, self.permanent_store._embeddings)
+        result = {"answer": answer_text, "citations": citations, "attributions": attributions}
+        CHAT_REQUESTS.labels(outcome="llm").inc()
+        self._remember(history, query, result)
+
+        if cache_ctx:
+            cached_query, chunk_ids, query_vector, cache_version, scope = cache_ctx
+            self.answer_cache.put(cached_query, chunk_ids, result, query_vector, cache_version, scope)
+        return {**result, "index_version": version}
+
+    def _remember(self, history: List[Dict[str, str]], query: str, result: Dict,
+                  version: Optional[str] = None) -> Dict:
+        """Record a question/answer turn in the session history."""
+        history.append({"role": "user", "content": query})
+        history.append({"role": "assistant", "content": result["answer"]})
+        return {**result, "index_version": version} if version is not None else result
+
+    def qa_with_history(self, session_id: str, query: str,
+                        tenant: Optional[str] = None, community: Optional[str] = None) -> Dict:
         """
         Answer a question using RAG with conversation history.
         
         Args:
             session_id: Session identifier for history tracking
             query: User's question
+            tenant: Tenant whose documents may be used besides the shared ones
+            community: Community of `tenant` to narrow to
             
         Returns:
-            Dictionary with 'answer' and 'citations' keys
+            Dictionary with 'answer', 'citations', 'attributions' (the citation of each answer
+            sentence) and 'index_version' (the permanent index used) keys
         """
-        history = _SESSION_MEMORY.setdefault(session_id, [])
+        history = self.sessions.history(session_id)
 
         # Handle "previous question" queries
-        if "previous question" in (query or "").lower():
-            last_q = next((m["content"] for m in reversed(history) if m["role"] == "user"), None)
-            ans = f'The previous question you asked was: "{last_q}"' if last_q else "No previous question found."
-            return {"answer": ans, "citations": []}
-
-        # Search both permanent and session documents
-        retrieved = self._retrieve(session_id, query)
-        
-        print(f"\n{'='*60}")
-        print(f"Query: {query}")
-        print(f"Retrieved {len(retrieved)} documents")
+        early = self._previous_question(history, query)
+        if early:
+            return early
+
+        # Search both permanent and session documents (or reuse a cached answer)
+        cached, retrieved, vectors, cache_ctx, version = self._prepare(session_id, query, tenant, community)
+        if cached:
+            return self._remember(history, query, cached, version)
+        chain, inputs, used, used_vectors = self._build_chain(query, retrieved, vectors)
+        with timed("llm_total"):
+            response = chain.invoke(inputs)
+        return self._finish(history, query, getattr(response, "content", ""), used, used_vectors, cache_ctx, version)
+
+    async def aqa_with_history(self, session_id: str, query: str,
+                               tenant: Optional[str] = None, community: Optional[str] = None) -> Dict:
+        """
+        Async variant of qa_with_history for the API routes.
         
-        # Preview retrieved documents
-        for i, doc in enumerate(retrieved[:2], 1):
-            preview = doc.page_content[:200].replace('\n', ' ')
-            print(f"\nDoc {i} preview:\n{preview}")
-            print(f"Source: {doc.metadata.get('source', 'unknown')}")
-        print(f"{'='*60}\n")
+        Embedding and FAISS search run on the bounded retrieval executor and the
+        LLM call is awaited via ainvoke, so the event loop is never blocked.
+        At most settings.chat_concurrency requests run the pipeline at once.
+        The LLM call is bounded by settings.llm_deadline (asyncio.TimeoutError).
         
-        if retrieved:
-            # Build context from retrieved documents - LIMIT to top 2 for free models
-            top_docs = retrieved[:2]  # Only use top 2 most relevant docs
-            context_block = "\n\n".join([d.page_content for d in top_docs])
-            
-            # Truncate context if too long (free models struggle with long context)
-            max_context_length = 1500  # characters
-            if len(context_block) > max_context_length:
-                context_block = context_block[:max_context_length] + "..."
-
-            # Generate answer using context (no history to avoid confusion)
-            chain = QA_PROMPT_PROPERTY | self.llm
-            response = chain.invoke({
-                "question": query, 
-                "context": context_block
-            })
-            answer_text = _clean_answer(getattr(response, "content", ""))
+        Args:
+            session_id: Session identifier for history tracking
+            query: User's question
+            tenant: Tenant whose documents may be used besides the shared ones
+            community: Community of `tenant` to narrow to
             
-            print(f"DEBUG - Context length: {len(context_block)} chars")
-            print(f"DEBUG - Raw LLM response (first 200 chars): {getattr(response, 'content', '')[:200]}")
-            print(f"DEBUG - Cleaned answer (first 200 chars): {answer_text[:200]}")
-
-            # Update history
-            history.append({"role": "user", "content": query})
-            history.append({"role": "assistant", "content": answer_text})
-
-            # FIXED: Use 'retrieved' instead of 'retrieved_docs'
-            citations = _select_citations(answer_text, retrieved)
-            return {"answer": answer_text, "citations": citations}
-        else:
-            # No relevant documents found - use general knowledge
-            chain = QA_PROMPT_GENERAL | self.llm
-            response = chain.invoke({"question": query})
-            answer_text = _clean_answer(getattr(response, "content", ""))
-
-            # Update history
-            history.append({"role": "user", "content": query})
-            history.append({"role": "assistant", "content": answer_text})
-
-            return {"answer": answer_text, "citations": []}
\ No newline at end of file
+        Returns:
+            Dictionary with 'answer', 'citations', 'attributions' and 'index_version' keys
+        """
+        async with self._chat_slots:
+            history = self.sessions.history(session_id)
+
+            early = self._previous_question(history, query)
+            if early:
+                return early
+
+            loop = asyncio.get_running_loop()
+            cached, retrieved, vectors, cache_ctx, version = await loop.run_in_executor(
+                self._executor, in_context(self._prepare, session_id, query, tenant, community)
+            )
+            if cached:
+                return self._remember(history, query, cached, version)
+            chain, inputs, used, used_vectors = self._build_chain(query, retrieved, vectors)
+            response = await self._ainvoke_llm(chain, inputs)
+            # Citation attribution embeds the answer's sentences: keep it off the event loop
+            return await loop.run_in_executor(self._executor, in_context(
+                self._finish, history, query, getattr(response, "content", ""), used, used_vectors, cache_ctx, version
+            ))
+
+    async def astream_with_history(self, session_id: str, query: str, tenant: Optional[str] = None,
+                                   community: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Stream an answer as it is generated.
+        
+        Yields events as {"event": name, "data": dict}:
+        - "token": {"text": ...} cleaned answer text, in order
+        - "citations": {"citations": [...], "attributions": [...]} once generation has finished
+        - "done": {"answer": ..., "index_version": ...} the fully cleaned answer (same as qa_with_history)
+        
+        History is only recorded when the stream runs to completion.
+        
+        Args:
+            session_id: Session identifier for history tracking
+            query: User's question
+            tenant: Tenant whose documents may be used besides the shared ones
+            community: Community of `tenant` to narrow to
+        """
+        async with self._chat_slots:
+            history = self.sessions.history(session_id)
+
+            early = self._previous_question(history, query)
+            if early:
+                yield {"event": "token", "data": {"text": early["answer"]}}
+                yield {"event": "citations", "data": {"citations": [], "attributions": []}}
+                yield {"event": "done", "data": {"answer": early["answer"], "index_version": early["index_version"]}}
+                return
+
+            loop = asyncio.get_running_loop()
+            cached, retrieved, vectors, cache_ctx, version = await loop.run_in_executor(
+                self._executor, in_context(self._prepare, session_id, query, tenant, community)
+            )
+            if cached:
+                yield {"event": "token", "data": {"text": cached["answer"]}}
+                yield {"event": "citations", "data": {"citations": cached["citations"],
+                                                      "attributions": cached.get("attributions", [])}}
+                yield {"event": "done", "data": {"answer": cached["answer"], "index_version": version}}
+                self._remember(history, query, cached)
+                return
+            chain, inputs, used, used_vectors = self._build_chain(query, retrieved, vectors)
+
+            cleaner = _StreamCleaner()
+            parts: List[str] = []
+            t0, first_token = time.perf_counter(), True
+            # Checked between chunks (a stalled stream is cut off by the HTTP read timeout)
+            deadline = loop.time() + settings.llm_deadline
+            async for chunk in chain.astream(inputs):
+                if loop.time() > deadline:
+                    raise asyncio.TimeoutError(f"LLM stream exceeded {settings.llm_deadline}s")
+                piece = getattr(chunk, "content", "") or ""
+                if piece and first_token:
+                    observe("llm_first_token", time.perf_counter() - t0)
+                    first_token = False
+                parts.append(piece)
+                text = cleaner.feed(piece)
+                if text:
+                    yield {"event": "token", "data": {"text": text}}
+            observe("llm_total", time.perf_counter() - t0)
+            tail = cleaner.finish()
+            if tail:
+                yield {"event": "token", "data": {"text": tail}}
+
+            result = await loop.run_in_executor(self._executor, in_context(
+                self._finish, history, query, "".join(parts), used, used_vectors, cache_ctx, version
+            ))
+            yield {"event": "citations", "data": {"citations": result["citations"],
+                                                  "attributions": result["attributions"]}}
+            yield {"event": "done", "data": {"answer": result["answer"], "index_version": version}}
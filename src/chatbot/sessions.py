@@ -0,0 +1,300 @@
+# src/chatbot/sessions.py
+
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from config.settings import settings
+
+if TYPE_CHECKING:
+    # Imported lazily: session-id helpers are used by the API before the heavy stack is loaded
+    from src.chatbot.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+# <session_indexes_dir>/.access/<session_id>: its mtime is the session's last access by any worker
+ACCESS_DIR = ".access"
+# A worker refreshes a session's access marker at most this often (seconds)
+_ACCESS_WRITE_INTERVAL = 60
+
+
+def is_valid_session_id(session_id: str) -> bool:
+    """Session ids become directory names, so only allow safe characters."""
+    return bool(session_id) and bool(_SESSION_ID_RE.match(session_id))
+
+
+def session_upload_dir(session_id: str) -> str:
+    if not is_valid_session_id(session_id):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return os.path.join(settings.uploads_dir, session_id)
+
+
+def session_index_dir(session_id: str) -> str:
+    if not is_valid_session_id(session_id):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return os.path.join(settings.session_indexes_dir, f"session_{session_id}")
+
+
+def session_access_path(session_id: str) -> str:
+    if not is_valid_session_id(session_id):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return os.path.join(settings.session_indexes_dir, ACCESS_DIR, session_id)
+
+
+def _session_paths(session_id: str) -> List[str]:
+    return [session_upload_dir(session_id), session_index_dir(session_id), session_access_path(session_id)]
+
+
+def _last_access_on_disk(session_id: str) -> float:
+    """Latest mtime of a session's access marker and directories (0 if it has none)."""
+    latest = 0.0
+    for path in _session_paths(session_id):
+        try:
+            latest = max(latest, os.path.getmtime(path))
+        except OSError:
+            pass
+    return latest
+
+
+def _record_access(session_id: str) -> None:
+    path = session_access_path(session_id)
+    try:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a"):
+                pass
+    except OSError as e:
+        logger.warning("Could not record access for %s: %s", session_id, e)
+
+
+def _index_bytes(store: "VectorStore") -> int:
+    """Rough resident size of a session index: float32 vectors plus chunk text."""
+    db = store._db
+    if db is None:
+        return 0
+    vectors = db.index.ntotal * db.index.d * 4
+    text = sum(len(d.page_content or "") for d in getattr(db.docstore, "_dict", {}).values())
+    return vectors + text
+
+
+class _Session:
+    __slots__ = ("history", "last_access", "has_index", "recorded_access")
+
+    def __init__(self):
+        self.history: List[Dict[str, str]] = []
+        self.last_access = time.time()
+        self.has_index: Optional[bool] = None  # None = not checked on disk yet
+        self.recorded_access = 0.0  # last time the access marker on disk was refreshed
+
+
+class SessionManager:
+    """
+    Owns all per-session state: chat history and session FAISS indexes.
+
+    - Sessions idle for longer than `ttl_seconds` are dropped, together with
+      their upload and index directories, by a background sweeper. Files are
+      only deleted once no worker has used the session for `ttl_seconds`:
+      every access refreshes a marker file (see ACCESS_DIR) that all workers see.
+    - At most `max_resident` session indexes (and `budget_mb` of estimated
+      index memory) stay loaded; the least recently used ones are evicted.
+      Session indexes are always saved on disk, so an evicted index is simply
+      reloaded the next time that session asks a question.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[int] = None,
+        max_resident: Optional[int] = None,
+        budget_mb: Optional[int] = None,
+    ):
+        self.ttl = settings.session_ttl if ttl_seconds is None else ttl_seconds
+        self.max_resident = settings.max_resident_sessions if max_resident is None else max_resident
+        budget_mb = settings.session_memory_budget_mb if budget_mb is None else budget_mb
+        self.budget_bytes = budget_mb * 1024 * 1024
+
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, _Session] = {}
+        # LRU of loaded indexes, most recently used last
+        self._resident: "OrderedDict[str, VectorStore]" = OrderedDict()
+        self._resident_bytes: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    # -------------------------
+    # History
+    # -------------------------
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            return self._touch(session_id).history
+
+    # -------------------------
+    # Indexes
+    # -------------------------
+    def get_index(self, session_id: str) -> Optional["VectorStore"]:
+        """Return the session's index, reloading it from disk if it was evicted."""
+        with self._lock:
+            session = self._touch(session_id)
+            store = self._resident.get(session_id)
+            if store is not None:
+                self._resident.move_to_end(session_id)
+                return store
+            if session.has_index is False:
+                return None
+
+        from src.chatbot.vector_store import VectorStore
+        store = VectorStore(index_dir=session_index_dir(session_id))
+        loaded = False
+        if store.has_saved_index():
+            try:
+                loaded = store.load() is not None
+            except Exception as e:
+                logger.warning("Reloading index for %s failed: %s", session_id, e)
+
+        with self._lock:
+            session = self._touch(session_id)
+            existing = self._resident.get(session_id)
+            if existing is not None:
+                return existing
+            session.has_index = loaded
+            if not loaded:
+                return None
+            logger.info("Reloaded index for %s from disk", session_id)
+            self._admit(session_id, store)
+        return store
+
+    def index_for_update(self, session_id: str) -> "VectorStore":
+        """The resident index to append to, or a fresh store (add_files loads from disk itself)."""
+        from src.chatbot.vector_store import VectorStore
+        with self._lock:
+            self._touch(session_id)
+            store = self._resident.get(session_id)
+        return store or VectorStore(index_dir=session_index_dir(session_id))
+
+    def put_index(self, session_id: str, store: "VectorStore") -> None:
+        """Register (or re-measure) a session index after it changed."""
+        with self._lock:
+            self._touch(session_id).has_index = True
+            self._admit(session_id, store)
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def clear(self, session_id: str) -> None:
+        """Forget a session and delete its uploads and index from disk."""
+        self._forget(session_id)
+        self._delete_files(session_id)
+
+    def sweep(self) -> List[str]:
+        """
+        Drop sessions idle for longer than the TTL, and delete the files of every
+        session (known to this worker or not) that no worker used for longer than the TTL.
+        Dot-directories (e.g. uploads/.incoming, streamed uploads in progress) are left alone.
+
+        Returns:
+            Session ids that were removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if now - s.last_access > self.ttl]
+            live = set(self._sessions) - set(expired)
+        for sid in expired:
+            self._forget(sid)
+
+        on_disk = set()
+        for base, prefix in ((settings.uploads_dir, ""), (settings.session_indexes_dir, "session_"),
+                             (os.path.join(settings.session_indexes_dir, ACCESS_DIR), "")):
+            if not os.path.isdir(base):
+                continue
+            for name in os.listdir(base):
+                sid = name[len(prefix):]
+                if name.startswith(prefix) and not name.startswith(".") and is_valid_session_id(sid):
+                    on_disk.add(sid)
+
+        # Another worker may still be serving a session this one has forgotten (or never saw)
+        stale = sorted(sid for sid in on_disk - live if now - _last_access_on_disk(sid) > self.ttl)
+        for sid in stale:
+            self._delete_files(sid)
+
+        if expired or stale:
+            logger.info("Swept %d expired session(s), deleted files of %d stale session(s)", len(expired), len(stale))
+        return expired + [sid for sid in stale if sid not in expired]
+
+    def start_sweeper(self, interval: Optional[int] = None) -> None:
+        """Run sweep() every `interval` seconds on a daemon thread."""
+        if self._sweeper is not None:
+            return
+        interval = settings.session_sweep_interval if interval is None else interval
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.exception("Sweep failed")
+
+        self._sweeper = threading.Thread(target=_loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "resident_indexes": len(self._resident),
+                "resident_index_bytes": sum(self._resident_bytes.values()),
+            }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._resident.pop(session_id, None)
+            self._resident_bytes.pop(session_id, None)
+
+    @staticmethod
+    def _delete_files(session_id: str) -> None:
+        for path in _session_paths(session_id):
+            if os.path.isdir(path):
+                logger.info("Deleting directory: %s", path)
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def _touch(self, session_id: str) -> _Session:
+        """Mark a session used (caller holds the lock), refreshing its marker on disk now and then."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+        now = time.time()
+        session.last_access = now
+        if now - session.recorded_access > min(_ACCESS_WRITE_INTERVAL, self.ttl / 4):
+            session.recorded_access = now
+            _record_access(session_id)
+        return session
+
+    def _admit(self, session_id: str, store: "VectorStore") -> None:
+        """Make `store` resident and evict to the count/memory limits (caller holds the lock)."""
+        self._resident[session_id] = store
+        self._resident.move_to_end(session_id)
+        self._resident_bytes[session_id] = _index_bytes(store)
+
+        # Evict least recently used indexes, but never the one just admitted
+        while len(self._resident) > 1 and (
+            len(self._resident) > self.max_resident
+            or sum(self._resident_bytes.values()) > self.budget_bytes
+        ):
+            evicted, _ = self._resident.popitem(last=False)
+            self._resident_bytes.pop(evicted, None)
+            logger.info("Evicted index for %s (kept on disk)", evicted)
@@ -0,0 +1,15 @@
+# src/chatbot/tenants.py
+#
+# Tenant/community names, kept free of the heavy stack so the API can validate
+# requests before the engine (langchain, FAISS) has been imported.
+
+import re
+
+# Partition of documents outside <docs_dir>/tenants/ (searched for every tenant); not a tenant name
+SHARED = "shared"
+_NAME_RE = re.compile(r"^[\w][\w.-]{0,63}$")
+
+
+def is_valid_name(name: str) -> bool:
+    """Tenant/community names accepted from API callers."""
+    return bool(_NAME_RE.match(name or ""))
@@ -0,0 +1,118 @@
+# src/chatbot/upload_jobs.py
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from config.settings import settings
+from src.utils.logs import in_context
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJobManager:
+    """
+    Runs upload ingestion (OCR, chunking, embedding) on a background worker pool
+    so /api/upload can return as soon as the files are on disk.
+
+    Each job tracks per-file status:
+      queued -> processing -> indexed | duplicate | failed
+    Files are indexed one at a time, so chat starts using the session index as
+    soon as the first file is done. Jobs for the same session run one after the
+    other (the session index is append-only and not safe for concurrent writers).
+    """
+
+    def __init__(self, engine, workers: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self._engine = engine
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers or settings.ingest_workers, thread_name_prefix="upload-ingest"
+        )
+        self._ttl = settings.upload_job_ttl if ttl_seconds is None else ttl_seconds
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._session_locks: Dict[str, threading.Lock] = {}
+
+    def submit(self, session_id: str, paths: List[str]) -> Dict:
+        """Queue `paths` for indexing into the session's index and return the job snapshot."""
+        job_id = str(uuid4())
+        job = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "finished_at": None,
+            "files": [{"name": os.path.basename(p), "status": "queued", "error": None} for p in paths],
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+            session_lock = self._session_locks.setdefault(session_id, threading.Lock())
+        self._pool.submit(in_context(self._run, job_id, list(paths), session_lock))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a copy of the job's current state, or None if unknown/expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job, files=[dict(f) for f in job["files"]])
+        done = sum(1 for f in snapshot["files"] if f["status"] not in ("queued", "processing"))
+        snapshot["progress"] = {"done": done, "total": len(snapshot["files"])}
+        return snapshot
+
+    def forget_session(self, session_id: str) -> None:
+        """Drop finished jobs (and the session lock, once no job needs it) for a cleared session."""
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items()
+                           if job["session_id"] == session_id and job["finished_at"]]:
+                del self._jobs[job_id]
+            self._drop_idle_locks()
+
+    def _run(self, job_id: str, paths: List[str], session_lock: threading.Lock) -> None:
+        job = self._jobs[job_id]
+        with session_lock:
+            self._set(job, status="running")
+            for entry, path in zip(job["files"], paths):
+                self._set(entry, status="processing")
+                try:
+                    _added, duplicates = self._engine.add_session_files(job["session_id"], [path])
+                    if duplicates:
+                        os.remove(path)
+                        self._set(entry, status="duplicate")
+                    else:
+                        self._set(entry, status="indexed")
+                except Exception as e:
+                    logger.exception("Indexing %s failed", entry["name"])
+                    self._set(entry, status="failed", error=str(e))
+
+        failed = bool(job["files"]) and all(f["status"] == "failed" for f in job["files"])
+        self._set(job, status="failed" if failed else "done", finished_at=time.time())
+
+    def _set(self, target: Dict, **changes) -> None:
+        with self._lock:
+            target.update(changes)
+
+    def _prune(self) -> None:
+        """Forget jobs that finished more than ttl seconds ago (caller holds the lock)."""
+        cutoff = time.time() - self._ttl
+        for job_id in [j for j, job in self._jobs.items()
+                       if job["finished_at"] and job["finished_at"] < cutoff]:
+            del self._jobs[job_id]
+        self._drop_idle_locks()
+
+    def _drop_idle_locks(self) -> None:
+        """
+        Forget session locks no unfinished job holds or waits for (caller holds the lock).
+
+        A queued job already has its session's lock object, so a lock that is not
+        held right now may still be needed; dropping it would let the next upload
+        create a second lock and index into the session concurrently.
+        """
+        busy = {job["session_id"] for job in self._jobs.values() if not job["finished_at"]}
+        for session_id in [s for s in self._session_locks if s not in busy]:
+            del self._session_locks[session_id]
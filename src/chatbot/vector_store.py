@@ -1,34 +1,327 @@
 # src/chatbot/vector_store.py
+import logging
 import os
+import threading
 from pathlib import Path
+import faiss
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from config.settings import settings
+from src.chatbot.ann_index import build_index, index_config, reconstruct, tune
+from src.chatbot.chunk_store import (
+    CHUNKS_FILE, OFFSETS_FILE, ChunkStore, PositionIds, current_generation, new_generation, publish_generation,
+    read_index, remove_chunks, write_chunks,
+)
+from src.chatbot.embeddings import embedding_id, get_embeddings
+from src.chatbot.index_cache import build_manifest, file_sha256, load_manifest, manifest_key, manifest_version, save_manifest
+from src.chatbot.lexical import BM25_FILE, BM25Index
+from src.data.loaders import load_documents, load_file
+from src.data.processors import chunk_documents
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Files written by FAISS.save_local (mmap'd indexes replace index.pkl with chunk_store files,
+# all kept in one generation directory: see chunk_store.MMAP_DIR)
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
 
 class VectorStore:
-    def __init__(self, index_dir=None):
+    def __init__(self, index_dir=None, index_type=None, mmap=False):
         self.index_dir = index_dir or settings.index_dir
+        # Save as a memory-mapped, read-only index (shared page cache across processes);
+        # only for indexes that are rebuilt, never appended to
+        self.mmap = mmap
         self.embed_model = settings.embed_model
-        self._embeddings = HuggingFaceEmbeddings(model_name=self.embed_model)
+        # FAISS index built by rebuild() (see ann_index.INDEX_TYPES); appends keep whatever is loaded
+        self.index_config = index_config(index_type or "flat")
+        self._embeddings = get_embeddings(self.embed_model)
         self._db = None
+        # BM25 index over the same chunks, kept in step with _db
+        self.lexical = None
+        # Id of the loaded build (see index_cache.manifest_version); None for session indexes
+        self.version = None
+        # Guards in-place appends (add_files) against concurrent searches
+        self.lock = threading.Lock()
+        # (index_to_docstore_id, docstore id -> FAISS position) for stores with uuid ids (see vectors())
+        self._positions = (None, {})
+
+    def has_saved_index(self) -> bool:
+        if self._mmap_dir() is not None:
+            return True
+        return all(os.path.exists(os.path.join(self.index_dir, name)) for name in (INDEX_FILE, DOCSTORE_FILE))
+
+    def load(self):
+        """Load the saved index (and its BM25 index) from index_dir (None if there is none)."""
+        if not self.has_saved_index():
+            return None
+        if self._mmap_dir() is not None:
+            data_dir = self._open_mmap()
+        else:
+            data_dir = self.index_dir
+            self._db = FAISS.load_local(self.index_dir, self._embeddings, allow_dangerous_deserialization=True)
+            if self.mmap:
+                logger.info("Converting %s to the memory-mapped format", self.index_dir)
+                data_dir = self._save_mmap()  # new docstore ids, and a BM25 index to match
+            else:
+                self.lexical = self._load_lexical(data_dir)
+        tune(self._db.index)
+        if self.lexical is None or len(self.lexical) != self._db.index.ntotal:
+            # Saved before BM25 existed (or out of sync): rebuild it from the docstore
+            self.lexical = BM25Index.from_faiss(self._db)
+            self.lexical.save(data_dir)
+        return self._db
 
     def build_or_load(self, chunks):
         Path(self.index_dir).mkdir(parents=True, exist_ok=True)
-        index_file = os.path.join(self.index_dir, "faiss.index")
-        if os.path.exists(index_file):
-            self._db = FAISS.load_local(self.index_dir, self._embeddings, allow_dangerous_deserialization=True)
-        else:
-            self._db = FAISS.from_documents(chunks, self._embeddings)
-            self._db.save_local(self.index_dir)
+        if self.has_saved_index():
+            return self.load()
+        return self.rebuild(chunks)
+
+    def build_or_load_dir(self, docs_dir, chunk_size=None, chunk_overlap=None, build=True):
+        """
+        Load the saved index for `docs_dir` if its manifest still matches,
+        otherwise load, chunk and embed the directory and save a new index.
+
+        The manifest records file hashes, chunking parameters and the embedding
+        model, so any change to those triggers a rebuild and nothing else does.
+        With build=False a stale index is loaded as is (and a missing one is an
+        error): the index is then maintained by scripts/initialize_search_index.py.
+        """
+        chunk_size = chunk_size or settings.chunk_size
+        chunk_overlap = settings.chunk_overlap if chunk_overlap is None else chunk_overlap
+
+        previous = load_manifest(self.index_dir)
+        manifest = build_manifest(
+            docs_dir, embedding_id(self.embed_model), chunk_size, chunk_overlap, previous, index=self.index_config
+        )
+        self.version = manifest_version(manifest)
+
+        if previous and self.has_saved_index() and manifest_key(previous) == manifest_key(manifest):
+            logger.info("Index cache hit for %s, loading %s", docs_dir, self.index_dir)
+            return self.load()
+
+        if not build:
+            if not self.has_saved_index():
+                raise RuntimeError(
+                    f"No index in {self.index_dir}; build it with scripts/initialize_search_index.py"
+                )
+            logger.warning("Index in %s is out of date for %s; loading it anyway "
+                           "(rebuild with scripts/initialize_search_index.py)", self.index_dir, docs_dir)
+            self.version = manifest_version(previous) if previous else None
+            return self.load()
+
+        logger.info("Index cache miss for %s, rebuilding %s", docs_dir, self.index_dir)
+        docs = load_documents(docs_dir)
+        chunks = chunk_documents(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.rebuild(chunks)
+        save_manifest(self.index_dir, manifest)
         return self._db
-        
+
+    def add_files(self, paths, chunk_size=None, chunk_overlap=None):
+        """
+        Append files to this index without touching what is already in it.
+
+        Each file is hashed first; files whose content is already indexed are
+        skipped, so only new uploads are OCR'd, chunked and embedded. The index
+        and its per-file manifest are saved after every call. Callers must not
+        run two add_files on the same store at once.
+
+        Returns:
+            (added, duplicates): lists of file names
+        """
+        chunk_size = chunk_size or settings.chunk_size
+        chunk_overlap = settings.chunk_overlap if chunk_overlap is None else chunk_overlap
+
+        manifest = load_manifest(self.index_dir) or {"embed_model": embedding_id(self.embed_model), "files": {}}
+        known = {entry["sha256"] for entry in manifest["files"].values()}
+        if self._db is None and known:
+            self.load()
+
+        added, duplicates = [], []
+        for path in paths:
+            p = Path(path)
+            digest = file_sha256(str(p))
+            if digest in known:
+                duplicates.append(p.name)
+                continue
+            known.add(digest)
+
+            chunks = chunk_documents(load_file(p), chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            if chunks:
+                # Embed outside the lock; only the in-memory append blocks readers
+                texts = [c.page_content for c in chunks]
+                with timed("embed_documents"):
+                    pairs = list(zip(texts, self._embeddings.embed_documents(texts)))
+                metadatas = [c.metadata for c in chunks]
+                with self.lock:
+                    if self._db is None:
+                        self._db = FAISS.from_embeddings(pairs, self._embeddings, metadatas=metadatas)
+                        self.lexical = BM25Index.from_faiss(self._db)
+                    else:
+                        ids = self._db.add_embeddings(pairs, metadatas=metadatas)
+                        self.lexical.add(ids, texts)
+            manifest["files"][p.name] = {"sha256": digest, "chunks": len(chunks)}
+            added.append(p.name)
+
+        if added:
+            Path(self.index_dir).mkdir(parents=True, exist_ok=True)
+            if self._db is not None:
+                with self.lock:
+                    self._db.save_local(self.index_dir)
+                    self.lexical.save(self.index_dir)
+            save_manifest(self.index_dir, manifest)
+        return added, duplicates
+
+    def search(self, query: str, query_vector, k: int):
+        """
+        Rank this store's chunks for a query, by vector distance and by BM25.
+
+        Returns:
+            (vector_hits, lexical_hits): (docstore id, score) pairs, best first; vector
+            scores are L2 distances (lower is better), lexical ones BM25 scores
+        """
+        vec = np.asarray([query_vector], dtype=np.float32)
+        if self._db._normalize_L2:
+            faiss.normalize_L2(vec)
+        with timed("faiss_search"):
+            distances, positions = self._db.index.search(vec, k)
+        vector_hits = [
+            (self._db.index_to_docstore_id[p], float(d))
+            for p, d in zip(positions[0].tolist(), distances[0].tolist()) if p != -1
+        ]
+        with timed("bm25_search"):
+            lexical_hits = self.lexical.search(query, k) if self.lexical else []
+        return vector_hits, lexical_hits
+
+    def size(self):
+        """Vectors in the loaded index and bytes of its index file on disk."""
+        path = os.path.join(self._mmap_dir() or self.index_dir, INDEX_FILE)
+        return {
+            "vectors": self._db.index.ntotal if self._db is not None else 0,
+            "file_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+        }
+
+    def document(self, doc_id: str):
+        return self._db.docstore.search(doc_id)
+
+    def vectors(self, doc_ids):
+        """Stored embeddings of chunks by docstore id (rows in `doc_ids` order), read back from the index."""
+        db = self._db
+        with self.lock:
+            if isinstance(db.index_to_docstore_id, PositionIds):
+                positions = [int(doc_id) for doc_id in doc_ids]
+            else:
+                ids = db.index_to_docstore_id
+                mapped, lookup = self._positions
+                if mapped is not ids or len(lookup) != len(ids):  # rebuilt or appended to since the last call
+                    lookup = {doc_id: position for position, doc_id in ids.items()}
+                    self._positions = (ids, lookup)
+                positions = [lookup[doc_id] for doc_id in doc_ids]
+            return reconstruct(db.index, positions)
+
     def rebuild(self, chunks):
-        """Re-create the FAISS index from the given chunks and write to disk."""
+        """Re-create the FAISS and BM25 indexes from the given chunks and write to disk."""
         self._db = FAISS.from_documents(chunks, self._embeddings)
+        if self.index_config["type"] != "flat":
+            # Same vectors and ids, re-indexed with the configured (trained) index type
+            vectors = self._db.index.reconstruct_n(0, self._db.index.ntotal)
+            self._db.index = build_index(vectors, self.index_config)
         Path(self.index_dir).mkdir(parents=True, exist_ok=True)
-        self._db.save_local(self.index_dir)
+        if self.mmap:
+            self._save_mmap()
+        else:
+            self._db.save_local(self.index_dir)
+            remove_chunks(self.index_dir)  # load() prefers the chunk store when present
+            self.lexical = BM25Index.from_faiss(self._db)
+            self.lexical.save(self.index_dir)
+        return self._db
+
+    def save_prebuilt(self, vectors, docs):
+        """
+        Write an index from vectors computed elsewhere (e.g. the bulk ingestion CLI) in
+        the memory-mapped format. `docs` is an iterable in the same order as `vectors`.
+        """
+        Path(self.index_dir).mkdir(parents=True, exist_ok=True)
+        self._write_mmap(build_index(vectors, self.index_config), docs)
+        return self._db
+
+    def _save_mmap(self):
+        """
+        Write the loaded index as index.faiss + chunk store (no pickle), then reopen it
+        memory-mapped so this process shares pages with every other one serving it.
+        """
+        db = self._db
+        docs = (db.docstore.search(db.index_to_docstore_id[i]) for i in range(db.index.ntotal))
+        return self._write_mmap(db.index, docs)
+
+    def _write_mmap(self, index, docs):
+        """
+        Write the index, chunk store and BM25 index into a new generation directory and
+        publish it. Readers switch from one complete generation to the next and never
+        see an index from one build with the chunks of another.
+
+        Returns:
+            The generation directory
+        """
+        generation = new_generation(self.index_dir)
+        lexical = BM25Index()
+
+        def with_lexical(docs):
+            for position, doc in enumerate(docs):
+                lexical.add([str(position)], [doc.page_content])
+                yield doc
+
+        write_chunks(generation, with_lexical(docs))
+        faiss.write_index(index, os.path.join(generation, INDEX_FILE))
+        lexical.save(generation)
+        publish_generation(self.index_dir, generation)
+        # Files of the single-directory layouts (pickled, or mmap'd before generations)
+        for name in (INDEX_FILE, DOCSTORE_FILE, BM25_FILE, CHUNKS_FILE, OFFSETS_FILE):
+            path = os.path.join(self.index_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        self._open_mmap()
+        self.lexical = lexical
+        return generation
+
+    def _mmap_dir(self):
+        """Directory of the memory-mapped files: the live generation, or index_dir for the older layout."""
+        generation = current_generation(self.index_dir)
+        if generation is not None:
+            return generation
+        if ChunkStore.exists(self.index_dir) and os.path.exists(os.path.join(self.index_dir, INDEX_FILE)):
+            return self.index_dir
+        return None
+
+    def _open_mmap(self):
+        """Open the index, chunk store and BM25 index of one generation; returns its directory."""
+        while True:
+            data_dir = self._mmap_dir()
+            try:
+                index = read_index(os.path.join(data_dir, INDEX_FILE))
+                docstore = ChunkStore(data_dir)
+                lexical = self._load_lexical(data_dir)
+            except Exception:
+                if self._mmap_dir() != data_dir:
+                    continue  # replaced (and deleted) by a newer generation meanwhile
+                raise
+            self._db = FAISS(self._embeddings, index, docstore, PositionIds(index.ntotal))
+            self.lexical = lexical
+            return data_dir
+
+    def _load_lexical(self, data_dir):
+        if not os.path.exists(os.path.join(data_dir, BM25_FILE)):
+            return None
+        try:
+            return BM25Index.load(data_dir)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            logger.warning("Ignoring unreadable BM25 index in %s: %s", data_dir, e)
+            return None
 
     def as_retriever(self, k: int):
         if not self._db:
             raise RuntimeError("Vector DB not loaded. Call build_or_load first.")
-        return self._db.as_retriever(search_kwargs={"k": k})
\ No newline at end of file
+        return self._db.as_retriever(search_kwargs={"k": k})
@@ -1,29 +1,90 @@
 # src/data/loaders.py
 
-from pathlib import Path
-from typing import List
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
 from langchain_community.document_loaders import TextLoader, PyPDFLoader
 from langchain.schema import Document
 
-# -------- Optional OCR deps (graceful if missing) --------
-try:
-    import pytesseract  # type: ignore
-    from PIL import Image  # type: ignore
-    OCR_IMAGE_OK = True
-except Exception:
-    OCR_IMAGE_OK = False
+from config.settings import settings
+from src.chatbot.tenants import SHARED
+from src.utils.metrics import observe
 
-try:
-    from pdf2image import convert_from_path  # type: ignore
-    OCR_PDF_OK = True
-except Exception:
-    OCR_PDF_OK = False
+logger = logging.getLogger(__name__)
+
+# -------- Optional OCR deps (graceful if missing; imported on first use) --------
+@lru_cache(maxsize=None)
+def _image_ocr_deps():
+    """(pytesseract, PIL.Image), or None if they are not installed."""
+    try:
+        import pytesseract  # type: ignore
+        from PIL import Image  # type: ignore
+        return pytesseract, Image
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _pdf_ocr_deps():
+    """(convert_from_path, pdfinfo_from_path) from pdf2image, or None if not installed."""
+    try:
+        from pdf2image import convert_from_path, pdfinfo_from_path  # type: ignore
+        return convert_from_path, pdfinfo_from_path
+    except Exception:
+        return None
 
 # Which file types we handle
 TEXT_EXTS = {".txt", ".md"}
 PDF_EXTS = {".pdf"}
 IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
 
+# ("pdf", path, page_no) or ("image", path, None); plain tuples so they pickle cheaply
+OcrTask = Tuple[str, str, Optional[int]]
+
+# Tenant documents live under <docs_dir>/tenants/<tenant>/[communities/<community>/]
+TENANTS_DIR = "tenants"
+COMMUNITIES_DIR = "communities"
+# Not a tenant: the partition of documents every tenant searches
+RESERVED_TENANT = SHARED
+
+
+def document_tags(rel_path: str) -> Dict[str, str]:
+    """
+    Tenant/community/document-type tags of a file, from its path relative to docs_dir.
+
+        policy.md                                          -> {}  (shared by every tenant)
+        leases/standard.pdf                                -> {"doc_type": "leases"}
+        tenants/acme/pets.md                               -> {"tenant": "acme"}
+        tenants/acme/communities/oak-park/leases/lease.pdf -> {"tenant": "acme", "community": "oak-park",
+                                                               "doc_type": "leases"}
+
+    doc_type is the first directory below the tenant/community (or docs_dir) root.
+
+    Raises:
+        ValueError: for files of a tenant named "shared", which would otherwise land in
+            the partition every tenant searches
+    """
+    parts = list(PurePosixPath(rel_path).parts[:-1])
+    tags: Dict[str, str] = {}
+    if len(parts) >= 2 and parts[0] == TENANTS_DIR:
+        if parts[1] == RESERVED_TENANT:
+            raise ValueError(f"{TENANTS_DIR}/{RESERVED_TENANT}/ is reserved; not a tenant name")
+        tags["tenant"] = parts[1]
+        parts = parts[2:]
+        if len(parts) >= 2 and parts[0] == COMMUNITIES_DIR:
+            tags["community"] = parts[1]
+            parts = parts[2:]
+    if parts:
+        tags["doc_type"] = parts[0]
+    return tags
+
 
 def _set_common_metadata(doc: Document, src_path: Path, extra: dict | None = None) -> None:
     """Set standard metadata keys for consistent citations/debug."""
@@ -35,49 +96,213 @@ def _set_common_metadata(doc: Document, src_path: Path, extra: dict | None = Non
 
 def _ocr_image_path(img_path: Path) -> str:
     """Run OCR on a single image file. Returns extracted text (may be '')."""
-    if not OCR_IMAGE_OK:
-        print(f"[loaders] OCR skipped: Pillow/pytesseract not installed for image {img_path.name}")
+    deps = _image_ocr_deps()
+    if deps is None:
+        logger.warning("OCR skipped: Pillow/pytesseract not installed for image %s", img_path.name)
         return ""
+    pytesseract, Image = deps
     try:
         with Image.open(str(img_path)) as im:
             return pytesseract.image_to_string(im) or ""
     except Exception as e:
-        print(f"[loaders] OCR image error on {img_path.name}: {e}")
+        logger.warning("OCR image error on %s: %s", img_path.name, e)
         return ""
 
 
-def _ocr_pdf_path(pdf_path: Path) -> List[Document]:
-    """Convert a PDF to images and OCR each page. Returns a list of page Documents."""
-    if not (OCR_IMAGE_OK and OCR_PDF_OK):
-        print(f"[loaders] OCR skipped: Missing deps (pytesseract/Pillow/pdf2image) for {pdf_path.name}")
-        return []
-
-    docs: List[Document] = []
+def _ocr_pdf_page(pdf_path: str, page_no: int) -> str:
+    """Rasterize ONE page of a PDF and OCR it, so only a single page image is ever in memory."""
+    pytesseract, _Image = _image_ocr_deps()
+    convert_from_path, _pdfinfo = _pdf_ocr_deps()
     try:
         # Higher DPI improves OCR accuracy (trade-off: speed/memory)
-        pages = convert_from_path(str(pdf_path), dpi=300)
+        images = convert_from_path(pdf_path, dpi=300, first_page=page_no, last_page=page_no)
+    except Exception as e:
+        logger.warning("pdf2image failed on page %s of %s: %s", page_no, Path(pdf_path).name, e)
+        return ""
+
+    try:
+        return "".join(pytesseract.image_to_string(img) or "" for img in images)
+    except Exception as e:
+        logger.warning("OCR page %s failed for %s: %s", page_no, Path(pdf_path).name, e)
+        return ""
+    finally:
+        for img in images:
+            img.close()
+
+
+def _ocr_pdf_tasks(pdf_path: Path) -> List[OcrTask]:
+    """One OCR task per PDF page (pages are rasterized lazily when the task runs)."""
+    if _image_ocr_deps() is None or _pdf_ocr_deps() is None:
+        logger.warning("OCR skipped: Missing deps (pytesseract/Pillow/pdf2image) for %s", pdf_path.name)
+        return []
+    _convert, pdfinfo_from_path = _pdf_ocr_deps()
+    try:
+        page_count = int(pdfinfo_from_path(str(pdf_path))["Pages"])
     except Exception as e:
-        print(f"[loaders] pdf2image failed on {pdf_path.name}: {e}")
+        logger.warning("pdf2image failed on %s: %s", pdf_path.name, e)
         return []
+    return [("pdf", str(pdf_path), page) for page in range(1, page_count + 1)]
+
+
+def _run_ocr_task(task: OcrTask) -> str:
+    kind, path, page = task
+    if kind == "pdf":
+        return _ocr_pdf_page(path, page)
+    return _ocr_image_path(Path(path))
+
+
+def _timed_ocr_task(task: OcrTask) -> Tuple[str, float]:
+    """_run_ocr_task plus its duration, measured where it runs (possibly a pool worker)."""
+    t0 = time.perf_counter()
+    text = _run_ocr_task(task)
+    return text, time.perf_counter() - t0
+
+
+# OCR worker processes, started on first use and kept for the life of the process:
+# a spawned worker costs an interpreter start plus imports, more than most uploads' OCR
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _ocr_executor() -> ProcessPoolExecutor:
+    """
+    The shared OCR pool, sized once from settings.loader_workers.
+
+    Never replaced while callers may hold it: only at exit, or once it broke.
+    """
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # "spawn" because callers (upload jobs, retrieval executor) are multi-threaded,
+            # and forking a threaded process can deadlock the child.
+            # Workers are started as work arrives, so sizing for the configured count costs nothing up front
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=max(settings.loader_workers, 2), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _ocr_pool
 
-    for idx, img in enumerate(pages, start=1):
+
+@atexit.register
+def _shutdown_ocr_pool() -> None:
+    global _ocr_pool
+    with _ocr_pool_lock:
+        pool, _ocr_pool = _ocr_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_ocr(tasks: List[OcrTask], workers: Optional[int] = None) -> List[str]:
+    """
+    Run OCR tasks, in parallel on the shared process pool when there is more than one.
+    Results come back in task order.
+    """
+    global _ocr_pool
+    workers = min(max(1, settings.loader_workers if workers is None else workers), len(tasks))
+    if workers <= 1:
+        results = [_timed_ocr_task(t) for t in tasks]
+    else:
+        pool = _ocr_executor()
         try:
-            text = pytesseract.image_to_string(img) or ""
+            results = list(pool.map(_timed_ocr_task, tasks))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next call starts a new pool
+            with _ocr_pool_lock:
+                if _ocr_pool is pool:
+                    _ocr_pool = None
+            raise
+    # Observed here: metrics recorded in pool workers would die with them
+    for _text, seconds in results:
+        observe("ocr_page", seconds)
+    return [text for text, _seconds in results]
+
+
+def _extract(p: Path) -> Tuple[List[Document], List[OcrTask]]:
+    """
+    Cheap, in-process pass over one file.
+
+    Returns (documents, ocr_tasks). When ocr_tasks is non-empty the file needs
+    OCR, and documents are what to keep if OCR yields no text.
+    """
+    ext = p.suffix.lower()
+
+    # ---------- Plain text / markdown ----------
+    if ext in TEXT_EXTS:
+        try:
+            loader = TextLoader(str(p), encoding="utf-8")
+            loaded = loader.load()
+            for d in loaded:
+                _set_common_metadata(d, p)
+            return loaded, []
         except Exception as e:
-            print(f"[loaders] OCR page {idx} failed for {pdf_path.name}: {e}")
-            text = ""
+            logger.warning("Text load failed for %s: %s", p.name, e)
+            return [], []
+
+    # ---------- PDF (digital text first, then OCR fallback) ----------
+    if ext in PDF_EXTS:
+        try:
+            loader = PyPDFLoader(str(p))
+            loaded = loader.load()  # one Document per page w/ metadata["page"]
+        except Exception as e:
+            logger.warning("PyPDFLoader failed for %s: %s", p.name, e)
+            loaded = []
+
+        # Set metadata for digital pages
+        for d in loaded:
+            page_no = d.metadata.get("page") or d.metadata.get("page_number")
+            extra = {"page": page_no} if page_no is not None else {}
+            _set_common_metadata(d, p, extra)
+
+        # If digital text is effectively empty, try OCR fallback.
+        # If OCR is not available or also empty, keep the (empty) digital docs
+        # so the system still indexes filenames for future updates.
+        has_text = any((d.page_content or "").strip() for d in loaded)
+        return loaded, ([] if has_text else _ocr_pdf_tasks(p))
+
+    # ---------- Image files via OCR ----------
+    if ext in IMAGE_EXTS:
+        if _image_ocr_deps() is None:
+            logger.warning("OCR skipped: Pillow/pytesseract not installed for image %s", p.name)
+            return [], []
+        return [], [("image", str(p), None)]
 
+    # ---------- Unhandled extension ----------
+    # Silently skip other file types
+    logger.debug("Skipping unsupported file: %s", p.name)
+    return [], []
+
+
+def _ocr_documents(p: Path, fallback: List[Document], tasks: List[OcrTask], texts: List[str]) -> List[Document]:
+    """Turn OCR results for one file into Documents (page order), or return the fallback."""
+    docs: List[Document] = []
+    for (_kind, _path, page), text in zip(tasks, texts):
         if text.strip():
             d = Document(page_content=text, metadata={})
-            _set_common_metadata(d, pdf_path, {"page": idx, "ocr": True})
+            _set_common_metadata(d, p, {"page": page, "ocr": True} if page else {"ocr": True})
             docs.append(d)
+    if docs:
+        return docs
+
+    if p.suffix.lower() in IMAGE_EXTS:
+        # keep a stub doc with empty content? Usually better to skip entirely.
+        logger.info("No OCR text extracted from image %s", p.name)
+    else:
+        logger.info("OCR produced no text for %s", p.name)
+    return fallback
+
 
-    if not docs:
-        print(f"[loaders] OCR produced no text for {pdf_path.name}")
-    return docs
+def load_file(p: Path, workers: Optional[int] = None) -> List[Document]:
+    """
+    Load a single file into Documents (see load_documents for the rules).
+    Returns [] for unsupported extensions or files that yield no text.
+    Pages of a scanned PDF are OCR'd in parallel.
+    """
+    docs, tasks = _extract(p)
+    if not tasks:
+        return docs
+    return _ocr_documents(p, docs, tasks, _run_ocr(tasks, workers))
 
 
-def load_documents(docs_dir: str) -> List[Document]:
+def load_documents(docs_dir: str, workers: Optional[int] = None) -> List[Document]:
     """
     Load documents from a directory (recursively).
 
@@ -90,76 +315,39 @@ def load_documents(docs_dir: str) -> List[Document]:
       - fullpath: absolute path (helpful for debugging)
       - page: only for PDFs (and OCR pages) when available
       - ocr: True when the text came from OCR
+      - tenant / community / doc_type: from the path below docs_dir (see document_tags;
+        files under tenants/shared/ are skipped)
+
+    Text and digital PDF extraction run in-process. All OCR work (every page
+    of every scanned PDF, every image) is pooled and run on the shared OCR
+    process pool, or in-process when `workers` (default settings.loader_workers)
+    is 1; output keeps the sorted file/page order.
     """
     base = Path(docs_dir)
     if not base.exists():
-        print(f"[loaders] docs_dir does not exist: {docs_dir}")
+        logger.warning("docs_dir does not exist: %s", docs_dir)
         return []
 
-    all_docs: List[Document] = []
-
-    for p in base.rglob("*"):
-        if not p.is_file():
-            continue
-
-        ext = p.suffix.lower()
-
-        # ---------- Plain text / markdown ----------
-        if ext in TEXT_EXTS:
-            try:
-                loader = TextLoader(str(p), encoding="utf-8")
-                loaded = loader.load()
-                for d in loaded:
-                    _set_common_metadata(d, p)
-                all_docs.extend(loaded)
-            except Exception as e:
-                print(f"[loaders] Text load failed for {p.name}: {e}")
-            continue
-
-        # ---------- PDF (digital text first, then OCR fallback) ----------
-        if ext in PDF_EXTS:
-            try:
-                loader = PyPDFLoader(str(p))
-                loaded = loader.load()  # one Document per page w/ metadata["page"]
-            except Exception as e:
-                print(f"[loaders] PyPDFLoader failed for {p.name}: {e}")
-                loaded = []
-
-            # Set metadata for digital pages
-            for d in loaded:
-                page_no = d.metadata.get("page") or d.metadata.get("page_number")
-                extra = {"page": page_no} if page_no is not None else {}
-                _set_common_metadata(d, p, extra)
-
-            # If digital text is effectively empty, try OCR fallback
-            has_text = any((d.page_content or "").strip() for d in loaded)
-            if not has_text:
-                ocr_docs = _ocr_pdf_path(p)
-                if ocr_docs:
-                    all_docs.extend(ocr_docs)
-                else:
-                    # If OCR not available or also empty, keep the (empty) digital docs
-                    # so the system still indexes filenames for future updates.
-                    all_docs.extend(loaded)
-            else:
-                all_docs.extend(loaded)
+    files, file_tags = [], {}
+    for p in sorted(p for p in base.rglob("*") if p.is_file()):
+        try:
+            file_tags[p] = document_tags(p.relative_to(base).as_posix())
+        except ValueError as e:
+            logger.warning("Skipping %s: %s", p, e)
             continue
+        files.append(p)
+    extracted = [(p, *_extract(p)) for p in files]
 
-        # ---------- Image files via OCR ----------
-        if ext in IMAGE_EXTS:
-            text = _ocr_image_path(p)
-            if text.strip():
-                d = Document(page_content=text, metadata={})
-                _set_common_metadata(d, p, {"ocr": True})
-                all_docs.append(d)
-            else:
-                # keep a stub doc with empty content? Usually better to skip entirely.
-                print(f"[loaders] No OCR text extracted from image {p.name}")
-            continue
+    all_tasks = [t for _p, _docs, tasks in extracted for t in tasks]
+    texts = iter(_run_ocr(all_tasks, workers)) if all_tasks else iter(())
 
-        # ---------- Unhandled extension ----------
-        # Silently skip other file types
-        # print(f"[loaders] Skipping unsupported file: {p.name}")
+    all_docs: List[Document] = []
+    for p, docs, tasks in extracted:
+        if tasks:
+            docs = _ocr_documents(p, docs, tasks, [next(texts) for _ in tasks])
+        for d in docs:
+            d.metadata.update(file_tags[p])
+        all_docs.extend(docs)
 
-    print(f"[loaders] Loaded {len(all_docs)} documents from {docs_dir}")
+    logger.info("Loaded %d documents from %s", len(all_docs), docs_dir)
     return all_docs
@@ -1,9 +1,18 @@
 # src/data/processors.py
 
+import hashlib
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from typing import List
 from langchain.schema import Document
 
+from src.utils.metrics import timed
+
+def _chunk_id(chunk: Document) -> str:
+    """Stable id from where the chunk came from and what it says (same input -> same id)."""
+    meta = chunk.metadata
+    key = f"{meta.get('source')}|{meta.get('page')}|{meta.get('start_index')}|{chunk.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
 def chunk_documents(
     docs: List[Document],
     chunk_size: int = 1000,     # larger to keep related sentences together
@@ -12,10 +21,18 @@ def chunk_documents(
     """
     Larger chunks + overlap help keep short policy lines (e.g., rent due + grace period)
     within the same chunk so the LLM sees both facts together.
+
+    Every chunk gets metadata["start_index"] (offset in its source document) and a
+    stable metadata["chunk_id"], used as cache keys and to relate chunks across indexes.
     """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ". ", " "]
+        separators=["\n\n", "\n", ". ", " "],
+        add_start_index=True,
     )
-    return splitter.split_documents(docs)
+    with timed("chunking"):
+        chunks = splitter.split_documents(docs)
+        for chunk in chunks:
+            chunk.metadata["chunk_id"] = _chunk_id(chunk)
+    return chunks
@@ -0,0 +1,148 @@
+# src/utils/logs.py
+
+import atexit
+import contextvars
+import copy
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Optional
+
+from config.settings import settings
+from src.utils.metrics import LOG_RECORDS_DROPPED
+
+# Correlation ids of the request being handled (set by the app middleware and the routes).
+# Thread pools do not inherit them: submit work through in_context().
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("session_id", default=None)
+# Whether this request emits verbose debug output (see debug_sampled); None = decide per call
+_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("debug_sampled", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def new_request(request_id: str) -> None:
+    """Start a request context: its id, and whether its debug output is sampled."""
+    _request_id.set(request_id)
+    _session_id.set(None)
+    _sampled.set(random.random() < settings.log_debug_sample_rate)
+
+
+def bind_session(session_id: Optional[str]) -> None:
+    _session_id.set(session_id)
+
+
+def debug_sampled(logger: logging.Logger) -> bool:
+    """
+    Guard for verbose debug output (document previews, raw LLM output).
+
+    False unless DEBUG is enabled for `logger` and the current request was
+    sampled (LOG_DEBUG_SAMPLE_RATE), so the output is not even formatted otherwise.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    sampled = _sampled.get()
+    return sampled if sampled is not None else random.random() < settings.log_debug_sample_rate
+
+
+def in_context(fn, *args, **kwargs):
+    """`fn` bound to a copy of the current context, for executors and threads."""
+    return functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _ContextFilter(logging.Filter):
+    """Stamp records with the request/session ids (runs on the logging thread's caller)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        record.session_id = _session_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as is."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for the console and CLI scripts."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        ids = [f"{k}={getattr(record, k)}" for k in ("request_id", "session_id") if getattr(record, k, None)]
+        return f"{line} [{' '.join(ids)}]" if ids else line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Never blocks the caller: when the queue is full the record is dropped and
+    counted (rag_log_records_dropped_total).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, do not format here (nor drop exc_info): the
+        # listener's formatter does that. Only merge the args, which may be mutated
+        # (or be unpicklable) by the time the record is written.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None) -> None:
+    """
+    Route all logging through a bounded queue to a background writer thread.
+
+    Request threads only merge the message args and enqueue the record;
+    formatting (JSON, tracebacks) and the write to stderr happen on the
+    listener thread. Safe to call more than once.
+
+    Args:
+        level: Root log level (default settings.log_level)
+        fmt: "json" or "text" (default settings.log_format)
+        stream: Where the listener writes (default sys.stderr)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if (fmt or settings.log_format) == "json" else TextFormatter())
+
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    handler.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel((level or settings.log_level).upper())
+
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)  # flush what is still queued
@@ -0,0 +1,118 @@
+# src/utils/metrics.py
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# -------- Optional dependency (metrics become no-ops if missing) --------
+try:
+    from prometheus_client import (  # type: ignore
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        REGISTRY,
+        generate_latest,
+        multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily  # type: ignore
+    METRICS_OK = True
+except Exception:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    METRICS_OK = False
+
+# Stages of a chat request, ingestion and OCR, all in one histogram so they share buckets:
+#   embed_query, search_permanent, search_session, faiss_search, bm25_search, rerank, prompt_build,
+#   citations, llm_first_token, llm_total, chunking, ocr_page, embed_documents
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Noop:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def inc(self, *args, **kwargs):
+        pass
+
+
+class _StateCollector:
+    """rag_state{name}: engine state read at scrape time, from one call per scrape."""
+
+    _HELP = "Point-in-time engine state (sessions, index sizes, cache hit rates)"
+
+    def __init__(self):
+        self.source: Optional[Callable[[], Dict[str, float]]] = None
+
+    def describe(self):
+        return [GaugeMetricFamily("rag_state", self._HELP, labels=["name"])]
+
+    def collect(self):
+        family = GaugeMetricFamily("rag_state", self._HELP, labels=["name"])
+        source = self.source
+        if source is not None:
+            try:
+                for name, value in source().items():
+                    family.add_metric([name], value)
+            except Exception as e:
+                logger.warning("Engine state not collected: %s", e)
+        yield family
+
+
+if METRICS_OK:
+    STAGE_SECONDS = Histogram(
+        "rag_stage_seconds", "Time spent per pipeline stage", ["stage"], buckets=_BUCKETS
+    )
+    CHAT_REQUESTS = Counter(
+        "rag_chat_requests_total", "Chat answers by how they were produced", ["outcome"]
+    )
+    LOG_RECORDS_DROPPED = Counter(
+        "rag_log_records_dropped_total", "Log records dropped because the log queue was full"
+    )
+    _STATE = _StateCollector()
+    REGISTRY.register(_STATE)
+else:
+    STAGE_SECONDS = CHAT_REQUESTS = LOG_RECORDS_DROPPED = _Noop()
+    _STATE = None
+
+
+def observe(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of the with-block under `stage` (also on exceptions)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+def register_state(source: Callable[[], Dict[str, float]]) -> None:
+    """Expose rag_state{name} gauges, all read from one `source()` call per scrape, e.g. engine.stats."""
+    if _STATE is not None:
+        _STATE.source = source
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    The /metrics payload and its content type.
+
+    Under gunicorn, set PROMETHEUS_MULTIPROC_DIR so histograms from every worker
+    are aggregated (scrape-time gauges are then per-process and not exported).
+    """
+    if not METRICS_OK:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    registry: Optional[CollectorRegistry] = None
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return (generate_latest(registry) if registry else generate_latest()), CONTENT_TYPE_LATEST
@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.chatbot.ann_index import build_index, index_config, recall_report
+
+
+def _vectors(n, d=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, d)).astype(np.float32)
+
+
+def test_small_corpus_falls_back_to_flat():
+    index = build_index(_vectors(20), index_config("ivf_flat"))
+    assert type(index).__name__ == "IndexFlatL2"
+    assert index.ntotal == 20
+
+
+def test_ivf_and_hnsw_recall_against_exact():
+    vectors = _vectors(2000)
+    rows = recall_report(vectors, vectors[:50], [index_config("ivf_flat"), index_config("hnsw")],
+                         k=5, nprobes=(1000,), ef_searches=(128,))
+    assert [row["type"] for row in rows] == ["ivf_flat", "hnsw"]
+    assert rows[0]["recall"] == 1.0  # nprobe >= nlist is exhaustive
+    assert rows[1]["recall"] > 0.9
@@ -0,0 +1,45 @@
+from src.chatbot.answer_cache import AnswerCache
+
+
+def _cache(**kwargs):
+    cache = AnswerCache(**{"max_entries": 2, "ttl_seconds": 60, "similarity": 0.95, **kwargs})
+    cache.set_version("v1")
+    return cache
+
+
+def test_exact_hit_requires_same_chunks_and_version():
+    cache = _cache()
+    result = {"answer": "Rent is due on the 1st.", "citations": []}
+    cache.put("When is rent due?", ["c1", "c2"], result, version="v1")
+
+    assert cache.get("  when is RENT due ", ["c1", "c2"]) == result
+    assert cache.get("when is rent due", ["c1", "c3"]) is None
+
+    cache.set_version("v2")
+    assert cache.get("when is rent due", ["c1", "c2"]) is None
+    cache.put("when is rent due", ["c1"], result, version="v1")  # stale build, ignored
+    assert cache.stats()["entries"] == 0
+
+
+def test_similar_query_and_lru_bound():
+    cache = _cache()
+    cache.put("grace period", ["a"], {"answer": "5 days", "citations": []}, [1.0, 0.0], version="v1")
+    cache.put("late fee", ["b"], {"answer": "$75", "citations": []}, [0.0, 1.0], version="v1")
+
+    assert cache.find_similar([0.99, 0.05], ["a"])["answer"] == "5 days"
+    assert cache.find_similar([0.7, 0.7], ["a"]) is None
+    # As similar, but retrieval found other chunks (e.g. a different number in the question)
+    assert cache.find_similar([0.99, 0.05], ["b"]) is None
+
+    # "grace period" was used most recently, so "late fee" is evicted
+    cache.put("office hours", ["c"], {"answer": "9-5", "citations": []}, version="v1")
+    assert cache.get("late fee", ["b"]) is None
+    assert cache.get("grace period", ["a"])["answer"] == "5 days"
+
+
+def test_scopes_do_not_share_answers():
+    cache = _cache()
+    cache.put("pet policy", ["a"], {"answer": "Two cats", "citations": []}, [1.0, 0.0], version="v1", scope="acme/")
+    assert cache.get("pet policy", ["a"], scope="globex/") is None
+    assert cache.find_similar([1.0, 0.0], ["a"], scope="globex/") is None
+    assert cache.find_similar([1.0, 0.0], ["a"], scope="acme/")["answer"] == "Two cats"
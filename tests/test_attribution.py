@@ -0,0 +1,52 @@
+import numpy as np
+from langchain.schema import Document
+
+from benchmarks.fakes import HashingEmbeddings
+from src.chatbot import vector_store
+from src.chatbot.attribution import attribute, split_sentences
+from src.chatbot.vector_store import VectorStore
+
+
+def _docs():
+    return [
+        Document(page_content="Rent is due on the 1st of each month. Late fees start on the 5th.",
+                 metadata={"source": "lease.pdf", "page": 2}),
+        Document(page_content="The pool on the roof opens at 7am and closes at 10pm.",
+                 metadata={"source": "amenities.md"}),
+    ]
+
+
+def test_each_sentence_cites_its_chunk():
+    emb = HashingEmbeddings()
+    docs = _docs()
+    vectors = np.asarray(emb.embed_documents([d.page_content for d in docs]))
+    answer = "The pool opens at 7am and closes at 10pm. Rent is due on the 1st of each month. Anything else?"
+
+    citations, attributions = attribute(answer, docs, vectors, emb, min_score=0.3)
+
+    assert [(c["id"], c["source"], c.get("page")) for c in citations] == [(1, "amenities.md", None), (2, "lease.pdf", 2)]
+    assert [a["id"] for a in attributions] == [1, 2]
+    assert attributions[1]["sentence"] == "Rent is due on the 1st of each month."
+    assert attributions[1]["page"] == 2
+    assert all(a["score"] >= 0.3 for a in attributions)
+
+
+def test_unattributed_answer_cites_best_chunk():
+    emb = HashingEmbeddings()
+    docs = _docs()
+    citations, attributions = attribute("The pool has a lifeguard.", docs, None, emb, min_score=0.99)
+    assert attributions == []
+    assert [c["source"] for c in citations] == ["amenities.md"]
+    assert split_sentences("Yes. It does!\nSee the lease.") == ["See the lease."]
+
+
+def test_stored_vectors_are_read_back_from_the_index(tmp_path, monkeypatch):
+    emb = HashingEmbeddings()
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda model=None: emb)
+    docs = _docs()
+    expected = np.asarray(emb.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+    for mmap in (False, True):
+        store = VectorStore(index_dir=str(tmp_path / f"mmap{mmap}"), mmap=mmap)
+        store.rebuild(docs)
+        ids = [store._db.index_to_docstore_id[i] for i in (1, 0)]
+        assert np.allclose(store.vectors(ids), expected[[1, 0]])
@@ -0,0 +1,27 @@
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from src.chatbot import embeddings
+from src.chatbot.bulk_ingest import BulkIngest
+from src.chatbot.partitions import SHARED, PartitionedStore
+
+
+def test_ingest_resumes_from_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setitem(embeddings._REGISTRY, embeddings.settings.embed_model, DeterministicFakeEmbedding(size=8))
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name, text in [("a.md", "Rent is due on the 1st."), ("b.md", "Late fee is $75."), ("c.txt", "Pool opens at 9.")]:
+        (docs / name).write_text(text, encoding="utf-8")
+    index_dir = str(tmp_path / "index")
+
+    first = BulkIngest(str(docs), index_dir, shard_size=2, workers=1).run()
+    assert first["extract"]["files"] == 3 and first["embed"]["shards"] == 2
+
+    (docs / "c.txt").write_text("Pool opens at 10.", encoding="utf-8")
+    again = BulkIngest(str(docs), index_dir, shard_size=2, workers=1).run()
+    assert again["extract"] == {**again["extract"], "files": 1, "resumed": 2}
+    assert again["embed"]["resumed"] == 1  # only the shard holding c.txt is re-embedded
+
+    store = PartitionedStore(index_dir=index_dir)
+    store.build_or_load_dir(str(docs), build=False)
+    texts = {store.parts[SHARED].document(str(i)).page_content for i in range(3)}
+    assert "Pool opens at 10." in texts and store.version is not None
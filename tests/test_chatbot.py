@@ -1,15 +1,127 @@
+import asyncio
+import time
 
----
+import numpy as np
+import pytest
+from langchain.schema import Document
 
-# 8) Basic test
-
-## `tests/test_chatbot.py`
-```python
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeChatLLM, HashingEmbeddings
+from src.chatbot import embeddings, rag_engine
 from src.chatbot.rag_engine import RAGEngine
 
-def test_rag_basic():
-    engine = RAGEngine()
-    resp = engine.qa_with_history("test-session", "What is the leasing policy?")
+
+def _engine(tmp_path, monkeypatch, llm=None):
+    settings = rag_engine.settings
+    monkeypatch.setattr(settings, "docs_dir", str(tmp_path / "docs"))
+    monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "session_indexes_dir", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(rag_engine, "get_llm", lambda: llm or FakeChatLLM())
+    monkeypatch.setitem(embeddings._REGISTRY, settings.embed_model, HashingEmbeddings())
+    generate_corpus(settings.docs_dir, n_docs=5)
+    return RAGEngine()
+
+
+def test_rag_basic(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    resp = engine.qa_with_history("test-session", "When is rent due?")
     assert "citations" in resp
     assert isinstance(resp["citations"], list)
     assert isinstance(resp["answer"], str)
+    assert resp["answer"] and resp["citations"]
+    # The fake LLM answers with a sentence of the top chunk
+    assert resp["attributions"] and resp["attributions"][0]["id"] == resp["citations"][0]["id"]
+
+
+def test_async_path_answers_concurrently(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch, FakeChatLLM(latency=0.3))
+    questions = ["When is rent due?", "Are pets allowed?", "When does the pool open?"]
+
+    async def main():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(engine.aqa_with_history(f"s{i}", q) for i, q in enumerate(questions)))
+        return results, time.perf_counter() - started
+
+    results, seconds = asyncio.run(main())
+    # The LLM calls overlap instead of running one after the other
+    assert seconds < 0.3 * len(questions)
+    assert all(r["answer"] and r["citations"] for r in results)
+    assert results[0] == {**engine.qa_with_history("sync", questions[0]), "index_version": results[0]["index_version"]}
+    assert [m["role"] for m in engine.sessions.history("s0")] == ["user", "assistant"]
+
+
+def test_async_llm_deadline(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch, FakeChatLLM(latency=1.0))
+    monkeypatch.setattr(rag_engine.settings, "llm_deadline", 0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(engine.aqa_with_history("s1", "When is rent due?"))
+    assert engine.sessions.history("s1") == []
+
+
+def test_build_chain_and_finish(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    emb = HashingEmbeddings()
+
+    _chain, inputs, used, used_vectors = engine._build_chain("What is the meaning of life?", [])
+    assert inputs == {"question": "What is the meaning of life?"} and used == [] and used_vectors is None
+
+    docs = [Document(page_content="Rent is due on the 1st of each month.", metadata={"source": "lease.pdf"}),
+            Document(page_content="The pool opens at 7am.", metadata={"source": "pool.md"})]
+    vectors = np.asarray(emb.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+    _chain, inputs, used, used_vectors = engine._build_chain("When is rent due?", docs, vectors)
+    assert "Rent is due on the 1st" in inputs["context"] and inputs["question"] == "When is rent due?"
+    assert np.allclose(used_vectors, vectors[[docs.index(d) for d in used]])
+
+    history = []
+    version = engine.permanent.version
+    cache_ctx = ("When is rent due?", ["c1"], emb.embed_query("When is rent due?"), version, "")
+    raw = "```\n**Rent is due on the 1st of each month.**\nSources: lease.pdf\n```"
+    result = engine._finish(history, "When is rent due?", raw, used, used_vectors, cache_ctx, version)
+    assert result["answer"] == "Rent is due on the 1st of each month."
+    assert [c["source"] for c in result["citations"]] == ["lease.pdf"]
+    assert result["index_version"] == version
+    assert [m["content"] for m in history] == ["When is rent due?", result["answer"]]
+    assert engine.answer_cache.get("When is rent due?", ["c1"])["answer"] == result["answer"]
+
+
+def _stream(engine, session_id, query, stop_after=None):
+    async def main():
+        events = []
+        stream = engine.astream_with_history(session_id, query)
+        async for ev in stream:
+            events.append(ev)
+            if len(events) == stop_after:
+                await stream.aclose()  # the client went away
+                break
+        return events
+
+    return asyncio.run(main())
+
+
+def test_stream_events_in_order(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    events = _stream(engine, "s1", "When is rent due?")
+    names = [ev["event"] for ev in events]
+    assert len(names) > 3 and set(names[:-2]) == {"token"} and names[-2:] == ["citations", "done"]
+    done = events[-1]["data"]
+    assert "".join(ev["data"]["text"] for ev in events[:-2]) == done["answer"]
+    assert done["answer"] == engine.qa_with_history("sync", "When is rent due?")["answer"]
+    assert events[-2]["data"]["citations"]
+    assert [m["content"] for m in engine.sessions.history("s1")] == ["When is rent due?", done["answer"]]
+
+    # Answered from the answer cache: same events, history still recorded after "done"
+    cached = _stream(engine, "s2", "When is rent due?")
+    assert [ev["event"] for ev in cached] == ["token", "citations", "done"]
+    assert cached[0]["data"]["text"] == cached[-1]["data"]["answer"] == done["answer"]
+    assert len(engine.sessions.history("s2")) == 2
+
+
+def test_stream_records_history_only_on_completion(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    _stream(engine, "s1", "When is rent due?", stop_after=1)
+    assert engine.sessions.history("s1") == []
+
+    _stream(engine, "s2", "When is rent due?")
+    _stream(engine, "s3", "When is rent due?", stop_after=2)  # answer cache hit, cut before "done"
+    assert engine.sessions.history("s3") == []
@@ -0,0 +1,65 @@
+import os
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.fakes import HashingEmbeddings
+from src.chatbot import vector_store
+from src.chatbot.ann_index import build_index, index_config
+from src.chatbot.chunk_store import (
+    CHUNKS_FILE, MMAP_DIR, OFFSETS_FILE, ChunkStore, PositionIds, current_generation, write_chunks,
+)
+from src.chatbot.lexical import BM25_FILE
+from src.chatbot.vector_store import INDEX_FILE, VectorStore
+
+
+def test_chunk_store_roundtrip(tmp_path):
+    docs = [
+        Document(page_content="Rent is due on the 1st.", metadata={"source": "policy.md", "page": 1}),
+        Document(page_content="Late fee: $75 — après le 5", metadata={"source": "fees.md"}),
+    ]
+    assert write_chunks(str(tmp_path), docs) == 2
+    assert ChunkStore.exists(str(tmp_path))
+
+    store = ChunkStore(str(tmp_path))
+    ids = PositionIds(len(store))
+    assert [store.search(ids[i]) for i in range(len(ids))] == docs
+    assert store.search("2") is None and store.search("not-an-id") is None
+
+
+def test_mmap_store_swaps_whole_generations(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda model=None: HashingEmbeddings())
+    index_dir = str(tmp_path / "index")
+    writer = VectorStore(index_dir=index_dir, mmap=True)
+    writer.rebuild([Document(page_content="Rent is due on the 1st.", metadata={})])
+    first = current_generation(index_dir)
+    assert sorted(os.listdir(first)) == sorted([CHUNKS_FILE, OFFSETS_FILE, INDEX_FILE, BM25_FILE])
+
+    reader = VectorStore(index_dir=index_dir, mmap=True)
+    reader.load()
+    writer.rebuild([Document(page_content=f"Pool rule {i}.", metadata={}) for i in range(3)])
+    second = current_generation(index_dir)
+    assert second != first and not os.path.exists(first)
+    # The reader keeps its mapped generation until it loads again, then sees the new one whole
+    assert reader.document("0").page_content == "Rent is due on the 1st."
+    reader.load()
+    assert len(reader.lexical) == reader.size()["vectors"] == 3
+    assert reader.document("2").page_content == "Pool rule 2."
+
+
+def test_mmap_store_loads_and_replaces_the_single_directory_layout(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda model=None: HashingEmbeddings())
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    docs = [Document(page_content="Rent is due on the 1st.", metadata={})]
+    write_chunks(str(index_dir), docs)
+    faiss.write_index(build_index(np.asarray(HashingEmbeddings().embed_documents(["Rent"]), dtype=np.float32),
+                                  index_config("flat")), str(index_dir / INDEX_FILE))
+
+    store = VectorStore(index_dir=str(index_dir), mmap=True)
+    assert store.has_saved_index() and current_generation(str(index_dir)) is None
+    store.load()
+    assert store.document("0") == docs[0] and len(store.lexical) == 1
+    store.rebuild(docs)
+    assert sorted(os.listdir(index_dir)) == [MMAP_DIR]
@@ -0,0 +1,41 @@
+from langchain.schema import Document
+
+from src.chatbot.context_packer import pack_context
+from src.data.processors import chunk_documents
+
+TEXT = " ".join(f"Sentence number {i} says rent item {i} is due." for i in range(40))
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_overlapping_chunks_are_joined_without_repeats():
+    source = Document(page_content=TEXT, metadata={"source": "policy.md"})
+    chunks = chunk_documents([source], chunk_size=200, chunk_overlap=60)
+    # Two neighbouring chunks, ranked out of document order
+    context, used = pack_context([chunks[3], chunks[2]], budget=1000, count=_words)
+
+    start = chunks[2].metadata["start_index"]
+    end = chunks[3].metadata["start_index"] + len(chunks[3].page_content)
+    assert context == TEXT[start:end].strip()
+    assert used == [chunks[3], chunks[2]]
+
+
+def test_budget_is_filled_in_rank_order_and_cut_at_a_sentence():
+    docs = [
+        Document(page_content="Rent is due on the 1st. Late fees start on the 5th.", metadata={"source": "a.md"}),
+        Document(page_content="Pets need a deposit. Dogs must be leashed. Cats are fine.", metadata={"source": "b.md"}),
+        Document(page_content="Parking is free.", metadata={"source": "c.md"}),
+    ]
+    # Counting characters: 51 for the first chunk, 2 for the separator, 35 left for the second
+    context, used = pack_context(docs, budget=88, count=len)
+
+    assert context == "Rent is due on the 1st. Late fees start on the 5th.\n\nPets need a deposit."
+    assert [d.metadata["source"] for d in used] == ["a.md", "b.md"]
+
+
+def test_first_chunk_is_cut_at_words_if_no_sentence_fits():
+    doc = Document(page_content="one two three four five six seven", metadata={"source": "a.md"})
+    context, used = pack_context([doc], budget=3, count=_words)
+    assert context == "one two three" and used == [doc]
@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.chatbot import embeddings
+
+
+class _FakeHF:
+    loads = 0
+
+    def __init__(self, model_name, encode_kwargs=None):
+        _FakeHF.loads += 1
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+def test_shared_model_and_batching(monkeypatch):
+    monkeypatch.setattr(embeddings, "HuggingFaceEmbeddings", _FakeHF)
+    monkeypatch.setattr(embeddings, "_REGISTRY", {})
+    monkeypatch.setattr(embeddings.settings, "embed_batch_size", 2)
+
+    first = embeddings.get_embeddings("fake-model")
+    second = embeddings.get_embeddings("fake-model")
+    assert first is second
+    assert _FakeHF.loads == 1
+
+    vectors = first.embed_documents(["a", "bb", "ccc", "dddd", "eeeee"])
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert first._model.calls == [2, 2, 1]
+
+
+def test_query_vectors_are_cached(monkeypatch):
+    monkeypatch.setattr(embeddings, "HuggingFaceEmbeddings", _FakeHF)
+    emb = embeddings.SharedEmbeddings("fake-model", batch_size=8, query_cache_size=1)
+    calls = []
+    monkeypatch.setattr(emb._model, "embed_query", lambda text: calls.append(text) or [1.0])
+
+    emb.embed_query("rent")
+    emb.embed_query("rent")
+    emb.embed_query("fees")
+    emb.embed_query("rent")
+    assert calls == ["rent", "fees", "rent"]
+
+
+def test_batches_by_length_keep_input_order(monkeypatch):
+    monkeypatch.setattr(embeddings, "HuggingFaceEmbeddings", _FakeHF)
+    emb = embeddings.SharedEmbeddings("fake-model", batch_size=2)
+    seen = []
+    monkeypatch.setattr(emb._model, "embed_documents", lambda texts: seen.append(texts) or [[float(len(t))] for t in texts])
+
+    assert emb.embed_documents(["ccccc", "a", "dddd", "bb", "eee"]) == [[5.0], [1.0], [4.0], [2.0], [3.0]]
+    assert seen == [["a", "bb"], ["eee", "dddd"], ["ccccc"]]
+
+
+def test_onnx_pooling_ignores_padding():
+    from src.chatbot.onnx_embeddings import _pool
+
+    hidden = np.array([[[1.0, 1.0], [3.0, 3.0], [9.0, 9.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    assert _pool(hidden, mask, "mean").tolist() == [[2.0, 2.0]]
+    assert _pool(hidden, mask, "max").tolist() == [[3.0, 3.0]]
+    assert _pool(hidden, mask, "cls").tolist() == [[1.0, 1.0]]
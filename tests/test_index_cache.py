@@ -0,0 +1,21 @@
+from src.chatbot.index_cache import build_manifest, manifest_key
+
+
+def test_manifest_key_tracks_content_and_parameters(tmp_path):
+    (tmp_path / "policy.md").write_text("Rent is due on the 1st.", encoding="utf-8")
+    (tmp_path / "notes.bin").write_bytes(b"ignored")
+
+    first = build_manifest(str(tmp_path), "model-a", 1000, 200)
+    assert list(first["files"]) == ["policy.md"]
+
+    again = build_manifest(str(tmp_path), "model-a", 1000, 200, previous=first)
+    assert manifest_key(again) == manifest_key(first)
+
+    assert manifest_key(build_manifest(str(tmp_path), "model-b", 1000, 200)) != manifest_key(first)
+    assert manifest_key(build_manifest(str(tmp_path), "model-a", 800, 200)) != manifest_key(first)
+    ivf = build_manifest(str(tmp_path), "model-a", 1000, 200, index={"type": "ivf_flat", "nlist": 0})
+    assert manifest_key(ivf) != manifest_key(first)
+
+    (tmp_path / "policy.md").write_text("Rent is due on the 5th.", encoding="utf-8")
+    changed = build_manifest(str(tmp_path), "model-a", 1000, 200, previous=first)
+    assert manifest_key(changed) != manifest_key(first)
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeChatLLM, HashingEmbeddings
+from src.chatbot import embeddings, rag_engine
+from src.chatbot.index_versions import IndexVersions, PermanentIndex
+from src.chatbot.partitions import SHARED
+from src.chatbot.rag_engine import RAGEngine
+
+
+def _engine(tmp_path, monkeypatch):
+    settings = rag_engine.settings
+    monkeypatch.setattr(settings, "docs_dir", str(tmp_path / "docs"))
+    monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "session_indexes_dir", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "index_keep_versions", 1)
+    monkeypatch.setattr(rag_engine, "get_llm", lambda: FakeChatLLM())
+    monkeypatch.setitem(embeddings._REGISTRY, settings.embed_model, HashingEmbeddings())
+    generate_corpus(settings.docs_dir, n_docs=5)
+    return RAGEngine()
+
+
+def _add_doc(docs_dir, name):
+    with open(os.path.join(docs_dir, name), "w", encoding="utf-8") as fh:
+        fh.write(f"{name}: the pool on the roof opens at 7am and closes at 10pm. " * 20)
+
+
+def test_reload_swaps_and_rolls_back(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    permanent = engine.permanent
+    first = permanent.version
+    assert permanent.reload()["state"] == "unchanged"
+
+    old_store = engine.permanent_store
+    _add_doc(rag_engine.settings.docs_dir, "pool.txt")
+    status = permanent.reload()
+    assert status["state"] == "swapped" and status["previous"] == first
+    second = status["version"]
+    assert engine.permanent_store is not old_store
+    assert engine.answer_cache.version == second
+    # A query that picked up the old store still runs on it
+    shared = old_store.parts[SHARED]
+    assert shared.search("rent", shared._embeddings.embed_query("rent"), 4)[0]
+
+    resp = engine.qa_with_history("s1", "When does the pool open?")
+    assert resp["index_version"] == second
+
+    back = permanent.rollback()
+    assert back["version"] == first and permanent.version == first
+    assert IndexVersions().active() == first
+
+
+def test_rollback_is_pinned_across_workers(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    first = engine.permanent.version
+    _add_doc(rag_engine.settings.docs_dir, "pool.txt")
+    second = engine.permanent.reload()["version"]
+    engine.permanent.rollback()
+
+    # A worker starting now (INDEX_BUILD_ON_START) and the watcher leave the rollback alone
+    other = PermanentIndex()
+    assert other.version == first and IndexVersions().active() == first
+    other.poll()
+    assert engine.permanent.reload()["state"] == "pinned"
+    assert IndexVersions().active() == first
+
+    # Until an explicit (admin) reload
+    assert engine.permanent.reload(force=True)["version"] == second
+    assert not IndexVersions().pinned()
+
+
+def test_activate_prunes_old_versions(tmp_path):
+    versions = IndexVersions(str(tmp_path), keep=1)
+    for v in ("a", "b", "c"):
+        os.makedirs(versions.path(v))
+        versions.activate(v)
+    assert versions.state()["history"] == ["c", "b"]
+    assert versions.previous() == "b"
+    assert not os.path.exists(versions.path("a"))
+
+    versions.activate("b")
+    assert versions.state()["history"] == ["b", "c"]
+
+
+def test_rollback_needs_a_kept_version(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, monkeypatch)
+    with pytest.raises(ValueError):
+        engine.permanent.rollback()
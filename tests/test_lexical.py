@@ -0,0 +1,23 @@
+from src.chatbot.lexical import BM25Index, reciprocal_rank_fusion
+
+
+def test_bm25_matches_exact_amounts_and_save_roundtrip(tmp_path):
+    index = BM25Index()
+    index.add(["a", "b", "c"], [
+        "Rent is due on the 1st of each month.",
+        "A late fee of $75 applies after the 5th.",
+        "Tenants must give 30 days notice before moving out.",
+    ])
+    assert index.search("what is the $75 fee?", 2)[0][0] == "b"
+    assert index.search("after the 5th", 1)[0][0] == "b"
+
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.search("notice moving", 3) == index.search("notice moving", 3)
+
+
+def test_rrf_prefers_keys_ranked_by_both_lists():
+    fused = reciprocal_rank_fusion([(["x", "y", "z"], 1.0), (["y", "w"], 1.0)], k=60)
+    assert [key for key, _score in fused][:2] == ["y", "x"]
+    weighted = reciprocal_rank_fusion([(["x"], 1.0), (["s"], 2.0)], k=60)
+    assert weighted[0][0] == "s"
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from src.chatbot import llm_handler
+from src.chatbot.llm_handler import SingleFlight, close_http_clients, get_llm
+
+
+def test_identical_inflight_calls_share_one_upstream_call():
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run("same prompt", upstream) for _ in range(5)),
+                                       flight.run("other prompt", upstream))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ["answer"] * 6
+    assert len(calls) == 2 and flight.coalesced == 4
+    assert len(flight) == 0  # nothing kept once the call finished
+
+
+def test_followers_see_the_leaders_failure():
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("429 Too Many Requests")
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.run("k", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        flight = SingleFlight()
+        leader = asyncio.ensure_future(flight.run("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("k", upstream))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "answer"
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_async_client_survives_its_event_loop(monkeypatch):
+    for name in ("_http_client", "_http_async_client", "_async_transport"):
+        monkeypatch.setattr(llm_handler, name, None)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    _client, client = llm_handler._http_clients()
+
+    async def get():
+        return (await client.get(url)).text
+
+    try:
+        # A kept-alive connection of the first loop must not be reused on the second
+        assert asyncio.run(get()) == "ok"
+        assert asyncio.run(get()) == "ok"
+
+        async def get_and_close():
+            text = await get()
+            await close_http_clients()
+            return text + await get()
+
+        assert asyncio.run(get_and_close()) == "okok"
+    finally:
+        server.shutdown()
+
+
+def test_get_llm_with_fallbacks(monkeypatch):
+    settings = llm_handler.settings
+    monkeypatch.setattr(settings, "openrouter_api_key", "test-key")
+    monkeypatch.setattr(settings, "openrouter_model", "primary/model")
+    monkeypatch.setattr(settings, "llm_fallback_models", "")
+    assert get_llm().model_name == "primary/model"
+
+    monkeypatch.setattr(settings, "llm_fallback_models", " first/fallback, ,second/fallback ")
+    llm = get_llm()
+    assert llm.runnable.model_name == "primary/model"
+    assert [m.model_name for m in llm.fallbacks] == ["first/fallback", "second/fallback"]
+    assert llm.exceptions_to_handle == (openai.APIError,)
+    # Every model shares the one keep-alive pool
+    assert all(m.http_async_client is llm.runnable.http_async_client for m in llm.fallbacks)
+
+    monkeypatch.setattr(settings, "openrouter_api_key", "")
+    with pytest.raises(ValueError):
+        get_llm()
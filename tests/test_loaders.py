@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from src.data import loaders
+
+
+def test_ocr_results_keep_file_and_page_order(tmp_path, monkeypatch):
+    (tmp_path / "a_notes.md").write_text("Office hours are 9-5.", encoding="utf-8")
+    (tmp_path / "b_scan.pdf").write_bytes(b"%PDF-1.4")
+    (tmp_path / "c_photo.png").write_bytes(b"\x89PNG")
+
+    def fake_extract(p: Path):
+        if p.suffix == ".pdf":
+            return [], [("pdf", str(p), 1), ("pdf", str(p), 2)]
+        if p.suffix == ".png":
+            return [], [("image", str(p), None)]
+        return [loaders.Document(page_content=p.read_text(), metadata={"source": p.name})], []
+
+    monkeypatch.setattr(loaders, "_extract", fake_extract)
+    monkeypatch.setattr(
+        loaders, "_run_ocr_task",
+        lambda task: "" if task[2] == 2 else f"{Path(task[1]).name}:{task[2]}",
+    )
+
+    docs = loaders.load_documents(str(tmp_path), workers=1)
+
+    assert [d.page_content for d in docs] == [
+        "Office hours are 9-5.",
+        "b_scan.pdf:1",  # blank page 2 is dropped
+        "c_photo.png:None",
+    ]
+    assert docs[1].metadata["page"] == 1 and docs[1].metadata["ocr"] is True
+    assert "page" not in docs[2].metadata
+
+
+def test_ocr_pool_is_reused_across_calls(tmp_path):
+    tasks = [("image", str(tmp_path / f"missing{i}.png"), None) for i in range(2)]
+    try:
+        assert loaders._run_ocr(tasks, workers=2) == ["", ""]
+        pool = loaders._ocr_pool
+        assert pool is not None
+        assert loaders._run_ocr(tasks, workers=2) == ["", ""]
+        assert loaders._ocr_pool is pool
+        # Asking for more workers does not replace the pool other callers may be using
+        assert loaders._run_ocr(tasks * 4, workers=8) == [""] * 8
+        assert loaders._ocr_pool is pool
+        assert list(pool.map(len, ["ab"])) == [2]
+    finally:
+        loaders._shutdown_ocr_pool()
+    assert loaders._ocr_pool is None
@@ -0,0 +1,75 @@
+import contextvars
+import io
+import json
+import logging
+import queue
+
+from config.settings import settings
+from src.utils import logs, metrics
+
+
+def test_json_lines_carry_request_and_session_ids():
+    out = io.StringIO()
+    handler = logging.StreamHandler(out)
+    handler.setFormatter(logs.JsonFormatter())
+    handler.addFilter(logs._ContextFilter())
+    logger = logging.getLogger("test_logs.ids")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    def handle():
+        logs.new_request("req-1")
+        logs.bind_session("sess-1")
+        logger.info("Answered %d question", 1, extra={"hits": 3})
+
+    contextvars.copy_context().run(handle)
+
+    entry = json.loads(out.getvalue())
+    assert entry["msg"] == "Answered 1 question"
+    assert (entry["request_id"], entry["session_id"], entry["hits"]) == ("req-1", "sess-1", 3)
+
+
+def test_verbose_debug_is_sampled_per_request(monkeypatch):
+    logger = logging.getLogger("test_logs.sampling")
+    logger.setLevel(logging.DEBUG)
+
+    monkeypatch.setattr(settings, "log_debug_sample_rate", 0.0)
+    logs.new_request("req-off")
+    assert not logs.debug_sampled(logger)
+
+    monkeypatch.setattr(settings, "log_debug_sample_rate", 1.0)
+    logs.new_request("req-on")
+    assert logs.debug_sampled(logger)
+
+    logger.setLevel(logging.INFO)  # DEBUG off: never sampled
+    assert not logs.debug_sampled(logger)
+
+
+def test_queue_handler_leaves_formatting_to_the_listener():
+    handler = logs._DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.setFormatter(logs.JsonFormatter())
+    logger = logging.getLogger("test_logs.queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    body, _content_type = metrics.render()
+    try:
+        args = ["a"]
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed on %s", args)
+        args.append("b")  # mutated after the call: the queued message is unchanged
+        logger.error("Dropped, the queue is full")
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("Failed on ['a']", None)
+    assert record.exc_info and record.exc_info[0] is ValueError
+    assert json.loads(logs.JsonFormatter().format(record))["exc"].endswith("ValueError: boom")
+    if metrics.METRICS_OK:
+        dropped = b"\nrag_log_records_dropped_total "
+        before = float(body.split(dropped)[1].split()[0])
+        after = float(metrics.render()[0].split(dropped)[1].split()[0])
+        assert after == before + 1
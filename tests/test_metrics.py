@@ -0,0 +1,34 @@
+from src.utils import metrics
+
+
+def test_timed_records_stage_even_on_error():
+    try:
+        with metrics.timed("test_stage"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    body, content_type = metrics.render()
+    assert content_type.startswith("text/plain")
+    if metrics.METRICS_OK:
+        assert b'rag_stage_seconds_count{stage="test_stage"} 1.0' in body
+
+
+def test_engine_state_is_read_once_per_scrape():
+    calls = []
+
+    def stats():
+        calls.append(1)
+        return {"sessions": 3, "answer_cache_hit_rate": 0.5}
+
+    metrics.register_state(stats)
+    try:
+        body, _content_type = metrics.render()
+    finally:
+        metrics.register_state(None)
+    if metrics.METRICS_OK:
+        assert len(calls) == 1
+        assert b'rag_state{name="sessions"} 3.0' in body
+        assert b'rag_state{name="answer_cache_hit_rate"} 0.5' in body
+    else:
+        assert calls == []
@@ -0,0 +1,97 @@
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from benchmarks.fakes import FakeChatLLM, HashingEmbeddings
+from src.chatbot import embeddings, rag_engine
+from src.chatbot.bulk_ingest import BulkIngest
+from src.chatbot.partitions import SHARED, PartitionedStore, route
+from src.chatbot.rag_engine import RAGEngine
+from src.data.loaders import document_tags
+
+
+def _docs(root):
+    files = {
+        "policy.md": "Rent is due on the 1st.",
+        "tenants/acme/pets.md": "Acme allows two cats.",
+        "tenants/acme/communities/oak-park/leases/pool.md": "The Oak Park pool opens at 9.",
+        "tenants/globex/pets.md": "Globex allows no pets.",
+    }
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+
+def test_document_tags_and_route():
+    assert document_tags("policy.md") == {}
+    assert document_tags("tenants/acme/communities/oak-park/leases/pool.md") == {
+        "tenant": "acme", "community": "oak-park", "doc_type": "leases"}
+    keys = [SHARED, "acme", "acme/oak-park", "acme/elm", "globex"]
+    assert route(keys) == [SHARED]
+    assert route(keys, "acme") == [SHARED, "acme", "acme/oak-park", "acme/elm"]
+    assert route(keys, "acme", "oak-park") == [SHARED, "acme", "acme/oak-park"]
+
+
+def test_build_and_bulk_ingest_partition_by_tenant(tmp_path, monkeypatch):
+    monkeypatch.setitem(embeddings._REGISTRY, embeddings.settings.embed_model, DeterministicFakeEmbedding(size=8))
+    docs = tmp_path / "docs"
+    _docs(docs)
+
+    built = PartitionedStore(index_dir=str(tmp_path / "built"), mmap=True)
+    built.build_or_load_dir(str(docs))
+    BulkIngest(str(docs), str(tmp_path / "ingested"), workers=1).run()
+    ingested = PartitionedStore(index_dir=str(tmp_path / "ingested"))
+    ingested.build_or_load_dir(str(docs), build=False)
+
+    for store in (built, ingested):
+        assert sorted(store.parts) == ["acme", "acme/oak-park", "globex", SHARED]
+        assert store.size()["vectors"] == 4
+        texts = {part.document(str(0)).page_content for part in store.select("globex").values()}
+        assert texts == {"Rent is due on the 1st.", "Globex allows no pets."}
+        meta = store.parts["acme/oak-park"].document("0").metadata
+        assert (meta["tenant"], meta["community"], meta["doc_type"]) == ("acme", "oak-park", "leases")
+    assert built.version == ingested.version
+
+
+def test_reserved_tenant_name_is_not_indexed(tmp_path, monkeypatch):
+    monkeypatch.setitem(embeddings._REGISTRY, embeddings.settings.embed_model, DeterministicFakeEmbedding(size=8))
+    docs = tmp_path / "docs"
+    _docs(docs)
+    (docs / "tenants/shared").mkdir()
+    (docs / "tenants/shared/secret.md").write_text("Not for every tenant.", encoding="utf-8")
+    with pytest.raises(ValueError):
+        document_tags("tenants/shared/secret.md")
+
+    built = PartitionedStore(index_dir=str(tmp_path / "built"))
+    built.build_or_load_dir(str(docs))
+    BulkIngest(str(docs), str(tmp_path / "ingested"), workers=1).run()
+    ingested = PartitionedStore(index_dir=str(tmp_path / "ingested"))
+    ingested.build_or_load_dir(str(docs), build=False)
+    for store in (built, ingested):
+        assert store.size()["vectors"] == 4
+        assert store.parts[SHARED].size()["vectors"] == 1
+
+
+def test_partition_hits_are_ranked_together(tmp_path, monkeypatch):
+    settings = rag_engine.settings
+    monkeypatch.setattr(settings, "docs_dir", str(tmp_path / "docs"))
+    monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "session_indexes_dir", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(rag_engine, "get_llm", lambda: FakeChatLLM())
+    monkeypatch.setitem(embeddings._REGISTRY, settings.embed_model, HashingEmbeddings())
+    files = {
+        "policy.md": "Rent is due on the 1st of each month.",
+        "fees.md": "Rent paid after the 5th of the month has a late fee.",
+        "tenants/acme/pets.md": "Acme allows two cats per home each year.",
+    }
+    for rel, text in files.items():
+        path = tmp_path / "docs" / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    engine = RAGEngine()
+    ranked = engine._search("s1", "When is rent due each month?", tenant="acme")
+    # The best hit of the small acme partition does not rank level with the best hit overall
+    assert [store.document(doc_id).metadata["source"] for store, doc_id in ranked] == [
+        "policy.md", "fees.md", "pets.md"]
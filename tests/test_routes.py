@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import httpx
+import openai
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeChatLLM, HashingEmbeddings
+from src.api import routes
+from src.chatbot import embeddings, rag_engine
+
+
+class _Warm:
+    """EngineWarmup stand-in that is ready with `engine`."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get(self):
+        return self.engine, None
+
+
+class _Engine:
+    def __init__(self, error):
+        self.error = error
+
+    async def aqa_with_history(self, session_id, message, tenant=None, community=None):
+        raise self.error
+
+
+class _FailingLLM(FakeChatLLM):
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield next(self._stream(messages))
+        raise RuntimeError("upstream closed the stream")
+
+
+def _client(monkeypatch, error=None, engine=None):
+    monkeypatch.setattr(routes, "_warmup", _Warm(engine or _Engine(error)))
+    app = FastAPI()
+    routes.register_handlers(app)
+    app.include_router(routes.router)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_chat_deadline_is_a_504(monkeypatch):
+    r = _client(monkeypatch, asyncio.TimeoutError()).post("/api/chat", json={"message": "When is rent due?"})
+    assert r.status_code == 504
+
+
+def test_chat_rate_limited_upstream_is_a_503_with_retry_after(monkeypatch):
+    response = httpx.Response(429, request=httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions"))
+    error = openai.RateLimitError("Rate limit exceeded", response=response, body=None)
+    r = _client(monkeypatch, error).post("/api/chat", json={"message": "When is rent due?"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "10"
+
+
+def test_chat_other_errors_are_not_masked(monkeypatch):
+    r = _client(monkeypatch, RuntimeError("boom")).post("/api/chat", json={"message": "When is rent due?"})
+    assert r.status_code == 500
+
+
+def _stream_client(tmp_path, monkeypatch, llm):
+    settings = rag_engine.settings
+    monkeypatch.setattr(settings, "docs_dir", str(tmp_path / "docs"))
+    monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "session_indexes_dir", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(rag_engine, "get_llm", lambda: llm)
+    monkeypatch.setitem(embeddings._REGISTRY, settings.embed_model, HashingEmbeddings())
+    generate_corpus(settings.docs_dir, n_docs=5)
+    engine = rag_engine.RAGEngine()
+    return engine, _client(monkeypatch, engine=engine)
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_chat_stream_sends_tokens_then_citations_then_done(tmp_path, monkeypatch):
+    engine, client = _stream_client(tmp_path, monkeypatch, FakeChatLLM())
+    r = client.post("/api/chat/stream", json={"session_id": "s1", "message": "When is rent due?"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    names = [name for name, _ in events]
+    assert len(names) > 3 and set(names[:-2]) == {"token"} and names[-2:] == ["citations", "done"]
+    answer = events[-1][1]["answer"]
+    assert "".join(data["text"] for _, data in events[:-2]) == answer
+    assert events[-2][1]["citations"]
+    assert [m["content"] for m in engine.sessions.history("s1")] == ["When is rent due?", answer]
+
+
+def test_chat_stream_failure_is_an_error_event(tmp_path, monkeypatch):
+    engine, client = _stream_client(tmp_path, monkeypatch, _FailingLLM())
+    r = client.post("/api/chat/stream", json={"session_id": "s1", "message": "When is rent due?"})
+    assert r.status_code == 200
+    names = [name for name, _ in _events(r.text)]
+    assert names[0] == "token" and names[-1] == "error" and "done" not in names
+    assert engine.sessions.history("s1") == []
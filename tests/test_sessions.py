@@ -0,0 +1,83 @@
+import os
+import time
+from types import SimpleNamespace
+
+from src.chatbot import sessions
+from src.chatbot.sessions import SessionManager
+
+
+def _fake_store(vectors):
+    index = SimpleNamespace(ntotal=vectors, d=256)
+    return SimpleNamespace(_db=SimpleNamespace(index=index, docstore=SimpleNamespace(_dict={})))
+
+
+def test_lru_eviction_by_count_and_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(sessions.settings, "session_indexes_dir", str(tmp_path / "indexes"))
+    manager = SessionManager(ttl_seconds=60, max_resident=2, budget_mb=1)
+    manager.put_index("a", _fake_store(100))
+    manager.put_index("b", _fake_store(100))
+    manager.history("a")  # touching history does not change index recency
+    manager.put_index("c", _fake_store(100))
+    assert list(manager._resident) == ["b", "c"]
+
+    # 1024 vectors * 256 dims * 4 bytes = 1 MiB, so "d" alone fills the budget
+    manager.put_index("d", _fake_store(1024))
+    assert list(manager._resident) == ["d"]
+
+
+def test_sweep_removes_expired_sessions_and_stale_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(sessions.settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(sessions.settings, "session_indexes_dir", str(tmp_path / "indexes"))
+    for sid in ("old", "live", "orphan"):
+        os.makedirs(sessions.session_upload_dir(sid))
+        os.makedirs(sessions.session_index_dir(sid))
+    stale = time.time() - 120
+    for path in (sessions.session_upload_dir("orphan"), sessions.session_index_dir("orphan")):
+        os.utime(path, (stale, stale))
+
+    manager = SessionManager(ttl_seconds=60)
+    manager.history("old").append({"role": "user", "content": "hi"})
+    manager.history("live")
+    manager._sessions["old"].last_access = stale
+    for path in (sessions.session_upload_dir("old"), sessions.session_index_dir("old"),
+                 sessions.session_access_path("old")):
+        os.utime(path, (stale, stale))
+
+    removed = manager.sweep()
+
+    assert sorted(removed) == ["old", "orphan"]
+    assert sorted(os.listdir(tmp_path / "uploads")) == ["live"]
+    assert sorted(os.listdir(tmp_path / "indexes")) == [sessions.ACCESS_DIR, "session_live"]
+    assert os.listdir(tmp_path / "indexes" / sessions.ACCESS_DIR) == ["live"]
+    assert manager.history("old") == []
+
+
+def test_sweep_keeps_sessions_other_workers_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(sessions.settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(sessions.settings, "session_indexes_dir", str(tmp_path / "indexes"))
+    stale = time.time() - 120
+    for sid in ("elsewhere", "idle"):
+        os.makedirs(sessions.session_upload_dir(sid))
+        os.makedirs(sessions.session_index_dir(sid))
+        os.utime(sessions.session_upload_dir(sid), (stale, stale))
+        os.utime(sessions.session_index_dir(sid), (stale, stale))
+    staging = tmp_path / "uploads" / ".incoming" / "request"
+    staging.mkdir(parents=True)
+    os.utime(staging.parent, (stale, stale))
+
+    # Another worker only queries "elsewhere": its files are old, its access marker is not
+    SessionManager(ttl_seconds=60).history("elsewhere")
+    # This worker served "idle" earlier; the session has since expired everywhere
+    manager = SessionManager(ttl_seconds=60)
+    manager.history("idle")
+    manager._sessions["idle"].last_access = stale
+    os.utime(sessions.session_access_path("idle"), (stale, stale))
+
+    assert manager.sweep() == ["idle"]
+    assert sorted(os.listdir(tmp_path / "uploads")) == [".incoming", "elsewhere"]
+    assert staging.is_dir()
+
+
+def test_rejects_path_like_session_ids():
+    assert not sessions.is_valid_session_id("../etc")
+    assert sessions.is_valid_session_id("sess-1700000000-abc123")
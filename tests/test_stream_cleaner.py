@@ -0,0 +1,24 @@
+import pytest
+
+from src.chatbot.rag_engine import _StreamCleaner, _clean_answer
+
+
+def _stream(raw, size):
+    cleaner = _StreamCleaner()
+    out = "".join(cleaner.feed(raw[i:i + size]) for i in range(0, len(raw), size))
+    return out + cleaner.finish()
+
+
+@pytest.mark.parametrize("size", [1, 3, 50])
+@pytest.mark.parametrize("raw", [
+    "Rent is due on the **1st** of each month.",
+    ": - Rent is due on the 1st.\nSources: policy.md\nLate fee is $75.",
+    "```markdown\nThe grace period is `5` days.\n```",
+    "So the office opens at 9am.\nsource : welcome.md",
+])
+def test_stream_matches_clean_answer(raw, size):
+    assert _stream(raw, size).strip() == _clean_answer(raw)
+
+
+def test_empty_stream_falls_back():
+    assert _stream("  :  ", 1) == "I don't know based on the available documents."
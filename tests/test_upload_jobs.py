@@ -0,0 +1,67 @@
+import threading
+import time
+
+from src.chatbot.upload_jobs import UploadJobManager
+
+
+class _Engine:
+    """add_session_files stand-in that blocks until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def add_session_files(self, session_id, paths):
+        self.started.set()
+        self.release.wait(5)
+        name = paths[0].rsplit("/", 1)[-1]
+        if name.startswith("bad"):
+            raise ValueError("unreadable")
+        return (0, 1) if name.startswith("dup") else (1, 0)
+
+
+def _wait(jobs, job_id):
+    deadline = time.time() + 5
+    while jobs.get(job_id)["finished_at"] is None:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    return jobs.get(job_id)
+
+
+def test_job_file_status(tmp_path):
+    engine = _Engine()
+    engine.release.set()
+    jobs = UploadJobManager(engine, workers=2)
+    dup = tmp_path / "dup.txt"
+    dup.write_text("x")
+    job = jobs.submit("s1", [str(tmp_path / "a.txt"), str(dup), str(tmp_path / "bad.txt")])
+    assert job["progress"]["total"] == 3
+
+    job = _wait(jobs, job["job_id"])
+    assert [f["status"] for f in job["files"]] == ["indexed", "duplicate", "failed"]
+    assert job["files"][2]["error"] == "unreadable"
+    assert job["status"] == "done" and job["progress"]["done"] == 3
+    assert not dup.exists()
+
+    jobs.forget_session("s1")
+    assert jobs.get(job["job_id"]) is None
+
+
+def test_forget_session_keeps_the_lock_of_queued_jobs(tmp_path):
+    engine = _Engine()
+    jobs = UploadJobManager(engine, workers=1)
+    other = jobs.submit("s2", [str(tmp_path / "a.txt")])
+    assert engine.started.wait(5)
+    # Queued behind s2's job: it has s1's lock object but does not hold it yet
+    queued = jobs.submit("s1", [str(tmp_path / "b.txt")])
+    session_lock = jobs._session_locks["s1"]
+
+    jobs.forget_session("s1")
+    later = jobs.submit("s1", [str(tmp_path / "c.txt")])
+    assert jobs._session_locks["s1"] is session_lock  # the later job waits for the queued one
+
+    engine.release.set()
+    for job in (other, queued, later):
+        assert _wait(jobs, job["job_id"])["status"] == "done"
+    jobs.forget_session("s1")
+    assert list(jobs._session_locks) == []  # s2's lock went too: none of its jobs is unfinished
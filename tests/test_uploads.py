@@ -0,0 +1,79 @@
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from src.api import uploads
+from src.api.uploads import INCOMING_DIR, receive_upload, sniff
+
+PDF = b"%PDF-1.4\n" + b"0" * 600
+TEXT = b"Rent is due on the 1st of each month.\n"
+
+
+def _client(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads.settings, "uploads_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(uploads.settings, "session_indexes_dir", str(tmp_path / "sessions"))
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        received = await receive_upload(request)
+        return {k: v for k, v in received.items() if k != "paths"}
+
+    return TestClient(app)
+
+
+def _post(client, files, session_id="s1"):
+    return client.post("/upload", data={"session_id": session_id}, files=[("files", f) for f in files])
+
+
+def test_upload_streams_dedupes_and_sniffs(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    r = _post(client, [("lease.pdf", PDF), ("notes.txt", TEXT), ("fake.pdf", TEXT), ("run.exe", b"MZ")])
+    assert r.status_code == 200
+    body = r.json()
+    assert body["saved"] == ["lease.pdf", "notes.txt"]
+    assert body["rejected"] == ["fake.pdf", "run.exe"]
+
+    # Same content again (any name) is a duplicate; other content under a taken name gets its hash
+    body = _post(client, [("copy.pdf", PDF), ("notes.txt", TEXT + b"More."), ("notes.txt", TEXT)]).json()
+    assert body["duplicates"] == ["copy.pdf", "notes.txt"]
+    assert len(body["saved"]) == 1 and body["saved"][0].startswith("notes_")
+
+    session_dir = tmp_path / "uploads" / "s1"
+    assert (session_dir / "lease.pdf").read_bytes() == PDF
+    assert sorted(os.listdir(session_dir)) == sorted(["lease.pdf", "notes.txt", body["saved"][0]])
+    assert os.listdir(tmp_path / "uploads" / INCOMING_DIR) == []
+
+
+def test_upload_limits(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    monkeypatch.setattr(uploads.settings, "upload_max_file_mb", 1)
+    monkeypatch.setattr(uploads.settings, "upload_session_quota_mb", 2)
+    big = b"a" * (700 * 1024)
+
+    assert _post(client, [("big.txt", big * 2)]).status_code == 413
+    assert _post(client, [("a.txt", big), ("b.txt", big + b"b")]).status_code == 200
+    r = _post(client, [("c.txt", big + b"c")])
+    assert r.status_code == 413 and "per session" in r.json()["detail"]
+    assert sorted(os.listdir(tmp_path / "uploads" / "s1")) == ["a.txt", "b.txt"]
+    assert _post(client, [("a.txt", TEXT)], session_id="../x").status_code == 400
+
+
+def test_session_id_must_precede_the_files(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    body = (
+        b'--b\r\nContent-Disposition: form-data; name="files"; filename="a.txt"\r\n\r\n' + TEXT + b"\r\n"
+        b'--b\r\nContent-Disposition: form-data; name="session_id"\r\n\r\ns1\r\n--b--\r\n'
+    )
+    r = client.post("/upload", content=body, headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert r.status_code == 400 and "before the files" in r.json()["detail"]
+    assert not (tmp_path / "uploads" / "s1").exists()
+
+
+def test_sniff():
+    assert sniff(".png", b"\x89PNG\r\n\x1a\n....")
+    assert sniff(".webp", b"RIFF\x00\x00\x00\x00WEBPVP8 ")
+    assert sniff(".txt", "café".encode("utf-8")[:-1])  # cut inside a character
+    assert not sniff(".txt", b"\x89PNG\r\n\x1a\n\x00")
+    assert not sniff(".jpg", PDF)
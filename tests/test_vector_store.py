@@ -0,0 +1,46 @@
+from benchmarks.fakes import HashingEmbeddings
+from src.chatbot import vector_store
+from src.chatbot.index_cache import load_manifest
+from src.chatbot.vector_store import VectorStore
+
+
+class _CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def _texts(store, query):
+    vector_hits, _lexical = store.search(query, store._embeddings.embed_query(query), 10)
+    return {store.document(doc_id).page_content for doc_id, _distance in vector_hits}
+
+
+def test_add_files_embeds_only_new_content(tmp_path, monkeypatch):
+    emb = _CountingEmbeddings()
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda model=None: emb)
+    lease, pets = tmp_path / "lease.txt", tmp_path / "pets.txt"
+    lease.write_text("Rent is due on the 1st of each month.", encoding="utf-8")
+    pets.write_text("Two cats are allowed per home.", encoding="utf-8")
+    index_dir = str(tmp_path / "index")
+
+    store = VectorStore(index_dir=index_dir)
+    assert store.add_files([str(lease), str(pets)]) == (["lease.txt", "pets.txt"], [])
+    assert len(emb.embedded) == 2
+
+    # Unchanged content is skipped, also by a store that loads the saved index
+    assert store.add_files([str(lease)]) == ([], ["lease.txt"])
+    reopened = VectorStore(index_dir=index_dir)
+    assert reopened.add_files([str(pets)]) == ([], ["pets.txt"])
+    assert len(emb.embedded) == 2
+
+    # Changed content is chunked and embedded; nothing already indexed is embedded again
+    lease.write_text("Rent is due on the 5th of each month.", encoding="utf-8")
+    assert reopened.add_files([str(lease)]) == (["lease.txt"], [])
+    assert emb.embedded[2:] == ["Rent is due on the 5th of each month."]
+    assert reopened.size()["vectors"] == len(reopened.lexical) == 3
+    assert "Rent is due on the 5th of each month." in _texts(reopened, "rent due")
+    assert load_manifest(index_dir)["files"]["lease.txt"]["chunks"] == 1
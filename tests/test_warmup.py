@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.api.warmup import EngineNotReady, EngineWarmup
+from src.chatbot import rag_engine
+
+
+def test_warmup_builds_engine_in_background(monkeypatch):
+    class SlowEngine:
+        def __init__(self):
+            time.sleep(0.2)
+
+    monkeypatch.setattr(rag_engine, "RAGEngine", SlowEngine)
+    warmup = EngineWarmup()
+    with pytest.raises(EngineNotReady):
+        warmup.get()  # first call starts warm-up instead of blocking
+    assert warmup.status()["state"] == "warming"
+
+    assert warmup.wait(timeout=5)
+    engine, jobs = warmup.get()
+    assert isinstance(engine, SlowEngine) and jobs is not None
+    assert set(warmup.status()["timings"]) == {"import_s", "build_s", "ready_after_start_s"}
+
+
+def test_warmup_failure_is_reported(monkeypatch):
+    def broken():
+        raise ValueError("OPENROUTER_API_KEY not set")
+
+    monkeypatch.setattr(rag_engine, "RAGEngine", broken)
+    warmup = EngineWarmup()
+    assert not warmup.wait(timeout=5)
+    assert warmup.status()["state"] == "failed"
+    with pytest.raises(EngineNotReady, match="OPENROUTER_API_KEY"):
+        warmup.get()
+
+
+def test_importing_the_app_does_not_load_the_engine_stack():
+    code = "import sys, app; print(sorted(m for m in ('faiss', 'langchain', 'src.chatbot.partitions') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.strip() == "[]"